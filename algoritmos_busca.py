@@ -1,25 +1,766 @@
+import weakref
+from heapq import heappush, heappop
+from itertools import count
+from math import sin, sqrt, atan2
 import networkx as nx
-from parser import haversine # Reutilizando a função de cálculo de distância
+import numpy as np
+from parser import RAIO_TERRA_M
+from grafo_csr import GrafoCSR
+from hierarquia_contracao import construir_hierarquia, consultar_hierarquia
+from marcos import construir_marcos
+from perfis import obter_perfil
+from instrumentacao import Instrumentacao, ResultadoBusca
+from componentes import componentes_do_grafo, pode_alcancar
+
+# Hierarquias de contração e tabelas de marcos já preparadas, por grafo.
+_hierarquias = weakref.WeakKeyDictionary()
+_marcos = weakref.WeakKeyDictionary()
+
+# Operações da fila de prioridade dos núcleos de busca sem instrumentação.
+_HEAP = (heappush, heappop)
+
+def dijkstra(grafo, origem_id, destino_id, estatisticas=None, perfil=None, instrumentacao=None):
+    # O GrafoCSR, e qualquer grafo quando se pedem estatísticas ou
+    # instrumentação, usa a implementação própria abaixo, que segue os mesmos
+    # desempates do networkx.
+    # Com um perfil (nome ou Perfil), o peso é o tempo de viagem no perfil.
+    # Pares que os componentes do grafo mostram sem caminho nem são buscados.
+    medida = instrumentacao.iniciar('dijkstra') if instrumentacao is not None else None
+    perfil = _resolver_perfil(grafo, perfil)
+    if not pode_alcancar(grafo, origem_id, destino_id):
+        return _sem_caminho(origem_id, destino_id, estatisticas, medida)
+    if isinstance(grafo, GrafoCSR) or estatisticas is not None or medida is not None:
+        adjacencia = _Adjacencia(grafo, perfil)
+        origem, destino = adjacencia.no(origem_id), adjacencia.no(destino_id)
+        vizinhos, heap = adjacencia.sucessores, _HEAP
+        if medida is not None:
+            vizinhos, heap = medida.vizinhos(vizinhos), medida.heap()
+        distancias, _, predecessores = _arvore_dijkstra(vizinhos, origem, destino, heap=heap)
+        caminho = None
+        if destino in distancias:
+            caminho = adjacencia.caminho(_reconstruir_caminho(predecessores, destino))
+        _registrar(estatisticas, len(distancias), medida, caminho)
+        if caminho is None:
+            print(f"Não foi encontrado um caminho entre {origem_id} e {destino_id}.")
+        return caminho
 
-def dijkstra(grafo, origem_id, destino_id):
     try:
-        caminho = nx.dijkstra_path(grafo, origem_id, destino_id, weight='weight')
+        caminho = nx.dijkstra_path(grafo, origem_id, destino_id, weight=_peso_nx(perfil))
         return caminho
     except nx.NetworkXNoPath:
         print(f"Não foi encontrado um caminho entre {origem_id} e {destino_id}.")
         return None
 
-def a_estrela(grafo, origem_id, destino_id):      
-    # Função de heurística: calcula a distância em linha reta (Haversine)
+def a_estrela(grafo, origem_id, destino_id, estatisticas=None, perfil=None, instrumentacao=None):
+    # Com um perfil, a heurística é o tempo para percorrer a distância em
+    # linha reta na velocidade máxima do perfil, que nunca superestima.
+    medida = instrumentacao.iniciar('a_estrela') if instrumentacao is not None else None
+    perfil = _resolver_perfil(grafo, perfil)
+    if not pode_alcancar(grafo, origem_id, destino_id):
+        return _sem_caminho(origem_id, destino_id, estatisticas, medida)
+    if isinstance(grafo, GrafoCSR) or estatisticas is not None or medida is not None:
+        adjacencia = _Adjacencia(grafo, perfil)
+        origem, destino = adjacencia.no(origem_id), adjacencia.no(destino_id)
+        return _a_estrela_ponto_a_ponto(adjacencia, adjacencia.estimativa_ate(destino), origem, destino,
+                                        estatisticas, medida)
+
+    # Função de heurística: calcula a distância em linha reta (Haversine),
+    # a partir das coordenadas em radianos pré-calculadas para o grafo
+    if destino_id not in grafo:
+        raise nx.NodeNotFound(f"Target {destino_id} is not in G")
+    coordenadas = _coordenadas_radianos_nx(grafo)
+    lat_destino, lon_destino, cos_destino = coordenadas[destino_id]
+    velocidade = 1.0 if perfil is None else perfil.velocidade_maxima_ms()
+
     def heuristica(u, v):
-        lat1, lon1 = grafo.nodes[u]['lat'], grafo.nodes[u]['lon']
-        lat2, lon2 = grafo.nodes[v]['lat'], grafo.nodes[v]['lon']
-        return haversine(lat1, lon1, lat2, lon2)
+        lat_u, lon_u, cos_u = coordenadas[u]
+        return _haversine_radianos(lat_u, lon_u, cos_u, lat_destino, lon_destino, cos_destino) / velocidade
 
     try:
-        caminho = nx.astar_path(grafo, origem_id, destino_id, heuristic=heuristica, weight='weight')
+        caminho = nx.astar_path(grafo, origem_id, destino_id, heuristic=heuristica, weight=_peso_nx(perfil))
         return caminho
     except nx.NetworkXNoPath:
         print(f"Não foi encontrado um caminho entre {origem_id} e {destino_id}.")
         return None
-        
+
+def preparar_marcos(grafo, marcos=None, num_marcos=16, selecao='evitar'):
+    """
+    Associa ao grafo as tabelas de marcos usadas por a_estrela_alt(). Sem o
+    argumento marcos, elas são calculadas agora (dois Dijkstra completos
+    por marco).
+
+    Returns:
+        MarcosALT: As tabelas associadas ao grafo.
+
+    Raises:
+        ValueError: Se as tabelas dadas não têm os mesmos nós do grafo (no
+            GrafoCSR, também na mesma ordem); com as de outro grafo a
+            heurística deixaria de ser admissível.
+    """
+    if marcos is None:
+        marcos = construir_marcos(grafo, num_marcos, selecao)
+    elif _marcos.get(grafo) is not marcos and not _marcos_do_grafo(marcos, grafo):
+        raise ValueError("As tabelas de marcos foram calculadas para outro grafo.")
+    _marcos[grafo] = marcos
+    return marcos
+
+def _marcos_do_grafo(marcos, grafo):
+    # No GrafoCSR a heurística usa os índices internos; no networkx, os IDs.
+    if marcos.number_of_nodes() != grafo.number_of_nodes():
+        return False
+    if isinstance(grafo, GrafoCSR):
+        return np.array_equal(marcos.ids, grafo.ids)
+    ids = np.fromiter(grafo.nodes(), dtype=np.int64, count=grafo.number_of_nodes())
+    return np.array_equal(np.sort(marcos.ids), np.sort(ids))
+
+def a_estrela_alt(grafo, origem_id, destino_id, estatisticas=None, instrumentacao=None):
+    """
+    A* com a heurística ALT: o limite inferior vem das distâncias pré-
+    calculadas até e a partir de marcos (desigualdade triangular), que
+    acompanham as mãos únicas e os desvios da malha viária, ao contrário da
+    distância em linha reta. Na primeira consulta de um grafo sem marcos
+    preparados, eles são calculados (fora do tempo medido pela
+    instrumentação).
+
+    Returns:
+        list or None: Caminho como lista de IDs, ou None se não houver caminho.
+    """
+    if not pode_alcancar(grafo, origem_id, destino_id):
+        medida = instrumentacao.iniciar('a_estrela_alt') if instrumentacao is not None else None
+        return _sem_caminho(origem_id, destino_id, estatisticas, medida)
+    marcos = _marcos.get(grafo) or preparar_marcos(grafo)
+    medida = instrumentacao.iniciar('a_estrela_alt') if instrumentacao is not None else None
+    adjacencia = _Adjacencia(grafo)
+    origem, destino = adjacencia.no(origem_id), adjacencia.no(destino_id)
+    if isinstance(grafo, GrafoCSR):
+        heuristica = marcos.heuristica(destino, origem)
+    else:
+        posicoes = marcos.posicoes()
+        limite_inferior = marcos.heuristica(posicoes[destino], posicoes[origem])
+        heuristica = lambda v: limite_inferior(posicoes[v])
+    return _a_estrela_ponto_a_ponto(adjacencia, heuristica, origem, destino, estatisticas, medida)
+
+def dijkstra_bidirecional(grafo, origem_id, destino_id, estatisticas=None):
+    """
+    Dijkstra executado simultaneamente a partir da origem e do destino
+    (no grafo reverso), parando quando as duas fronteiras se encontram.
+
+    Args:
+        grafo: Grafo do NetworkX ou GrafoCSR
+        origem_id: ID do nó de origem
+        destino_id: ID do nó de destino
+        estatisticas: Dicionário opcional que recebe 'nos_fixados'
+
+    Returns:
+        list or None: Caminho como lista de IDs, ou None se não houver caminho.
+    """
+    if not pode_alcancar(grafo, origem_id, destino_id):
+        return _sem_caminho(origem_id, destino_id, estatisticas)
+    adjacencia = _Adjacencia(grafo)
+    origem, destino = adjacencia.no(origem_id), adjacencia.no(destino_id)
+    caminho, fixados = _busca_bidirecional(adjacencia, origem, destino)
+    _registrar(estatisticas, fixados)
+    if caminho is None:
+        print(f"Não foi encontrado um caminho entre {origem_id} e {destino_id}.")
+        return None
+    return adjacencia.caminho(caminho)
+
+def a_estrela_bidirecional(grafo, origem_id, destino_id, estatisticas=None):
+    """
+    A* bidirecional com potenciais consistentes: as duas buscas usam a média
+    p(v) = (h_destino(v) - h_origem(v)) / 2 das distâncias em linha reta, o
+    que mantém os custos reduzidos não negativos nos dois sentidos e permite
+    o mesmo critério de parada do Dijkstra bidirecional.
+
+    Args:
+        grafo: Grafo do NetworkX ou GrafoCSR
+        origem_id: ID do nó de origem
+        destino_id: ID do nó de destino
+        estatisticas: Dicionário opcional que recebe 'nos_fixados'
+
+    Returns:
+        list or None: Caminho como lista de IDs, ou None se não houver caminho.
+    """
+    if not pode_alcancar(grafo, origem_id, destino_id):
+        return _sem_caminho(origem_id, destino_id, estatisticas)
+    adjacencia = _Adjacencia(grafo)
+    origem, destino = adjacencia.no(origem_id), adjacencia.no(destino_id)
+    ate_destino = adjacencia.distancia_ate(destino)
+    desde_origem = adjacencia.distancia_ate(origem)
+
+    calculados = {}
+
+    def potencial(v):
+        # Um mesmo nó costuma ser enfileirado pelos dois lados; guarda o valor.
+        p = calculados.get(v)
+        if p is None:
+            p = calculados[v] = (ate_destino(v) - desde_origem(v)) / 2
+        return p
+
+    caminho, fixados = _busca_bidirecional(adjacencia, origem, destino, potencial)
+    _registrar(estatisticas, fixados)
+    if caminho is None:
+        print(f"Não foi encontrado um caminho entre {origem_id} e {destino_id}.")
+        return None
+    return adjacencia.caminho(caminho)
+
+def preparar_hierarquia(grafo, hierarquia=None):
+    """
+    Associa ao grafo a hierarquia de contração usada por
+    hierarquia_contracao(). Sem o argumento hierarquia, ela é construída
+    agora (o pré-processamento pode levar bastante tempo em grafos grandes).
+
+    Returns:
+        HierarquiaContracao: A hierarquia associada ao grafo.
+
+    Raises:
+        ValueError: Se a hierarquia dada foi construída para outro grafo
+            (outro arquivo de origem, outros nós ou arestas); com ela as
+            distâncias deixariam de ser as do grafo.
+    """
+    if hierarquia is None:
+        hierarquia = construir_hierarquia(grafo)
+    elif _hierarquias.get(grafo) is not hierarquia and not hierarquia.do_grafo(grafo):
+        raise ValueError("A hierarquia de contração foi construída para outro grafo.")
+    _hierarquias[grafo] = hierarquia
+    return hierarquia
+
+def hierarquia_contracao(grafo, origem_id, destino_id, estatisticas=None):
+    """
+    Consulta ponto a ponto usando Contraction Hierarchies. Na primeira
+    consulta de um grafo sem hierarquia preparada, ela é construída.
+
+    Returns:
+        list or None: Caminho como lista de IDs, ou None se não houver caminho.
+    """
+    if not pode_alcancar(grafo, origem_id, destino_id):
+        return _sem_caminho(origem_id, destino_id, estatisticas)
+    hierarquia = _hierarquias.get(grafo) or preparar_hierarquia(grafo)
+    try:
+        caminho = consultar_hierarquia(hierarquia, origem_id, destino_id, estatisticas)
+    except KeyError as erro:
+        raise nx.NodeNotFound(f"O nó {erro.args[0]} não está no grafo.")
+    if caminho is None:
+        print(f"Não foi encontrado um caminho entre {origem_id} e {destino_id}.")
+    return caminho
+
+def marcos_preparados(grafo):
+    """
+    Tabelas de marcos associadas ao grafo, ou None se não houver.
+    """
+    return _marcos.get(grafo)
+
+def descartar_preparos(grafo, hierarquia=True, marcos=True):
+    """
+    Desassocia do grafo a hierarquia de contração e/ou as tabelas de
+    marcos, que serão recalculadas na próxima consulta que precisar delas.
+
+    Returns:
+        tuple: (hierarquia descartada, marcos descartados), booleanos.
+    """
+    descartou_hierarquia = hierarquia and _hierarquias.pop(grafo, None) is not None
+    descartou_marcos = marcos and _marcos.pop(grafo, None) is not None
+    return descartou_hierarquia, descartou_marcos
+
+def dijkstra_todos_destinos(grafo, origem_id, perfil=None, destinos=None):
+    """
+    Executa uma única busca de Dijkstra a partir da origem e retorna a
+    distância e o número de arestas do caminho mínimo até cada nó alcançável.
+
+    Os desempates seguem a mesma regra do networkx, então a distância e o
+    número de arestas coincidem com os de dijkstra(grafo, origem_id, destino).
+
+    Args:
+        grafo: Grafo do NetworkX ou GrafoCSR
+        origem_id: ID do nó de origem
+        perfil: Perfil de roteamento (nome ou Perfil); as distâncias passam
+            a ser tempos de viagem em segundos
+        destinos: Se informado (e não vazio), a busca para assim que todos
+            esses nós forem fixados; os resultados cobrem pelo menos eles
+
+    Returns:
+        tuple: (distancias, saltos), dicionários {destino: valor}
+    """
+    adjacencia = _Adjacencia(grafo, _resolver_perfil(grafo, perfil))
+    alvos = {adjacencia.no(destino) for destino in destinos} if destinos else None
+    distancias, saltos, _ = _arvore_dijkstra(adjacencia.sucessores, adjacencia.no(origem_id), alvos=alvos)
+    if isinstance(grafo, GrafoCSR):
+        ids = grafo._mv_ids
+        return ({ids[v]: d for v, d in distancias.items()},
+                {ids[v]: saltos[v] for v in distancias})
+    return distancias, saltos
+
+def arvore_caminhos_minimos(grafo, origem_id, destinos=None, perfil=None):
+    """
+    Árvore de caminhos mínimos a partir da origem: uma única busca de
+    Dijkstra que responde o caminho até qualquer destino alcançável, com os
+    mesmos desempates de dijkstra().
+
+    Args:
+        grafo: Grafo do NetworkX ou GrafoCSR
+        origem_id: ID do nó de origem
+        destinos: Se informado, a busca para assim que todos esses nós
+            forem fixados (a árvore cobre pelo menos eles)
+        perfil: Perfil de roteamento (nome ou Perfil) cujo tempo de viagem
+            é usado como peso
+
+    Returns:
+        tuple: (distancias, predecessores), dicionários {nó: valor} com os
+        IDs do OSM dos nós fixados; o predecessor da origem é None.
+    """
+    adjacencia = _Adjacencia(grafo, _resolver_perfil(grafo, perfil))
+    alvos = None if destinos is None else {adjacencia.no(destino) for destino in destinos}
+    distancias, _, predecessores = _arvore_dijkstra(adjacencia.sucessores, adjacencia.no(origem_id),
+                                                    alvos=alvos)
+    if isinstance(grafo, GrafoCSR):
+        ids = grafo._mv_ids
+        return ({ids[v]: d for v, d in distancias.items()},
+                {ids[v]: None if predecessores[v] is None else ids[predecessores[v]] for v in distancias})
+    return distancias, {v: predecessores[v] for v in distancias}
+
+def caminho_na_arvore(predecessores, destino_id):
+    """
+    Caminho da origem até destino_id na árvore de arvore_caminhos_minimos(),
+    ou None se o destino não estiver nela.
+    """
+    if destino_id not in predecessores:
+        return None
+    return _reconstruir_caminho(predecessores, destino_id)
+
+def matriz_distancias(grafo, origens, destinos, saltos=False, arquivo=None, arquivo_saltos=None, perfil=None):
+    """
+    Matriz de distâncias mínimas entre cada origem e cada destino, com uma
+    busca de Dijkstra um-para-muitos por origem, que para assim que todos os
+    destinos são fixados.
+
+    As distâncias são float32 (inf quando não há caminho) e o número de
+    arestas de cada caminho mínimo é int32 (-1 quando não há caminho), com
+    os mesmos desempates de dijkstra(). Para matrizes grandes, informe
+    arquivo (e arquivo_saltos): a matriz é gravada diretamente em um .npy
+    mapeado em memória, sem ocupar a RAM inteira.
+
+    Os componentes conexos do grafo (calculados agora, se faltarem) tiram
+    de cada busca os destinos que a origem não pode alcançar: sem eles, a
+    busca percorreria o componente inteiro procurando-os, e uma origem sem
+    nenhum destino alcançável nem é buscada.
+
+    Args:
+        grafo: Grafo do NetworkX ou GrafoCSR
+        origens: IDs dos nós de origem (linhas)
+        destinos: IDs dos nós de destino (colunas)
+        saltos (bool): Também calcula a matriz de número de arestas.
+        arquivo (str): Caminho do .npy onde gravar as distâncias.
+        arquivo_saltos (str): Caminho do .npy onde gravar os saltos.
+        perfil: Perfil de roteamento (nome ou Perfil); a matriz passa a ser
+            de tempos de viagem em segundos
+
+    Returns:
+        numpy.ndarray or tuple: A matriz de distâncias ou, com saltos=True,
+        (distancias, saltos).
+    """
+    adjacencia = _Adjacencia(grafo, _resolver_perfil(grafo, perfil))
+    alvos = [adjacencia.no(destino) for destino in destinos]
+    componentes = componentes_do_grafo(grafo)
+    posicoes_alvos = componentes.posicoes(grafo, list(destinos))
+    forma = (len(origens), len(alvos))
+
+    if arquivo is not None:
+        distancias = np.lib.format.open_memmap(arquivo, mode='w+', dtype=np.float32, shape=forma)
+    else:
+        distancias = np.empty(forma, dtype=np.float32)
+    matriz_saltos = None
+    if saltos:
+        if arquivo_saltos is not None:
+            matriz_saltos = np.lib.format.open_memmap(arquivo_saltos, mode='w+', dtype=np.int32, shape=forma)
+        else:
+            matriz_saltos = np.empty(forma, dtype=np.int32)
+
+    infinito = float('inf')
+    for i, origem_id in enumerate(origens):
+        origem = adjacencia.no(origem_id)
+        possiveis = componentes.alcancaveis(componentes.posicao(grafo, origem_id), posicoes_alvos)
+        conjunto_alvos = {alvo for alvo, possivel in zip(alvos, possiveis.tolist()) if possivel}
+        if conjunto_alvos:
+            dist, num_arestas, _ = _arvore_dijkstra(adjacencia.sucessores, origem, alvos=conjunto_alvos)
+        else:
+            dist = num_arestas = {}
+        distancias[i] = [dist.get(alvo, infinito) for alvo in alvos]
+        if saltos:
+            matriz_saltos[i] = [num_arestas[alvo] if alvo in dist else -1 for alvo in alvos]
+
+    for matriz in (distancias, matriz_saltos):
+        if isinstance(matriz, np.memmap):
+            matriz.flush()
+    return (distancias, matriz_saltos) if saltos else distancias
+
+# Algoritmos ponto a ponto disponíveis, pelo nome usado na linha de comando
+# e na análise de todos os pontos.
+ALGORITMOS = {
+    'dijkstra': dijkstra,
+    'a_estrela': a_estrela,
+    'a_estrela_alt': a_estrela_alt,
+    'dijkstra_bidirecional': dijkstra_bidirecional,
+    'a_estrela_bidirecional': a_estrela_bidirecional,
+    'hierarquia_contracao': hierarquia_contracao,
+}
+
+# Algoritmos que aceitam um perfil de roteamento (tempo de viagem). Os
+# demais usam marcos, atalhos ou a busca reversa, preparados só com a distância.
+ALGORITMOS_COM_PERFIL = ('dijkstra', 'a_estrela')
+
+# Algoritmos que aceitam o argumento instrumentacao.
+ALGORITMOS_INSTRUMENTADOS = ('dijkstra', 'a_estrela', 'a_estrela_alt')
+
+def buscar_instrumentado(grafo, origem_id, destino_id, algoritmo='dijkstra', perfil=None, instrumentacao=None):
+    """
+    Executa uma consulta ponto a ponto com instrumentação.
+
+    Args:
+        grafo: Grafo do NetworkX ou GrafoCSR
+        origem_id: ID do nó de origem
+        destino_id: ID do nó de destino
+        algoritmo (str): Nome do algoritmo em ALGORITMOS_INSTRUMENTADOS.
+        perfil: Perfil de roteamento (nome ou Perfil), para os algoritmos
+            de ALGORITMOS_COM_PERFIL.
+        instrumentacao (Instrumentacao): Coletor que acumula as medidas; sem
+            ele, é usado um só para esta consulta.
+
+    Returns:
+        ResultadoBusca: (caminho ou None, EstatisticasBusca)
+    """
+    if algoritmo not in ALGORITMOS_INSTRUMENTADOS:
+        raise ValueError(f"O algoritmo {algoritmo} não tem instrumentação. "
+                         f"Algoritmos instrumentados: {', '.join(ALGORITMOS_INSTRUMENTADOS)}.")
+    if perfil is not None and algoritmo not in ALGORITMOS_COM_PERFIL:
+        raise ValueError(f"O algoritmo {algoritmo} não aceita perfil.")
+    instrumentacao = instrumentacao if instrumentacao is not None else Instrumentacao()
+    argumentos = {'instrumentacao': instrumentacao}
+    if perfil is not None:
+        argumentos['perfil'] = perfil
+    caminho = ALGORITMOS[algoritmo](grafo, origem_id, destino_id, **argumentos)
+    return ResultadoBusca(caminho, instrumentacao.ultima)
+
+def _resolver_perfil(grafo, perfil):
+    return None if perfil is None else obter_perfil(perfil, grafo)
+
+def _peso_nx(perfil):
+    # Peso para as funções do networkx: None esconde as arestas que o
+    # perfil não pode usar (tempo infinito).
+    if perfil is None:
+        return 'weight'
+    atributo = perfil.atributo
+    infinito = float('inf')
+
+    def peso(u, v, dados):
+        tempo = dados.get(atributo, infinito)
+        return None if tempo == infinito else tempo
+    return peso
+
+def _registrar(estatisticas, nos_fixados, medida=None, caminho=None):
+    if estatisticas is not None:
+        estatisticas['nos_fixados'] = nos_fixados
+    if medida is not None:
+        medida.concluir(nos_fixados, caminho is not None)
+
+def _sem_caminho(origem_id, destino_id, estatisticas, medida=None):
+    # Resposta dos pares descartados pelos componentes, sem nenhum nó fixado.
+    _registrar(estatisticas, 0, medida)
+    print(f"Não foi encontrado um caminho entre {origem_id} e {destino_id}.")
+    return None
+
+def _a_estrela_ponto_a_ponto(adjacencia, heuristica, origem, destino, estatisticas, medida):
+    # Parte comum de a_estrela() e a_estrela_alt(), já com a heurística montada.
+    vizinhos, heap = adjacencia.sucessores, _HEAP
+    if medida is not None:
+        vizinhos, heuristica, heap = medida.vizinhos(vizinhos), medida.heuristica(heuristica), medida.heap()
+    predecessores, fixados = _a_estrela(vizinhos, heuristica, origem, destino, heap=heap)
+    caminho = None
+    if predecessores is not None:
+        caminho = adjacencia.caminho(_reconstruir_caminho(predecessores, destino))
+    _registrar(estatisticas, fixados, medida, caminho)
+    if caminho is None:
+        origem_id, destino_id = adjacencia.caminho([origem, destino])
+        print(f"Não foi encontrado um caminho entre {origem_id} e {destino_id}.")
+    return caminho
+
+def _haversine_radianos(lat1, lon1, cos_lat1, lat2, lon2, cos_lat2):
+    # Mesma fórmula de parser.haversine_radianos, com math em vez de NumPy:
+    # é chamada uma vez por nó dentro do A*, onde floats avulsos são mais rápidos.
+    a = sin((lat2 - lat1) / 2)**2 + cos_lat1 * cos_lat2 * sin((lon2 - lon1) / 2)**2
+    return RAIO_TERRA_M * 2 * atan2(sqrt(a), sqrt(1 - a))
+
+def _coordenadas_radianos_nx(grafo):
+    """
+    Retorna {nó: (lat_rad, lon_rad, cos_lat)} para um grafo do NetworkX,
+    calculado de forma vetorizada na primeira chamada e guardado em grafo.graph.
+
+    O AtualizadorGrafo descarta a tabela quando acrescenta nós; quem trocar
+    nós ou coordenadas direto no grafo deve remover
+    grafo.graph['_coordenadas_radianos'].
+    """
+    chave = '_coordenadas_radianos'
+    if grafo.graph.get(chave, (None, -1))[1] != grafo.number_of_nodes():
+        nos = list(grafo.nodes)
+        lat = np.radians(np.array([grafo.nodes[n]['lat'] for n in nos], dtype=np.float64))
+        lon = np.radians(np.array([grafo.nodes[n]['lon'] for n in nos], dtype=np.float64))
+        coordenadas = dict(zip(nos, zip(lat.tolist(), lon.tolist(), np.cos(lat).tolist())))
+        grafo.graph[chave] = (coordenadas, grafo.number_of_nodes())
+    return grafo.graph[chave][0]
+
+class _Adjacencia:
+    """
+    Acesso uniforme ao networkx.DiGraph e ao GrafoCSR para os núcleos de
+    busca deste módulo. No DiGraph os nós internos são os próprios IDs do
+    OSM; no GrafoCSR são os índices 0..N-1.
+
+    Com um perfil, os pesos são os tempos de viagem compilados no grafo
+    para ele; as buscas no sentido contrário usam sempre a distância.
+    """
+
+    def __init__(self, grafo, perfil=None):
+        self.grafo = grafo
+        self.perfil = perfil
+        if isinstance(grafo, GrafoCSR):
+            offsets, destinos, pesos = grafo._mv_offsets, grafo._mv_destinos, grafo._mv_pesos
+            if perfil is not None:
+                pesos = memoryview(grafo.pesos_do_perfil(perfil.nome))
+            self.sucessores = _vizinhos_de_arrays(offsets, destinos, pesos)
+            self._predecessores = None
+            self._coordenadas = [memoryview(a) for a in grafo.coordenadas_radianos()]
+        else:
+            sucessores = grafo._succ
+            if perfil is None:
+                self.sucessores = lambda v: [(u, dados.get('weight', 1)) for u, dados in sucessores[v].items()]
+            else:
+                atributo, infinito = perfil.atributo, float('inf')
+                self.sucessores = lambda v: [(u, dados.get(atributo, infinito)) for u, dados in sucessores[v].items()]
+            antecessores = grafo._pred
+            self._predecessores = lambda v: [(u, dados.get('weight', 1)) for u, dados in antecessores[v].items()]
+            self._coordenadas = None
+
+    @property
+    def predecessores(self):
+        # O CSR reverso só é montado quando uma busca no sentido contrário pede.
+        if self._predecessores is None:
+            offsets, origens, pesos = self.grafo.csr_reverso()
+            self._predecessores = _vizinhos_de_arrays(memoryview(offsets), memoryview(origens), memoryview(pesos))
+        return self._predecessores
+
+    def no(self, no_id):
+        """
+        Converte o ID do OSM no nó interno (NodeNotFound se não existir).
+        """
+        if isinstance(self.grafo, GrafoCSR):
+            try:
+                return self.grafo.indice(no_id)
+            except KeyError:
+                raise nx.NodeNotFound(f"O nó {no_id} não está no grafo.")
+        if no_id not in self.grafo:
+            raise nx.NodeNotFound(f"O nó {no_id} não está no grafo.")
+        return no_id
+
+    def caminho(self, nos):
+        """
+        Converte uma lista de nós internos em IDs do OSM.
+        """
+        if isinstance(self.grafo, GrafoCSR):
+            ids = self.grafo._mv_ids
+            return [ids[v] for v in nos]
+        return nos
+
+    def estimativa_ate(self, alvo):
+        """
+        Retorna uma função v -> limite inferior do custo até alvo: a
+        distância em linha reta ou, com um perfil, o tempo para percorrê-la
+        na velocidade máxima do perfil.
+        """
+        distancia = self.distancia_ate(alvo)
+        if self.perfil is None:
+            return distancia
+        velocidade = self.perfil.velocidade_maxima_ms()
+        return lambda v: distancia(v) / velocidade
+
+    def distancia_ate(self, alvo):
+        """
+        Retorna uma função v -> distância em linha reta (Haversine) até alvo.
+        """
+        if self._coordenadas is None:
+            coordenadas = _coordenadas_radianos_nx(self.grafo)
+            lat_alvo, lon_alvo, cos_alvo = coordenadas[alvo]
+
+            def distancia(v):
+                lat_v, lon_v, cos_v = coordenadas[v]
+                return _haversine_radianos(lat_v, lon_v, cos_v, lat_alvo, lon_alvo, cos_alvo)
+            return distancia
+
+        lat_rad, lon_rad, cos_lat = self._coordenadas
+        lat_alvo, lon_alvo, cos_alvo = lat_rad[alvo], lon_rad[alvo], cos_lat[alvo]
+
+        def distancia(v):
+            return _haversine_radianos(lat_rad[v], lon_rad[v], cos_lat[v], lat_alvo, lon_alvo, cos_alvo)
+        return distancia
+
+def _vizinhos_de_arrays(offsets, vizinhos, pesos):
+    def iterar(v):
+        inicio, fim = offsets[v], offsets[v + 1]
+        return zip(vizinhos[inicio:fim], pesos[inicio:fim])
+    return iterar
+
+def _arvore_dijkstra(vizinhos, origem, destino=None, alvos=None, heap=_HEAP):
+    """
+    Núcleo do Dijkstra usado pelas buscas implementadas aqui.
+
+    Args:
+        vizinhos: Função que recebe um nó e retorna [(vizinho, peso), ...]
+        origem: Nó de origem
+        destino: Se informado, a busca para quando ele é fixado
+        alvos: Conjunto de nós; se informado, a busca para quando todos
+            estiverem fixados
+        heap: Par (heappush, heappop); a instrumentação passa versões que
+            contam as operações
+
+    Returns:
+        tuple: (distancias, saltos, predecessores) dos nós fixados
+    """
+    heappush, heappop = heap
+    restantes = len(alvos) if alvos is not None else -1
+    infinito = float('inf')
+    distancias = {}
+    saltos = {origem: 0}
+    predecessores = {origem: None}
+    vistos = {origem: 0}
+    contador = count()
+    fila = []
+    heappush(fila, (0, next(contador), origem))
+
+    while fila:
+        dist_v, _, v = heappop(fila)
+        if v in distancias:
+            continue
+        distancias[v] = dist_v
+        if v == destino:
+            break
+        if restantes > 0 and v in alvos:
+            restantes -= 1
+            if restantes == 0:
+                break
+        for u, peso in vizinhos(v):
+            dist_u = dist_v + peso
+            if u in distancias:
+                continue
+            # Arestas fechadas (peso infinito) nunca melhoram a distância.
+            if dist_u < vistos.get(u, infinito):
+                vistos[u] = dist_u
+                saltos[u] = saltos[v] + 1
+                predecessores[u] = v
+                heappush(fila, (dist_u, next(contador), u))
+
+    return distancias, saltos, predecessores
+
+def _a_estrela(vizinhos, heuristica, origem, destino, heap=_HEAP):
+    """
+    Núcleo do A*, com a mesma estrutura do networkx.astar_path.
+
+    Returns:
+        tuple: (predecessores ou None se não houver caminho, nós fixados)
+    """
+    heappush, heappop = heap
+    infinito = float('inf')
+    contador = count()
+    fila = []
+    heappush(fila, (heuristica(origem), next(contador), origem, 0, None))
+    expandidos = {}
+    enfileirados = {}
+
+    while fila:
+        _, _, v, dist_v, pai = heappop(fila)
+        if v in expandidos:
+            continue
+        expandidos[v] = pai
+        if v == destino:
+            return expandidos, len(expandidos)
+        for u, peso in vizinhos(v):
+            if u in expandidos:
+                continue
+            dist_u = dist_v + peso
+            if u in enfileirados:
+                dist_fila, h = enfileirados[u]
+                if dist_fila <= dist_u:
+                    continue
+            elif dist_u == infinito:
+                continue
+            else:
+                h = heuristica(u)
+            enfileirados[u] = dist_u, h
+            heappush(fila, (dist_u + h, next(contador), u, dist_u, v))
+
+    return None, len(expandidos)
+
+def _busca_bidirecional(adjacencia, origem, destino, potencial=None):
+    """
+    Núcleo das buscas bidirecionais. Sem potencial é o Dijkstra
+    bidirecional; com potencial p, a busca direta ordena os nós por
+    d(v) + p(v) e a reversa por d(v) - p(v).
+
+    A busca termina quando a soma dos menores valores das duas filas atinge
+    o melhor caminho já encontrado (mu), o que garante que ele é mínimo.
+
+    Returns:
+        tuple: (caminho em nós internos ou None, nós fixados nos dois sentidos)
+    """
+    if origem == destino:
+        return [origem], 1
+
+    if potencial is None:
+        potencial = lambda v: 0
+    sinais = (1, -1)
+    vizinhos = (adjacencia.sucessores, adjacencia.predecessores)
+    fixados = ({}, {})
+    vistos = ({origem: 0}, {destino: 0})
+    predecessores = ({origem: None}, {destino: None})
+    contador = count()
+    filas = ([(potencial(origem), 0, next(contador), origem)],
+             [(-potencial(destino), 0, next(contador), destino)])
+    infinito = mu = float('inf')
+    encontro = None
+
+    while filas[0] and filas[1]:
+        if filas[0][0][0] + filas[1][0][0] >= mu:
+            break
+        lado = 0 if filas[0][0][0] <= filas[1][0][0] else 1
+        outro = 1 - lado
+        _, dist_v, _, v = heappop(filas[lado])
+        if v in fixados[lado]:
+            continue
+        fixados[lado][v] = dist_v
+
+        for u, peso in vizinhos[lado](v):
+            if u in fixados[lado]:
+                continue
+            dist_u = dist_v + peso
+            if dist_u < vistos[lado].get(u, infinito):
+                vistos[lado][u] = dist_u
+                predecessores[lado][u] = v
+                heappush(filas[lado], (dist_u + sinais[lado] * potencial(u), dist_u, next(contador), u))
+                if u in vistos[outro] and dist_u + vistos[outro][u] < mu:
+                    mu = dist_u + vistos[outro][u]
+                    encontro = u
+
+    total_fixados = len(fixados[0]) + len(fixados[1])
+    if encontro is None:
+        return None, total_fixados
+
+    # Da origem até o encontro pela árvore direta; dali ao destino pela reversa.
+    caminho = _reconstruir_caminho(predecessores[0], encontro)
+    v = predecessores[1][encontro]
+    while v is not None:
+        caminho.append(v)
+        v = predecessores[1][v]
+    return caminho, total_fixados
+
+def _reconstruir_caminho(predecessores, destino):
+    caminho = [destino]
+    while predecessores[caminho[-1]] is not None:
+        caminho.append(predecessores[caminho[-1]])
+    caminho.reverse()
+    return caminho
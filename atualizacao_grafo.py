@@ -0,0 +1,342 @@
+from parser import haversine
+from grafo_csr import GrafoCSR
+from osm_stream import iterar_elementos
+from algoritmos_busca import marcos_preparados, descartar_preparos
+from perfis import velocidades_da_via, tempos_da_aresta
+
+def vias_do_json(arquivo_json):
+    """
+    Lê as vias (ways com tag highway) de um export do OSM, para que o
+    AtualizadorGrafo possa removê-las pelo ID.
+
+    Returns:
+        dict: {ID da via: elemento da via}
+    """
+    return {element['id']: element for element in iterar_elementos(arquivo_json)
+            if element['type'] == 'way' and 'highway' in element.get('tags', {}) and 'nodes' in element}
+
+class AtualizadorGrafo:
+    """
+    Alterações em um grafo já construído (networkx.DiGraph ou GrafoCSR), para
+    refletir interdições e mudanças de trânsito sem reprocessar o export:
+
+    - fechar_aresta() e reabrir_aresta();
+    - definir_multiplicador(): o peso passa a ser o comprimento vezes o fator;
+    - remover_via() e adicionar_via(), pelo ID da via no OSM.
+
+    Os tempos de viagem dos perfis compilados no grafo acompanham o peso:
+    ficam infinitos enquanto a aresta está fechada e são multiplicados pelo
+    mesmo fator.
+
+    No DiGraph as arestas fechadas são retiradas do grafo e voltam com os
+    mesmos atributos ao reabrir. No GrafoCSR recebem peso infinito, que as
+    buscas ignoram; só acrescentar arestas novas reconstrói os arrays.
+
+    Cada alteração incrementa grafo.graph['versao'] e atualiza o que foi
+    pré-calculado sobre o grafo:
+
+    - a hierarquia de contração é descartada, pois os atalhos guardam os
+      pesos antigos, e refeita na próxima consulta que a usar;
+    - as tabelas de marcos são mantidas enquanto nenhum peso ficar abaixo do
+      valor que tinha quando elas foram calculadas (assim a heurística
+      continua admissível e consistente); senão, são descartadas;
+    - os componentes conexos em grafo.graph['componentes'] são descartados
+      quando uma aresta volta a existir ou surge (reabertura ou via nova),
+      pois deixariam de garantir a falta de caminho; a próxima análise em
+      lote os recalcula (ver componentes.componentes_do_grafo);
+    - as coordenadas em radianos que o A* guarda no DiGraph são descartadas
+      quando a estrutura muda (nós novos);
+    - cada objeto em observadores (CacheRotas, IndiceEspacial) recebe
+      grafo_atualizado(grafo, arestas, apenas_aumentos, estrutura) e
+      ajusta o próprio conteúdo.
+    """
+
+    def __init__(self, grafo, vias=None):
+        """
+        Args:
+            grafo: Grafo do NetworkX ou GrafoCSR
+            vias (dict): {ID da via: elemento da via}, como retornado por
+                vias_do_json(), para remover vias que vieram do export.
+        """
+        self.grafo = grafo
+        self.observadores = []
+        self.contadores = {'atualizacoes': 0, 'reconstrucoes': 0, 'hierarquias_descartadas': 0,
+                           'marcos_descartados': 0, 'marcos_mantidos': 0}
+        self._csr = isinstance(grafo, GrafoCSR)
+        self._perfis = list(grafo.graph.get('perfis', {}).values())
+        self._alteradas = {}
+        self._removidas = {}
+        self._vias = {}
+        self._vias_da_aresta = {}
+        self._marcos_de_referencia = None
+        self._pesos_de_referencia = {}
+
+        # Os pesos de um grafo carregado do cache são mapeados somente leitura.
+        if self._csr and not grafo.pesos.flags.writeable:
+            grafo.pesos = grafo.pesos.copy()
+            grafo._mv_pesos = memoryview(grafo.pesos)
+        if self._csr:
+            for nome, pesos_perfil in grafo.pesos_por_perfil.items():
+                if not pesos_perfil.flags.writeable:
+                    grafo.pesos_por_perfil[nome] = pesos_perfil.copy()
+        for via_id, via in (vias or {}).items():
+            self._registrar_via(via_id, self._arestas_da_via(via, lambda no: no in grafo))
+
+    # --- Operações ---
+
+    def fechar_aresta(self, origem_id, destino_id):
+        """
+        Fecha a aresta origem -> destino (interdição).
+        """
+        self._atualizar({(origem_id, destino_id): {'fechada': True}})
+
+    def reabrir_aresta(self, origem_id, destino_id):
+        """
+        Reabre uma aresta fechada por fechar_aresta().
+        """
+        self._atualizar({(origem_id, destino_id): {'fechada': False}})
+
+    def definir_multiplicador(self, origem_id, destino_id, fator):
+        """
+        Define o peso da aresta como o comprimento vezes fator (1 volta ao
+        peso original).
+
+        O fator precisa ser pelo menos 1: os pesos continuam sendo no mínimo
+        a distância em linha reta, e a heurística do A* continua exata.
+        """
+        if not fator >= 1:
+            raise ValueError(f"O multiplicador deve ser maior ou igual a 1, não {fator}.")
+        self._atualizar({(origem_id, destino_id): {'multiplicador': float(fator)}})
+
+    def remover_via(self, via_id):
+        """
+        Fecha todas as arestas de uma via. Segmentos compartilhados com
+        outra via presente continuam abertos.
+        """
+        if via_id not in self._vias:
+            raise ValueError(f"A via {via_id} não está no grafo.")
+        mudancas = {}
+        for aresta in self._vias.pop(via_id):
+            vias = self._vias_da_aresta[aresta]
+            vias.discard(via_id)
+            if not vias and (aresta in self._alteradas or self._existe(aresta)):
+                mudancas[aresta] = {'removida': True}
+        self._atualizar(mudancas)
+
+    def adicionar_via(self, via, coordenadas=None):
+        """
+        Acrescenta uma via no formato do export do OSM (id, nodes, tags),
+        com as mesmas regras de criar_grafo_do_json: um segmento por par
+        de nós consecutivos e a volta nas vias sem oneway=yes.
+
+        Args:
+            via (dict): Elemento da via.
+            coordenadas (dict): {ID do nó: (lat, lon)} dos nós da via que
+                ainda não estão no grafo.
+        """
+        via_id = via['id']
+        if via_id in self._vias:
+            raise ValueError(f"A via {via_id} já está no grafo.")
+        coordenadas = coordenadas or {}
+        grafo = self.grafo
+        arestas = self._arestas_da_via(via, lambda no: no in grafo or no in coordenadas)
+
+        def posicao(no):
+            if no in coordenadas:
+                return coordenadas[no]
+            dados = grafo.nodes[no]
+            return dados['lat'], dados['lon']
+
+        nos_novos = {no: tuple(coordenadas[no]) for aresta in arestas for no in aresta if no not in grafo}
+        nome = via['tags'].get('name', 'unknown')
+        tipo = via['tags'].get('highway', 'unclassified')
+        velocidades = velocidades_da_via(via['tags'], self._perfis)
+        mudancas, novas, tempos_novas = {}, [], []
+        for origem, destino in arestas:
+            comprimento = haversine(*posicao(origem), *posicao(destino))
+            tempos = tempos_da_aresta(comprimento, velocidades, self._perfis)
+            if (origem, destino) in self._alteradas or self._existe((origem, destino)):
+                mudancas[(origem, destino)] = {'comprimento': comprimento, 'removida': False,
+                                               'tempos': {p.nome: tempos[p.atributo] for p in self._perfis}}
+            else:
+                novas.append((origem, destino, comprimento, nome, tipo))
+                tempos_novas.append(tempos)
+
+        if nos_novos or novas:
+            self.contadores['reconstrucoes'] += 1
+            if self._csr:
+                grafo.acrescentar(nos_novos, novas, {p.nome: [tempos[p.atributo] for tempos in tempos_novas]
+                                                     for p in self._perfis})
+            else:
+                for no, (lat, lon) in nos_novos.items():
+                    grafo.add_node(no, lat=lat, lon=lon)
+                for (origem, destino, comprimento, nome_da_rua, tipo_da_rua), tempos in zip(novas, tempos_novas):
+                    grafo.add_edge(origem, destino, weight=comprimento, name=nome_da_rua, highway=tipo_da_rua,
+                                   **tempos)
+        self._registrar_via(via_id, arestas)
+
+        # Uma aresta nova equivale a uma aresta que tinha peso infinito.
+        variacoes = self._alterar(mudancas)
+        variacoes.update({(origem, destino): (float('inf'), comprimento)
+                          for origem, destino, comprimento, _, _ in novas})
+        self._notificar(variacoes, estrutura=bool(nos_novos or novas))
+
+    def peso(self, origem_id, destino_id):
+        """
+        Peso atual da aresta (inf se estiver fechada ou removida).
+        """
+        aresta = (origem_id, destino_id)
+        if aresta not in self._alteradas and not self._existe(aresta):
+            raise ValueError(f"A aresta {origem_id} -> {destino_id} não está no grafo.")
+        return self._peso_atual(aresta)
+
+    # --- Estado das arestas ---
+
+    def _atualizar(self, mudancas):
+        self._notificar(self._alterar(mudancas), estrutura=False)
+
+    def _alterar(self, mudancas):
+        """
+        Aplica as mudanças de estado e grava os novos pesos no grafo.
+
+        Returns:
+            dict: {aresta: (peso anterior, peso novo)}
+        """
+        estados = {aresta: self._estado(aresta) for aresta in mudancas}
+        marcos = marcos_preparados(self.grafo)
+        if marcos is not self._marcos_de_referencia:
+            # Tabelas novas foram calculadas com os pesos atuais.
+            self._marcos_de_referencia = marcos
+            self._pesos_de_referencia = {}
+
+        variacoes = {}
+        for aresta, campos in mudancas.items():
+            estado = estados[aresta]
+            anterior = _peso_efetivo(estado)
+            if marcos is not None:
+                self._pesos_de_referencia.setdefault(aresta, anterior)
+            estado.update(campos)
+            novo = _peso_efetivo(estado)
+            if novo != anterior or 'tempos' in campos:
+                self._escrever(aresta, estado)
+            variacoes[aresta] = (anterior, novo)
+        return variacoes
+
+    def _estado(self, aresta):
+        estado = self._alteradas.get(aresta)
+        if estado is None:
+            if not self._existe(aresta):
+                raise ValueError(f"A aresta {aresta[0]} -> {aresta[1]} não está no grafo.")
+            estado = self._alteradas[aresta] = {'comprimento': self._peso_atual(aresta), 'multiplicador': 1.0,
+                                                'fechada': False, 'removida': False,
+                                                'tempos': self._tempos_atuais(aresta)}
+        return estado
+
+    def _existe(self, aresta):
+        return self.grafo.has_edge(*aresta)
+
+    def _peso_atual(self, aresta):
+        origem, destino = aresta
+        if self._csr:
+            grafo = self.grafo
+            return grafo._mv_pesos[grafo._aresta(grafo.indice(origem), grafo.indice(destino))]
+        if self.grafo.has_edge(origem, destino):
+            return self.grafo[origem][destino].get('weight', 1)
+        return float('inf')
+
+    def _tempos_atuais(self, aresta):
+        # Tempo de viagem da aresta em cada perfil, sem multiplicador.
+        origem, destino = aresta
+        grafo = self.grafo
+        if self._csr:
+            e = grafo._aresta(grafo.indice(origem), grafo.indice(destino))
+            return {p.nome: float(grafo.pesos_do_perfil(p.nome)[e]) for p in self._perfis}
+        dados = grafo[origem][destino]
+        return {p.nome: dados.get(p.atributo, float('inf')) for p in self._perfis}
+
+    def _escrever(self, aresta, estado):
+        origem, destino = aresta
+        grafo = self.grafo
+        peso = _peso_efetivo(estado)
+        tempos = _tempos_efetivos(estado)
+        if self._csr:
+            i, j = grafo.indice(origem), grafo.indice(destino)
+            e = grafo._aresta(i, j)
+            grafo.pesos[e] = peso
+            for nome, tempo in tempos.items():
+                grafo.pesos_por_perfil[nome][e] = tempo
+            if grafo._reverso is not None:
+                offsets, origens, pesos = grafo._reverso
+                for r in range(offsets[j], offsets[j + 1]):
+                    if origens[r] == i:
+                        pesos[r] = peso
+                        break
+        elif peso == float('inf'):
+            if grafo.has_edge(origem, destino):
+                self._removidas[aresta] = grafo[origem][destino]
+                grafo.remove_edge(origem, destino)
+        else:
+            if not grafo.has_edge(origem, destino):
+                grafo.add_edge(origem, destino, **self._removidas.pop(aresta))
+            dados = grafo[origem][destino]
+            dados['weight'] = peso
+            for perfil in self._perfis:
+                dados[perfil.atributo] = tempos[perfil.nome]
+
+    # --- Vias ---
+
+    def _arestas_da_via(self, via, conhecido):
+        # Mesmas regras de parser._segmentos_das_vias.
+        nos = via['nodes']
+        mao_unica = via.get('tags', {}).get('oneway') == 'yes'
+        arestas = {}
+        for origem, destino in zip(nos, nos[1:]):
+            if conhecido(origem) and conhecido(destino):
+                arestas[(origem, destino)] = None
+                if not mao_unica:
+                    arestas[(destino, origem)] = None
+        return list(arestas)
+
+    def _registrar_via(self, via_id, arestas):
+        self._vias[via_id] = arestas
+        for aresta in arestas:
+            self._vias_da_aresta.setdefault(aresta, set()).add(via_id)
+
+    # --- Estruturas dependentes ---
+
+    def _notificar(self, variacoes, estrutura):
+        grafo = self.grafo
+        grafo.graph['versao'] = grafo.graph.get('versao', 0) + 1
+        self.contadores['atualizacoes'] += 1
+        apenas_aumentos = not estrutura and all(novo >= anterior for anterior, novo in variacoes.values())
+        infinito = float('inf')
+        if estrutura or any(anterior == infinito and novo < infinito for anterior, novo in variacoes.values()):
+            grafo.graph.pop('componentes', None)
+        if estrutura:
+            # Nós novos ficariam de fora das coordenadas pré-calculadas do A*.
+            grafo.graph.pop('_coordenadas_radianos', None)
+
+        if descartar_preparos(grafo, marcos=False)[0]:
+            self.contadores['hierarquias_descartadas'] += 1
+        if self._marcos_de_referencia is not None:
+            referencia = self._pesos_de_referencia
+            if estrutura or any(novo < referencia[aresta] for aresta, (_, novo) in variacoes.items()):
+                descartar_preparos(grafo, hierarquia=False)
+                self._marcos_de_referencia = None
+                self._pesos_de_referencia = {}
+                self.contadores['marcos_descartados'] += 1
+            else:
+                self.contadores['marcos_mantidos'] += 1
+
+        for observador in self.observadores:
+            observador.grafo_atualizado(grafo, list(variacoes), apenas_aumentos, estrutura)
+
+def _peso_efetivo(estado):
+    if estado['fechada'] or estado['removida']:
+        return float('inf')
+    return estado['comprimento'] * estado['multiplicador']
+
+def _tempos_efetivos(estado):
+    fechada = estado['fechada'] or estado['removida']
+    return {nome: float('inf') if fechada else tempo * estado['multiplicador']
+            for nome, tempo in estado['tempos'].items()}
@@ -0,0 +1,149 @@
+# Mede o AtualizadorGrafo: vazão de cada tipo de atualização e latência das
+# consultas logo depois de um lote de atualizações, comparadas com recriar
+# o grafo a partir do JSON.
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+from parser import criar_grafo_do_json
+from algoritmos_busca import (dijkstra, a_estrela, a_estrela_alt, hierarquia_contracao, preparar_marcos,
+                              preparar_hierarquia, marcos_preparados)
+from atualizacao_grafo import AtualizadorGrafo, vias_do_json
+from cache_rotas import CacheRotas
+from indice_espacial import IndiceEspacial
+from dados_sinteticos import gerar_grade
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+def distancia(grafo, caminho):
+    if caminho is None:
+        return None
+    return sum(grafo[u][v]['weight'] for u, v in zip(caminho, caminho[1:]))
+
+def carregar(arquivo_json, compacto):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return criar_grafo_do_json(arquivo_json, compacto=compacto)
+
+def medir_vazao(arquivo_json, compacto, vias, quantidade):
+    grafo = carregar(arquivo_json, compacto)
+    atualizador = AtualizadorGrafo(grafo, vias)
+    rng = random.Random(0)
+    arestas = rng.sample(list(grafo.edges()), min(quantidade, grafo.number_of_edges()))
+    ids_vias = rng.sample(list(vias), min(quantidade, len(vias)))
+
+    operacoes = [
+        ('fechar_aresta', lambda: [atualizador.fechar_aresta(*a) for a in arestas], len(arestas)),
+        ('reabrir_aresta', lambda: [atualizador.reabrir_aresta(*a) for a in arestas], len(arestas)),
+        ('definir_multiplicador', lambda: [atualizador.definir_multiplicador(*a, 1.5) for a in arestas],
+         len(arestas)),
+        ('remover_via', lambda: [atualizador.remover_via(v) for v in ids_vias], len(ids_vias)),
+        ('adicionar_via', lambda: [atualizador.adicionar_via(vias[v]) for v in ids_vias], len(ids_vias)),
+    ]
+    print(f"{'Operacao':<24}{'Quantidade':>12}{'Por operacao (us)':>20}{'Operacoes/s':>14}")
+    for nome, executar, total in operacoes:
+        inicio = time.perf_counter()
+        executar()
+        duracao = time.perf_counter() - inicio
+        print(f"{nome:<24}{total:>12}{duracao / total * 1e6:>20.1f}{total / duracao:>14.0f}")
+
+def medir_consultas(grafo, funcao, pares):
+    tempos, distancias = [], []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for origem, destino in pares:
+            inicio = time.perf_counter()
+            caminho = funcao(grafo, origem, destino)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+            distancias.append(distancia(grafo, caminho))
+    return tempos, distancias
+
+def medir_lote(arquivo_json, compacto, vias, tamanho_lote, consultas):
+    grafo = carregar(arquivo_json, compacto)
+    atualizador = AtualizadorGrafo(grafo, vias)
+    cache = CacheRotas()
+    atualizador.observadores += [cache, IndiceEspacial(grafo)]
+    rng = random.Random(1)
+    nos = list(grafo.nodes())
+    pares = [(rng.choice(nos), rng.choice(nos)) for _ in range(consultas)]
+
+    inicio = time.perf_counter()
+    preparar_marcos(grafo)
+    tempo_marcos = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    preparar_hierarquia(grafo)
+    tempo_hierarquia = time.perf_counter() - inicio
+    with contextlib.redirect_stdout(io.StringIO()):
+        for origem, destino in pares:
+            cache.rota(grafo, origem, destino)
+
+    # As rotas devolvidas são cópias: alterar uma não muda as próximas respostas.
+    origem, destino = next((o, d) for o, d in pares if cache.rota(grafo, o, d))
+    devolvida = cache.rota(grafo, origem, destino)
+    devolvida.append(None)
+    assert cache.rota(grafo, origem, destino) == devolvida[:-1], "o cache devolveu a propria lista guardada"
+
+    # Lote típico de trânsito: interdições, lentidão e algumas vias removidas.
+    arestas = list(grafo.edges())
+    ids_vias = list(vias)
+    inicio = time.perf_counter()
+    for _ in range(tamanho_lote):
+        sorteio = rng.random()
+        if sorteio < 0.4:
+            atualizador.fechar_aresta(*rng.choice(arestas))
+        elif sorteio < 0.9:
+            atualizador.definir_multiplicador(*rng.choice(arestas), rng.uniform(1.0, 3.0))
+        elif ids_vias:
+            atualizador.remover_via(ids_vias.pop(rng.randrange(len(ids_vias))))
+    tempo_lote = time.perf_counter() - inicio
+    print(f"Lote de {tamanho_lote} atualizacoes em {tempo_lote * 1000:.1f} ms; "
+          f"marcos {'mantidos' if marcos_preparados(grafo) is not None else 'descartados'} "
+          f"(calculados em {tempo_marcos:.2f} s), hierarquia descartada (construida em {tempo_hierarquia:.2f} s); "
+          f"cache com {cache.estatisticas()['entradas']} de {consultas} rotas ainda validas")
+
+    _, referencias = medir_consultas(grafo, dijkstra, pares)
+    algoritmos = [
+        ('dijkstra', dijkstra),
+        ('a_estrela', a_estrela),
+        ('a_estrela_alt', a_estrela_alt),
+        ('hierarquia_contracao', hierarquia_contracao),
+        ('cache + dijkstra', lambda g, o, d: cache.rota(g, o, d)),
+    ]
+    print(f"{'Consulta apos o lote':<24}{'Media (ms)':>12}{'p50 (ms)':>10}{'p99 (ms)':>10}{'1a (ms)':>10}{'Iguais':>10}")
+    for nome, funcao in algoritmos:
+        tempos, distancias = medir_consultas(grafo, funcao, pares)
+        iguais = sum((d is None and r is None) or (d is not None and r is not None and abs(d - r) < 1e-6)
+                     for d, r in zip(distancias, referencias))
+        print(f"{nome:<24}{sum(tempos) / len(tempos):>12.3f}{percentil(tempos, 50):>10.3f}"
+              f"{percentil(tempos, 99):>10.3f}{tempos[0]:>10.1f}{iguais:>6}/{len(pares)}")
+
+def medir(nome, arquivo_json, quantidade, tamanho_lote, consultas):
+    vias = vias_do_json(arquivo_json)
+    for compacto in (False, True):
+        inicio = time.perf_counter()
+        grafo = carregar(arquivo_json, compacto)
+        tempo_recriar = time.perf_counter() - inicio
+        print(f"\n{nome} ({'GrafoCSR' if compacto else 'networkx'}): {grafo.number_of_nodes()} nos, "
+              f"{grafo.number_of_edges()} arestas, {len(vias)} vias; recriar do JSON: {tempo_recriar:.2f} s")
+        medir_vazao(arquivo_json, compacto, vias, quantidade)
+        medir_lote(arquivo_json, compacto, vias, tamanho_lote, consultas)
+
+if __name__ == "__main__":
+    argumentos = argparse.ArgumentParser(description="Benchmark das atualizacoes incrementais do grafo")
+    argumentos.add_argument('--arquivo', default='exporty.json')
+    argumentos.add_argument('--grades', type=int, nargs='*', default=[60],
+                            help="Lados das grades sinteticas (nos = lado * lado)")
+    argumentos.add_argument('--quantidade', type=int, default=1000, help="Operacoes medidas por tipo")
+    argumentos.add_argument('--lote', type=int, default=1000, help="Atualizacoes antes das consultas")
+    argumentos.add_argument('--consultas', type=int, default=200)
+    args = argumentos.parse_args()
+
+    medir(args.arquivo, args.arquivo, args.quantidade, args.lote, args.consultas)
+    with tempfile.TemporaryDirectory() as pasta:
+        for lado in args.grades:
+            arquivo_grade = os.path.join(pasta, f'grade_{lado}.json')
+            gerar_grade(arquivo_grade, lado, lado)
+            medir(f"Grade {lado}x{lado}", arquivo_grade, args.quantidade, args.lote, args.consultas)
@@ -0,0 +1,58 @@
+# Ganho da verificação por componentes conexos: as mesmas consultas ponto a
+# ponto com e sem os componentes em grafo.graph (sem eles a busca decide
+# sozinha que não há caminho), separando os pares alcançáveis dos demais.
+import argparse
+import contextlib
+import io
+import random
+import time
+from parser import criar_grafo_do_json
+from algoritmos_busca import ALGORITMOS
+from componentes import calcular_componentes, pode_alcancar
+
+def medir_consultas(grafo, funcao, pares):
+    tempo, fixados, caminhos = 0.0, 0, []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for origem, destino in pares:
+            estatisticas = {}
+            inicio = time.perf_counter()
+            caminhos.append(funcao(grafo, origem, destino, estatisticas=estatisticas))
+            tempo += time.perf_counter() - inicio
+            fixados += estatisticas.get('nos_fixados', 0)
+    return tempo * 1000 / max(len(pares), 1), fixados // max(len(pares), 1), caminhos
+
+def medir(arquivo_json, consultas):
+    for compacto in (False, True):
+        with contextlib.redirect_stdout(io.StringIO()):
+            grafo = criar_grafo_do_json(arquivo_json, compacto=compacto)
+        inicio = time.perf_counter()
+        componentes = calcular_componentes(grafo)
+        duracao = time.perf_counter() - inicio
+        print(f"\n{arquivo_json} ({'GrafoCSR' if compacto else 'networkx'}): {grafo.number_of_nodes()} nos, "
+              f"{componentes.num_fortes} componentes fortes e {componentes.num_fracos} fracos "
+              f"calculados em {duracao:.3f} s")
+
+        rng = random.Random(0)
+        nos = sorted(grafo.nodes())
+        pares = [(rng.choice(nos), rng.choice(nos)) for _ in range(consultas)]
+        descartados = [par for par in pares if not pode_alcancar(grafo, *par)]
+        print(f"{len(descartados)} de {len(pares)} pares descartados sem busca")
+        if not descartados:
+            continue
+
+        print(f"{'Algoritmo':<26}{'Sem (ms)':>10}{'Com (ms)':>10}{'Fixados':>16}{'Ganho':>8}{'Iguais':>10}")
+        for algoritmo, funcao in ALGORITMOS.items():
+            grafo.graph.pop('componentes', None)
+            tempo_sem, fixados_sem, referencia = medir_consultas(grafo, funcao, descartados)
+            grafo.graph['componentes'] = componentes
+            tempo_com, fixados_com, caminhos = medir_consultas(grafo, funcao, descartados)
+            iguais = sum(c == r for c, r in zip(caminhos, referencia))
+            print(f"{algoritmo:<26}{tempo_sem:>10.3f}{tempo_com:>10.3f}{fixados_sem:>8}->{fixados_com:<6}"
+                  f"{tempo_sem / max(tempo_com, 1e-9):>7.0f}x{iguais:>6}/{len(descartados)}")
+
+if __name__ == "__main__":
+    argumentos = argparse.ArgumentParser(description="Benchmark da verificacao por componentes conexos")
+    argumentos.add_argument('--arquivo', default='exporty.json')
+    argumentos.add_argument('--consultas', type=int, default=2000)
+    args = argumentos.parse_args()
+    medir(args.arquivo, args.consultas)
@@ -0,0 +1,63 @@
+# Compara o grafo networkx com o GrafoCSR em memória, tempo de construção
+# e tempo de consulta.
+import argparse
+import contextlib
+import gc
+import io
+import random
+import time
+import tracemalloc
+from parser import criar_grafo_do_json
+from algoritmos_busca import dijkstra, a_estrela
+
+def medir_construcao(arquivo, compacto):
+    """
+    Constrói o grafo e mede o tempo gasto e a memória que continua ocupada
+    por ele depois da construção.
+
+    Returns:
+        tuple: (grafo, segundos, bytes_retidos)
+    """
+    gc.collect()
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        grafo = criar_grafo_do_json(arquivo, compacto=compacto)
+    segundos = time.perf_counter() - inicio
+    gc.collect()
+    retidos = tracemalloc.get_traced_memory()[0] - antes
+    tracemalloc.stop()
+    return grafo, segundos, retidos
+
+def medir_consultas(grafo, pares, funcao):
+    """
+    Executa a função de busca para cada par e retorna o tempo médio em ms.
+    """
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for origem, destino in pares:
+            funcao(grafo, origem, destino)
+    return (time.perf_counter() - inicio) / len(pares) * 1000
+
+if __name__ == "__main__":
+    argumentos = argparse.ArgumentParser(description="Benchmark networkx x GrafoCSR")
+    argumentos.add_argument('--arquivo', default='exporty.json')
+    argumentos.add_argument('--consultas', type=int, default=200)
+    argumentos.add_argument('--semente', type=int, default=42)
+    args = argumentos.parse_args()
+
+    grafo_nx, tempo_nx, memoria_nx = medir_construcao(args.arquivo, compacto=False)
+    grafo_csr, tempo_csr, memoria_csr = medir_construcao(args.arquivo, compacto=True)
+
+    rng = random.Random(args.semente)
+    nos = list(grafo_nx.nodes())
+    pares = [(rng.choice(nos), rng.choice(nos)) for _ in range(args.consultas)]
+
+    print(f"Grafo: {grafo_nx.number_of_nodes()} nos, {grafo_nx.number_of_edges()} arestas")
+    print(f"{'':<22}{'networkx':>14}{'GrafoCSR':>14}")
+    print(f"{'Construcao (s)':<22}{tempo_nx:>14.3f}{tempo_csr:>14.3f}")
+    print(f"{'Memoria retida (MB)':<22}{memoria_nx / 1e6:>14.2f}{memoria_csr / 1e6:>14.2f}")
+    for nome, funcao in (('Dijkstra (ms)', dijkstra), ('A* (ms)', a_estrela)):
+        print(f"{nome:<22}{medir_consultas(grafo_nx, pares, funcao):>14.3f}"
+              f"{medir_consultas(grafo_csr, pares, funcao):>14.3f}")
@@ -0,0 +1,88 @@
+# Mede o custo do pré-processamento de Contraction Hierarchies e a latência
+# das consultas, comparando com Dijkstra e Dijkstra bidirecional, e confere
+# se as distâncias batem com as do Dijkstra.
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+from parser import criar_grafo_do_json
+from algoritmos_busca import dijkstra, dijkstra_bidirecional, hierarquia_contracao, preparar_hierarquia
+from hierarquia_contracao import construir_hierarquia, salvar_hierarquia, carregar_hierarquia
+from dados_sinteticos import gerar_grade
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+def distancia(grafo, caminho):
+    if caminho is None:
+        return None
+    return sum(grafo[u][v]['weight'] for u, v in zip(caminho, caminho[1:]))
+
+def medir(nome, grafo, consultas):
+    print(f"\n{nome}: {grafo.number_of_nodes()} nos, {grafo.number_of_edges()} arestas")
+
+    inicio = time.perf_counter()
+    hierarquia = construir_hierarquia(grafo)
+    tempo_construcao = time.perf_counter() - inicio
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho_pasta = os.path.join(pasta, 'ch')
+        inicio = time.perf_counter()
+        salvar_hierarquia(hierarquia, caminho_pasta)
+        tempo_gravacao = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        hierarquia = carregar_hierarquia(caminho_pasta, grafo)
+        tempo_carga = time.perf_counter() - inicio
+        preparar_hierarquia(grafo, hierarquia)
+
+        print(f"Pre-processamento: {tempo_construcao:.2f} s, {hierarquia.numero_de_atalhos()} atalhos "
+              f"({hierarquia.numero_de_arestas()} arestas na hierarquia)")
+        print(f"Gravacao: {tempo_gravacao * 1000:.1f} ms, carga: {tempo_carga * 1000:.1f} ms")
+
+        rng = random.Random(0)
+        nos = list(grafo.nodes())
+        pares = [(rng.choice(nos), rng.choice(nos)) for _ in range(consultas)]
+
+        referencias = None
+        print(f"{'Algoritmo':<24}{'Media (ms)':>12}{'p50 (ms)':>10}{'p99 (ms)':>10}{'Nos fixados':>13}{'Iguais':>10}")
+        for nome_algoritmo, funcao in (('dijkstra', dijkstra), ('dijkstra_bidirecional', dijkstra_bidirecional),
+                                       ('hierarquia_contracao', hierarquia_contracao)):
+            tempos, distancias, fixados = [], [], 0
+            with contextlib.redirect_stdout(io.StringIO()):
+                for origem, destino in pares:
+                    estatisticas = {}
+                    inicio = time.perf_counter()
+                    caminho = funcao(grafo, origem, destino, estatisticas=estatisticas)
+                    tempos.append((time.perf_counter() - inicio) * 1000)
+                    distancias.append(distancia(grafo, caminho))
+                    fixados += estatisticas['nos_fixados']
+            if referencias is None:
+                referencias = distancias
+            iguais = sum((d is None and r is None) or (d is not None and r is not None and abs(d - r) < 1e-6)
+                         for d, r in zip(distancias, referencias))
+            print(f"{nome_algoritmo:<24}{sum(tempos) / len(tempos):>12.3f}{percentil(tempos, 50):>10.3f}"
+                  f"{percentil(tempos, 99):>10.3f}{fixados // len(pares):>13}{iguais:>6}/{len(pares)}")
+
+if __name__ == "__main__":
+    argumentos = argparse.ArgumentParser(description="Benchmark de Contraction Hierarchies")
+    argumentos.add_argument('--arquivo', default='exporty.json')
+    argumentos.add_argument('--grades', type=int, nargs='*', default=[50, 100],
+                            help="Lados das grades sinteticas (nos = lado * lado)")
+    argumentos.add_argument('--consultas', type=int, default=300)
+    args = argumentos.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        grafo = criar_grafo_do_json(args.arquivo, compacto=True)
+    medir(args.arquivo, grafo, args.consultas)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        for lado in args.grades:
+            arquivo_grade = os.path.join(pasta, f'grade_{lado}.json')
+            gerar_grade(arquivo_grade, lado, lado)
+            with contextlib.redirect_stdout(io.StringIO()):
+                grafo = criar_grafo_do_json(arquivo_grade, compacto=True)
+            medir(f"Grade {lado}x{lado}", grafo, args.consultas)
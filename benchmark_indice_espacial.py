@@ -0,0 +1,88 @@
+# Compara o ajuste de coordenadas GPS ao grafo feito pelo IndiceEspacial
+# com a varredura de todos os nós: latência por consulta, consultas em lote
+# e concordância com a varredura.
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+import numpy as np
+from parser import criar_grafo_do_json, haversine, haversine_vetorizado
+from indice_espacial import IndiceEspacial
+from dados_sinteticos import gerar_grade
+
+def varredura_python(grafo, lat, lon):
+    # O que se faria sem índice: percorrer grafo.nodes(data=True).
+    return min(grafo.nodes(data=True), key=lambda item: haversine(lat, lon, item[1]['lat'], item[1]['lon']))[0]
+
+def varredura_numpy(ids, lats_nos, lons_nos, lat, lon):
+    return ids[np.argmin(haversine_vetorizado(lat, lon, lats_nos, lons_nos))]
+
+def medir(nome, grafo, consultas):
+    print(f"\n{nome}: {grafo.number_of_nodes()} nos, {grafo.number_of_edges()} arestas")
+    inicio = time.perf_counter()
+    indice = IndiceEspacial(grafo, arestas=True)
+    print(f"Construcao do indice (nos e arestas): {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(indice.lat.min(), indice.lat.max(), consultas)
+    lons = rng.uniform(indice.lon.min(), indice.lon.max(), consultas)
+
+    # A varredura em Python é lenta demais para todas as consultas.
+    amostra = min(consultas, 100)
+    inicio = time.perf_counter()
+    esperados_python = [varredura_python(grafo, lat, lon) for lat, lon in zip(lats[:amostra], lons[:amostra])]
+    tempo_python = (time.perf_counter() - inicio) / amostra
+
+    inicio = time.perf_counter()
+    esperados = [varredura_numpy(indice.ids, indice.lat, indice.lon, lat, lon) for lat, lon in zip(lats, lons)]
+    tempo_numpy = (time.perf_counter() - inicio) / consultas
+
+    inicio = time.perf_counter()
+    individuais = [indice.no_mais_proximo(lat, lon)[0] for lat, lon in zip(lats, lons)]
+    tempo_indice = (time.perf_counter() - inicio) / consultas
+
+    inicio = time.perf_counter()
+    em_lote, _ = indice.nos_mais_proximos(lats, lons)
+    tempo_lote = (time.perf_counter() - inicio) / consultas
+
+    inicio = time.perf_counter()
+    for lat, lon in zip(lats, lons):
+        indice.aresta_mais_proxima(lat, lon)
+    tempo_aresta = (time.perf_counter() - inicio) / consultas
+
+    inicio = time.perf_counter()
+    indice.arestas_mais_proximas(lats, lons)
+    tempo_aresta_lote = (time.perf_counter() - inicio) / consultas
+
+    iguais = sum(int(a) == int(b) for a, b in zip(individuais, esperados))
+    iguais_lote = sum(int(a) == int(b) for a, b in zip(em_lote, esperados))
+    iguais_python = sum(int(a) == int(b) for a, b in zip(esperados_python, esperados[:amostra]))
+    print(f"{'Metodo':<34}{'Por consulta (us)':>18}{'Iguais':>14}")
+    print(f"{'varredura grafo.nodes (Python)':<34}{tempo_python * 1e6:>18.1f}{iguais_python:>8}/{amostra}")
+    print(f"{'varredura vetorizada (numpy)':<34}{tempo_numpy * 1e6:>18.1f}{'referencia':>14}")
+    print(f"{'indice, no mais proximo':<34}{tempo_indice * 1e6:>18.1f}{iguais:>8}/{consultas}")
+    print(f"{'indice, no mais proximo em lote':<34}{tempo_lote * 1e6:>18.1f}{iguais_lote:>8}/{consultas}")
+    print(f"{'indice, aresta mais proxima':<34}{tempo_aresta * 1e6:>18.1f}")
+    print(f"{'indice, aresta mais proxima em lote':<34}{tempo_aresta_lote * 1e6:>18.1f}")
+
+if __name__ == "__main__":
+    argumentos = argparse.ArgumentParser(description="Benchmark do indice espacial")
+    argumentos.add_argument('--arquivo', default='exporty.json')
+    argumentos.add_argument('--grades', type=int, nargs='*', default=[300],
+                            help="Lados das grades sinteticas (nos = lado * lado)")
+    argumentos.add_argument('--consultas', type=int, default=5000)
+    args = argumentos.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        grafo = criar_grafo_do_json(args.arquivo)
+    medir(args.arquivo, grafo, args.consultas)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        for lado in args.grades:
+            arquivo_grade = os.path.join(pasta, f'grade_{lado}.json')
+            gerar_grade(arquivo_grade, lado, lado)
+            with contextlib.redirect_stdout(io.StringIO()):
+                grafo = criar_grafo_do_json(arquivo_grade, compacto=True)
+            medir(f"Grade {lado}x{lado}", grafo, args.consultas)
@@ -0,0 +1,64 @@
+# Compara a leitura com json.load (criar_grafo_do_json) com a leitura
+# incremental (criar_grafo_streaming): tempo de construção e pico de memória.
+# Cada medição roda em um processo separado para que o pico de RSS de uma
+# não contamine a outra.
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from dados_sinteticos import ampliar_export
+
+CARREGADORES = ('json.load', 'json.load compacto', 'streaming', 'streaming compacto')
+
+def medir(carregador, arquivo):
+    """
+    Constrói o grafo no processo atual e retorna o tempo e o pico de RSS.
+    """
+    import contextlib
+    import io
+    import resource
+    import time
+    from parser import criar_grafo_do_json
+
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        grafo = criar_grafo_do_json(arquivo, compacto='compacto' in carregador,
+                                    streaming=carregador.startswith('streaming'))
+    segundos = time.perf_counter() - inicio
+    # ru_maxrss é dado em KB no Linux.
+    pico_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {'segundos': segundos, 'pico_rss_mb': pico_mb,
+            'nos': grafo.number_of_nodes(), 'arestas': grafo.number_of_edges()}
+
+def medir_em_subprocesso(carregador, arquivo):
+    saida = subprocess.run([sys.executable, __file__, '--medir', carregador, arquivo],
+                           capture_output=True, text=True, check=True)
+    return json.loads(saida.stdout)
+
+def imprimir_tabela(arquivo):
+    tamanho_mb = os.path.getsize(arquivo) / 1e6
+    print(f"\n{arquivo} ({tamanho_mb:.1f} MB)")
+    print(f"{'Carregador':<22}{'Tempo (s)':>12}{'Pico RSS (MB)':>16}{'Nos':>10}{'Arestas':>10}")
+    for carregador in CARREGADORES:
+        r = medir_em_subprocesso(carregador, arquivo)
+        print(f"{carregador:<22}{r['segundos']:>12.2f}{r['pico_rss_mb']:>16.1f}{r['nos']:>10}{r['arestas']:>10}")
+
+if __name__ == "__main__":
+    argumentos = argparse.ArgumentParser(description="Benchmark de leitura do export do OSM")
+    argumentos.add_argument('--arquivo', default='exporty.json')
+    argumentos.add_argument('--fator', type=int, default=10, help="Tamanho do export sintetico")
+    argumentos.add_argument('--medir', nargs=2, metavar=('CARREGADOR', 'ARQUIVO'), help=argparse.SUPPRESS)
+    args = argumentos.parse_args()
+
+    if args.medir:
+        print(json.dumps(medir(*args.medir)))
+        sys.exit(0)
+
+    imprimir_tabela(args.arquivo)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        arquivo_ampliado = os.path.join(pasta, f'export_x{args.fator}.json')
+        ampliar_export(args.arquivo, arquivo_ampliado, args.fator)
+        imprimir_tabela(arquivo_ampliado)
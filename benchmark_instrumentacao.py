@@ -0,0 +1,122 @@
+# Custo da instrumentação das buscas. Para cada algoritmo instrumentado,
+# compara nos mesmos pares de nós:
+#   - referência: o núcleo da busca chamado direto, sem nenhuma verificação
+#     de instrumentação (o que as funções públicas faziam antes dela);
+#   - desligada: a função pública sem o argumento instrumentacao;
+#   - ligada: a função pública com uma Instrumentacao.
+# No networkx, dijkstra() e a_estrela() sem estatísticas nem instrumentação
+# chamam nx.dijkstra_path/nx.astar_path, e com elas a implementação
+# própria. Para que desligada e ligada passem pelo mesmo código, nesse grafo
+# as duas recebem estatisticas={} (que só força a implementação própria).
+# As três são medidas alternadamente em cada par, com o menor tempo de
+# algumas repetições, para que a variação da máquina afete todas igualmente.
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+from parser import criar_grafo_do_json
+from algoritmos_busca import (dijkstra, a_estrela, a_estrela_alt, preparar_marcos, _Adjacencia,
+                              _arvore_dijkstra, _a_estrela, _reconstruir_caminho, _marcos)
+from grafo_csr import GrafoCSR
+from instrumentacao import Instrumentacao
+from dados_sinteticos import gerar_grade
+
+def referencia_dijkstra(grafo, origem_id, destino_id):
+    adjacencia = _Adjacencia(grafo)
+    origem, destino = adjacencia.no(origem_id), adjacencia.no(destino_id)
+    distancias, _, predecessores = _arvore_dijkstra(adjacencia.sucessores, origem, destino)
+    if destino in distancias:
+        return adjacencia.caminho(_reconstruir_caminho(predecessores, destino))
+    return None
+
+def referencia_a_estrela(grafo, origem_id, destino_id):
+    adjacencia = _Adjacencia(grafo)
+    origem, destino = adjacencia.no(origem_id), adjacencia.no(destino_id)
+    predecessores, _ = _a_estrela(adjacencia.sucessores, adjacencia.estimativa_ate(destino), origem, destino)
+    if predecessores is not None:
+        return adjacencia.caminho(_reconstruir_caminho(predecessores, destino))
+    return None
+
+def referencia_a_estrela_alt(grafo, origem_id, destino_id):
+    marcos = _marcos[grafo]
+    adjacencia = _Adjacencia(grafo)
+    origem, destino = adjacencia.no(origem_id), adjacencia.no(destino_id)
+    if isinstance(grafo, GrafoCSR):
+        heuristica = marcos.heuristica(destino, origem)
+    else:
+        posicoes = marcos.posicoes()
+        limite_inferior = marcos.heuristica(posicoes[destino], posicoes[origem])
+        heuristica = lambda v: limite_inferior(posicoes[v])
+    predecessores, _ = _a_estrela(adjacencia.sucessores, heuristica, origem, destino)
+    if predecessores is not None:
+        return adjacencia.caminho(_reconstruir_caminho(predecessores, destino))
+    return None
+
+ALGORITMOS = (('dijkstra', dijkstra, referencia_dijkstra),
+              ('a_estrela', a_estrela, referencia_a_estrela),
+              ('a_estrela_alt', a_estrela_alt, referencia_a_estrela_alt))
+
+def cronometrar(funcao, *argumentos, **opcoes):
+    inicio = time.perf_counter()
+    resultado = funcao(*argumentos, **opcoes)
+    return time.perf_counter() - inicio, resultado
+
+def medir(nome, arquivo_json, consultas, repeticoes):
+    for compacto in (False, True):
+        with contextlib.redirect_stdout(io.StringIO()):
+            grafo = criar_grafo_do_json(arquivo_json, compacto=compacto)
+        preparar_marcos(grafo)
+        rng = random.Random(0)
+        nos = sorted(grafo.nodes())
+        pares = [(rng.choice(nos), rng.choice(nos)) for _ in range(consultas)]
+        # Mesma implementação com a instrumentação ligada ou desligada (ver o início).
+        opcoes = {} if compacto else {'estatisticas': {}}
+        print(f"\n{nome} ({'GrafoCSR' if compacto else 'networkx'}): {grafo.number_of_nodes()} nos, "
+              f"{consultas} consultas, menor de {repeticoes} repeticoes")
+        print(f"{'Algoritmo':<16}{'Referencia (ms)':>17}{'Desligada (ms)':>16}{'Custo':>9}"
+              f"{'Ligada (ms)':>13}{'Custo':>9}{'Iguais':>10}")
+
+        for algoritmo, funcao, referencia in ALGORITMOS:
+            instrumentacao = Instrumentacao()
+            totais = [0.0, 0.0, 0.0]
+            iguais = 0
+            with contextlib.redirect_stdout(io.StringIO()):
+                for origem, destino in pares:
+                    melhores = [float('inf')] * 3
+                    for _ in range(repeticoes):
+                        t_ref, caminho_ref = cronometrar(referencia, grafo, origem, destino)
+                        t_off, caminho_off = cronometrar(funcao, grafo, origem, destino, **opcoes)
+                        t_on, caminho_on = cronometrar(funcao, grafo, origem, destino,
+                                                       instrumentacao=instrumentacao, **opcoes)
+                        melhores = [min(m, t) for m, t in zip(melhores, (t_ref, t_off, t_on))]
+                    totais = [total + m for total, m in zip(totais, melhores)]
+                    iguais += caminho_ref == caminho_off == caminho_on
+            referencia_ms, desligada_ms, ligada_ms = (total * 1000 / len(pares) for total in totais)
+            print(f"{algoritmo:<16}{referencia_ms:>17.4f}{desligada_ms:>16.4f}"
+                  f"{(desligada_ms / referencia_ms - 1) * 100:>+8.1f}%{ligada_ms:>13.4f}"
+                  f"{(ligada_ms / referencia_ms - 1) * 100:>+8.1f}%{iguais:>6}/{len(pares)}")
+
+        medidas = instrumentacao.estatisticas()['a_estrela_alt']
+        tempos = medidas['histogramas']['tempo_ms']
+        print(f"a_estrela_alt ligada: {medidas['arestas_relaxadas'] / medidas['consultas']:.0f} arestas relaxadas "
+              f"e {medidas['insercoes_heap'] / medidas['consultas']:.0f} insercoes no heap por consulta; "
+              f"p50 <= {tempos['p50']:.2f} ms, p99 <= {tempos['p99']:.2f} ms")
+
+if __name__ == "__main__":
+    argumentos = argparse.ArgumentParser(description="Custo da instrumentacao das buscas")
+    argumentos.add_argument('--arquivo', default='exporty.json')
+    argumentos.add_argument('--grades', type=int, nargs='*', default=[100],
+                            help="Lados das grades sinteticas (nos = lado * lado)")
+    argumentos.add_argument('--consultas', type=int, default=200)
+    argumentos.add_argument('--repeticoes', type=int, default=5)
+    args = argumentos.parse_args()
+
+    medir(args.arquivo, args.arquivo, args.consultas, args.repeticoes)
+    with tempfile.TemporaryDirectory() as pasta:
+        for lado in args.grades:
+            arquivo_grade = os.path.join(pasta, f'grade_{lado}.json')
+            gerar_grade(arquivo_grade, lado, lado)
+            medir(f"Grade {lado}x{lado}", arquivo_grade, args.consultas, args.repeticoes)
@@ -0,0 +1,94 @@
+# Compara o A* com a distância em linha reta (a_estrela) e o A* com a
+# heurística ALT (a_estrela_alt), para as duas estratégias de escolha de
+# marcos: nós fixados por consulta, latência e custo do pré-processamento.
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+from parser import criar_grafo_do_json
+from algoritmos_busca import dijkstra, a_estrela, a_estrela_alt, preparar_marcos
+from marcos import SELECOES, construir_marcos, salvar_marcos, carregar_marcos
+from dados_sinteticos import gerar_grade
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+def distancia(grafo, caminho):
+    if caminho is None:
+        return None
+    return sum(grafo[u][v]['weight'] for u, v in zip(caminho, caminho[1:]))
+
+def medir_consultas(grafo, funcao, pares):
+    tempos, distancias, fixados = [], [], 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for origem, destino in pares:
+            estatisticas = {}
+            inicio = time.perf_counter()
+            caminho = funcao(grafo, origem, destino, estatisticas=estatisticas)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+            distancias.append(distancia(grafo, caminho))
+            fixados += estatisticas['nos_fixados']
+    return tempos, distancias, fixados // len(pares)
+
+def medir(nome, grafo, consultas, num_marcos):
+    print(f"\n{nome}: {grafo.number_of_nodes()} nos, {grafo.number_of_edges()} arestas")
+    rng = random.Random(0)
+    nos = list(grafo.nodes())
+    pares = [(rng.choice(nos), rng.choice(nos)) for _ in range(consultas)]
+
+    linhas = [('dijkstra', dijkstra), ('a_estrela', a_estrela)]
+    with tempfile.TemporaryDirectory() as pasta:
+        for selecao in SELECOES:
+            inicio = time.perf_counter()
+            marcos = construir_marcos(grafo, num_marcos, selecao)
+            tempo_construcao = time.perf_counter() - inicio
+            caminho_pasta = os.path.join(pasta, selecao)
+            salvar_marcos(marcos, caminho_pasta)
+            inicio = time.perf_counter()
+            marcos = carregar_marcos(caminho_pasta)
+            tempo_carga = time.perf_counter() - inicio
+            print(f"Marcos '{selecao}': {marcos.numero_de_marcos()} marcos em {tempo_construcao:.2f} s, "
+                  f"tabelas de {marcos.tamanho_em_bytes() / 1024:.0f} KiB, carga em {tempo_carga * 1000:.1f} ms")
+            linhas.append((f'a_estrela_alt ({selecao})', _com_marcos(marcos)))
+
+        referencias = None
+        print(f"{'Algoritmo':<26}{'Media (ms)':>12}{'p50 (ms)':>10}{'p99 (ms)':>10}{'Nos fixados':>13}{'Iguais':>10}")
+        for nome_algoritmo, funcao in linhas:
+            tempos, distancias, fixados = medir_consultas(grafo, funcao, pares)
+            if referencias is None:
+                referencias = distancias
+            iguais = sum((d is None and r is None) or (d is not None and r is not None and abs(d - r) < 1e-6)
+                         for d, r in zip(distancias, referencias))
+            print(f"{nome_algoritmo:<26}{sum(tempos) / len(tempos):>12.3f}{percentil(tempos, 50):>10.3f}"
+                  f"{percentil(tempos, 99):>10.3f}{fixados:>13}{iguais:>6}/{len(pares)}")
+
+def _com_marcos(marcos):
+    def consultar(grafo, origem, destino, estatisticas=None):
+        preparar_marcos(grafo, marcos)
+        return a_estrela_alt(grafo, origem, destino, estatisticas=estatisticas)
+    return consultar
+
+if __name__ == "__main__":
+    argumentos = argparse.ArgumentParser(description="Benchmark da heurística ALT (marcos)")
+    argumentos.add_argument('--arquivo', default='exporty.json')
+    argumentos.add_argument('--grades', type=int, nargs='*', default=[100],
+                            help="Lados das grades sinteticas (nos = lado * lado)")
+    argumentos.add_argument('--consultas', type=int, default=300)
+    argumentos.add_argument('--marcos', type=int, default=16)
+    args = argumentos.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        grafo = criar_grafo_do_json(args.arquivo, compacto=True)
+    medir(args.arquivo, grafo, args.consultas, args.marcos)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        for lado in args.grades:
+            arquivo_grade = os.path.join(pasta, f'grade_{lado}.json')
+            gerar_grade(arquivo_grade, lado, lado)
+            with contextlib.redirect_stdout(io.StringIO()):
+                grafo = criar_grafo_do_json(arquivo_grade, compacto=True)
+            medir(f"Grade {lado}x{lado}", grafo, args.consultas, args.marcos)
@@ -0,0 +1,88 @@
+# Mede os perfis de roteamento: custo de compilar os tempos de viagem na
+# criação do grafo e, em cada perfil, o Dijkstra e o A* com a heurística de
+# tempo (distância em linha reta / velocidade máxima do perfil).
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+import numpy as np
+from parser import criar_grafo_do_json
+from algoritmos_busca import dijkstra, a_estrela
+from perfis import PERFIS
+from dados_sinteticos import gerar_grade
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+def custo(grafo, caminho, atributo):
+    if caminho is None:
+        return None
+    return sum(grafo[u][v][atributo] for u, v in zip(caminho, caminho[1:]))
+
+def carregar(arquivo_json, compacto, perfis=None):
+    with contextlib.redirect_stdout(io.StringIO()):
+        inicio = time.perf_counter()
+        grafo = criar_grafo_do_json(arquivo_json, compacto=compacto, perfis=perfis)
+        return grafo, time.perf_counter() - inicio
+
+def medir_consultas(grafo, funcao, pares, perfil):
+    tempos, custos, fixados = [], [], 0
+    atributo = PERFIS[perfil].atributo
+    with contextlib.redirect_stdout(io.StringIO()):
+        for origem, destino in pares:
+            estatisticas = {}
+            inicio = time.perf_counter()
+            caminho = funcao(grafo, origem, destino, estatisticas=estatisticas, perfil=perfil)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+            custos.append(custo(grafo, caminho, atributo))
+            fixados += estatisticas['nos_fixados']
+    return tempos, custos, fixados // len(pares)
+
+def medir(nome_grafo, arquivo_json, consultas):
+    for compacto in (False, True):
+        _, sem_perfis = carregar(arquivo_json, compacto, perfis=[])
+        grafo, com_perfis = carregar(arquivo_json, compacto)
+        print(f"\n{nome_grafo} ({'GrafoCSR' if compacto else 'networkx'}): {grafo.number_of_nodes()} nos, "
+              f"{grafo.number_of_edges()} arestas; criacao sem perfis {sem_perfis:.2f} s, "
+              f"com {len(PERFIS)} perfis {com_perfis:.2f} s")
+        if compacto:
+            memoria = sum(a.nbytes for a in grafo.pesos_por_perfil.values())
+            print(f"Arrays de tempos dos perfis: {memoria / 2**20:.2f} MiB")
+
+        rng = random.Random(0)
+        nos = list(grafo.nodes())
+        pares = [(rng.choice(nos), rng.choice(nos)) for _ in range(consultas)]
+        print(f"{'Perfil':<12}{'Acessivel':>10}{'Algoritmo':>12}{'Media (ms)':>12}{'p99 (ms)':>10}"
+              f"{'Fixados':>10}{'Tempo medio (s)':>17}{'Iguais':>10}")
+        for nome in PERFIS:
+            atributo = PERFIS[nome].atributo
+            tempos_arestas = np.array([dados[atributo] for _, _, dados in grafo.edges(data=True)])
+            acessivel = np.isfinite(tempos_arestas).mean()
+            _, referencia, _ = medir_consultas(grafo, dijkstra, pares, nome)
+            for algoritmo, funcao in (('dijkstra', dijkstra), ('a_estrela', a_estrela)):
+                tempos, custos, fixados = medir_consultas(grafo, funcao, pares, nome)
+                encontrados = [c for c in custos if c is not None]
+                iguais = sum((c is None and r is None) or (c is not None and r is not None and abs(c - r) < 1e-6)
+                             for c, r in zip(custos, referencia))
+                medio = sum(encontrados) / len(encontrados) if encontrados else float('nan')
+                print(f"{nome:<12}{acessivel:>10.1%}{algoritmo:>12}{sum(tempos) / len(tempos):>12.3f}"
+                      f"{percentil(tempos, 99):>10.3f}{fixados:>10}{medio:>17.1f}{iguais:>6}/{len(pares)}")
+
+if __name__ == "__main__":
+    argumentos = argparse.ArgumentParser(description="Benchmark dos perfis de roteamento")
+    argumentos.add_argument('--arquivo', default='exporty.json')
+    argumentos.add_argument('--grades', type=int, nargs='*', default=[100],
+                            help="Lados das grades sinteticas (nos = lado * lado)")
+    argumentos.add_argument('--consultas', type=int, default=200)
+    args = argumentos.parse_args()
+
+    medir(args.arquivo, args.arquivo, args.consultas)
+    with tempfile.TemporaryDirectory() as pasta:
+        for lado in args.grades:
+            arquivo_grade = os.path.join(pasta, f'grade_{lado}.json')
+            gerar_grade(arquivo_grade, lado, lado)
+            medir(f"Grade {lado}x{lado}", arquivo_grade, args.consultas)
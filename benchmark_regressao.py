@@ -0,0 +1,281 @@
+# Suíte de benchmarks reprodutível: construção do grafo, consultas ponto a
+# ponto e análise de todos os pontos, com sementes fixas e sem interação.
+# Os resultados são gravados em JSON e podem ser comparados com uma linha
+# de base gravada antes, para que regressões apareçam como números:
+#
+#   python benchmark_regressao.py --saida base.json
+#   python benchmark_regressao.py --saida atual.json --base base.json
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import networkx as nx
+import numpy as np
+from parser import criar_grafo_do_json
+from algoritmos_busca import dijkstra, a_estrela
+from todos_pontos_teste import executar_dijkstra_todos_pontos, calcular_matriz_todos_pontos, encontrar_melhor_ponto
+from benchmark_ingestao import CARREGADORES, medir_em_subprocesso
+from dados_sinteticos import gerar_grade
+
+VERSAO_FORMATO = 1
+
+# Métricas de custo (menor é melhor), comparadas com tolerância relativa.
+METRICAS_CUSTO = ('segundos', 'pico_rss_mb', 'media_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'nos_fixados_medio')
+
+# Métricas de resultado, que devem ser iguais à linha de base: uma mudança
+# indica que o código passou a responder outra coisa.
+METRICAS_RESULTADO = ('nos', 'arestas', 'caminhos_encontrados', 'soma_distancias', 'melhor_total')
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+def mediana(valores):
+    return percentil(valores, 50)
+
+def distancia(grafo, caminho):
+    if caminho is None:
+        return None
+    return sum(grafo[u][v]['weight'] for u, v in zip(caminho, caminho[1:]))
+
+def carregar(arquivo_json, compacto):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return criar_grafo_do_json(arquivo_json, compacto=compacto)
+
+# --- Seções da suíte ---
+
+def medir_construcao(nome, arquivo_json, repeticoes):
+    """
+    Tempo e pico de RSS de cada forma de criar o grafo, cada medição em um
+    processo novo. Dos tempos das repetições fica o menor, o menos afetado
+    por outros processos da máquina.
+    """
+    resultados = {}
+    for carregador in CARREGADORES:
+        medicoes = [medir_em_subprocesso(carregador, arquivo_json) for _ in range(repeticoes)]
+        resultados[f"construcao/{nome}/{carregador}"] = {
+            'segundos': min(m['segundos'] for m in medicoes),
+            'pico_rss_mb': mediana([m['pico_rss_mb'] for m in medicoes]),
+            'nos': medicoes[0]['nos'],
+            'arestas': medicoes[0]['arestas'],
+        }
+    return resultados
+
+def medir_consultas(nome, arquivo_json, consultas, semente, repeticoes):
+    """
+    Latência de dijkstra e a_estrela nos mesmos pares sorteados com a
+    semente, no networkx e no GrafoCSR; cada par é repetido e fica o menor
+    tempo. A soma das distâncias confere que as respostas não mudaram.
+
+    As chamadas medidas são as que os chamadores fazem por padrão, sem
+    estatisticas: no networkx, pedir estatísticas troca nx.dijkstra_path e
+    nx.astar_path pela implementação própria. Os nós fixados vêm de uma
+    passada à parte, fora da medição (nessa implementação, no networkx).
+    """
+    resultados = {}
+    for compacto in (False, True):
+        grafo = carregar(arquivo_json, compacto)
+        rng = random.Random(semente)
+        nos = sorted(grafo.nodes())
+        pares = [(rng.choice(nos), rng.choice(nos)) for _ in range(consultas)]
+        for algoritmo, funcao in (('dijkstra', dijkstra), ('a_estrela', a_estrela)):
+            tempos = [float('inf')] * len(pares)
+            with contextlib.redirect_stdout(io.StringIO()):
+                funcao(grafo, *pares[0])
+                for _ in range(repeticoes):
+                    distancias = []
+                    for k, (origem, destino) in enumerate(pares):
+                        inicio = time.perf_counter()
+                        caminho = funcao(grafo, origem, destino)
+                        tempos[k] = min(tempos[k], (time.perf_counter() - inicio) * 1000)
+                        distancias.append(distancia(grafo, caminho))
+                fixados = 0
+                for origem, destino in pares:
+                    estatisticas = {}
+                    funcao(grafo, origem, destino, estatisticas=estatisticas)
+                    fixados += estatisticas['nos_fixados']
+            encontradas = [d for d in distancias if d is not None]
+            resultados[f"consultas/{nome}/{'GrafoCSR' if compacto else 'networkx'}/{algoritmo}"] = {
+                'media_ms': sum(tempos) / len(tempos),
+                'p50_ms': percentil(tempos, 50),
+                'p95_ms': percentil(tempos, 95),
+                'p99_ms': percentil(tempos, 99),
+                'nos_fixados_medio': fixados / len(pares),
+                'caminhos_encontrados': len(encontradas),
+                'soma_distancias': round(sum(encontradas), 3),
+            }
+    return resultados
+
+def medir_todos_pontos(nome, arquivo_json, tamanhos, semente, repeticoes):
+    """
+    Análise de todos os pontos (uma árvore por origem e matriz de
+    distâncias) para amostras de tamanhos crescentes, no GrafoCSR, com o
+    menor tempo das repetições.
+    """
+    resultados = {}
+    grafo = carregar(arquivo_json, compacto=True)
+    for tamanho in tamanhos:
+        execucoes = (
+            ('todos_destinos', lambda: (None, executar_dijkstra_todos_pontos(grafo, max_pontos=tamanho,
+                                                                              semente=semente))),
+            ('matriz', lambda: calcular_matriz_todos_pontos(grafo, tamanho, semente=semente)),
+        )
+        for modo, executar in execucoes:
+            segundos = float('inf')
+            with contextlib.redirect_stdout(io.StringIO()):
+                for _ in range(repeticoes):
+                    inicio = time.perf_counter()
+                    pontos, resultado = executar()
+                    segundos = min(segundos, time.perf_counter() - inicio)
+                _, melhor_total, _ = encontrar_melhor_ponto(resultado, pontos)
+            resultados[f"todos_pontos/{nome}/{modo}/{tamanho}"] = {
+                'segundos': segundos,
+                'melhor_total': round(float(melhor_total), 3),
+            }
+    return resultados
+
+# --- Execução e comparação ---
+
+def metadados(args):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'versao_formato': VERSAO_FORMATO,
+        'data': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'networkx': nx.__version__,
+        'plataforma': platform.platform(),
+        'processadores': os.cpu_count(),
+        'parametros': {'arquivo': args.arquivo, 'grades': args.grades, 'consultas': args.consultas,
+                       'tamanhos': args.tamanhos, 'repeticoes': args.repeticoes, 'semente': args.semente},
+    }
+
+def executar_suite(args):
+    """
+    Roda as seções pedidas em args.secoes sobre o export e as grades
+    sintéticas.
+
+    Returns:
+        dict: {'metadados': {...}, 'resultados': {chave: {métrica: valor}}}
+    """
+    resultados = {}
+    with tempfile.TemporaryDirectory() as pasta:
+        grafos = [(os.path.basename(args.arquivo), args.arquivo)]
+        for lado in args.grades:
+            arquivo_grade = os.path.join(pasta, f'grade_{lado}.json')
+            gerar_grade(arquivo_grade, lado, lado, semente=args.semente)
+            grafos.append((f'grade_{lado}x{lado}', arquivo_grade))
+
+        for nome, arquivo_json in grafos:
+            print(f"{nome}...", file=sys.stderr)
+            if 'construcao' in args.secoes:
+                resultados.update(medir_construcao(nome, arquivo_json, args.repeticoes))
+            if 'consultas' in args.secoes:
+                resultados.update(medir_consultas(nome, arquivo_json, args.consultas, args.semente,
+                                                  args.repeticoes))
+            if 'todos_pontos' in args.secoes:
+                resultados.update(medir_todos_pontos(nome, arquivo_json, args.tamanhos, args.semente,
+                                                     args.repeticoes))
+    return {'metadados': metadados(args), 'resultados': resultados}
+
+def comparar(atual, base, tolerancia):
+    """
+    Compara cada métrica com a linha de base.
+
+    Métricas de custo viram 'regressao' quando passam de base * (1 +
+    tolerancia) e 'melhora' quando ficam abaixo de base * (1 - tolerancia);
+    métricas de resultado viram 'diferente' quando mudam. Tempos só são
+    comparáveis entre execuções na mesma máquina, e a tolerância precisa
+    cobrir a variação dela (rodar a suíte duas vezes sem mudar o código
+    mostra quanto é); nos_fixados_medio não depende da máquina.
+
+    Returns:
+        list: [(chave, métrica, base, atual, situação)]
+    """
+    linhas = []
+    for chave, metricas in atual['resultados'].items():
+        anteriores = base['resultados'].get(chave)
+        if anteriores is None:
+            continue
+        for metrica, valor in metricas.items():
+            if metrica not in anteriores:
+                continue
+            anterior = anteriores[metrica]
+            if metrica in METRICAS_RESULTADO:
+                situacao = 'ok' if abs(valor - anterior) <= 1e-6 * max(1.0, abs(anterior)) else 'diferente'
+            elif valor > anterior * (1 + tolerancia):
+                situacao = 'regressao'
+            elif valor < anterior * (1 - tolerancia):
+                situacao = 'melhora'
+            else:
+                situacao = 'ok'
+            linhas.append((chave, metrica, anterior, valor, situacao))
+    return linhas
+
+def imprimir_comparacao(linhas, atual, base):
+    print(f"\nComparacao com a linha de base (commit {base['metadados'].get('commit')}, "
+          f"{base['metadados'].get('data')}):")
+    print(f"{'Medicao':<58}{'Metrica':<22}{'Base':>12}{'Atual':>12}{'Variacao':>10}  Situacao")
+    for chave, metrica, anterior, valor, situacao in linhas:
+        variacao = f"{(valor / anterior - 1) * 100:+.1f}%" if anterior else "-"
+        print(f"{chave:<58}{metrica:<22}{anterior:>12.3f}{valor:>12.3f}{variacao:>10}  {situacao}")
+    ausentes = sorted(set(base['resultados']) - set(atual['resultados']))
+    if ausentes:
+        print(f"Medicoes da linha de base que nao foram repetidas: {len(ausentes)}")
+    contagem = {situacao: sum(1 for linha in linhas if linha[4] == situacao)
+                for situacao in ('regressao', 'diferente', 'melhora', 'ok')}
+    print(f"Regressoes: {contagem['regressao']}, resultados diferentes: {contagem['diferente']}, "
+          f"melhoras: {contagem['melhora']}, sem mudanca: {contagem['ok']}")
+    return contagem
+
+def imprimir_resultados(resultados):
+    for chave, metricas in resultados['resultados'].items():
+        valores = ", ".join(f"{metrica}={valor:.3f}" if isinstance(valor, float) else f"{metrica}={valor}"
+                            for metrica, valor in metricas.items())
+        print(f"{chave}: {valores}")
+
+if __name__ == "__main__":
+    argumentos = argparse.ArgumentParser(description="Suite de benchmarks com comparacao com uma linha de base")
+    argumentos.add_argument('--arquivo', default='exporty.json')
+    argumentos.add_argument('--grades', type=int, nargs='*', default=[50, 100],
+                            help="Lados das grades sinteticas (nos = lado * lado)")
+    argumentos.add_argument('--consultas', type=int, default=200, help="Pares sorteados por grafo")
+    argumentos.add_argument('--tamanhos', type=int, nargs='*', default=[25, 100],
+                            help="Quantidades de pontos da analise de todos os pontos")
+    argumentos.add_argument('--repeticoes', type=int, default=3,
+                            help="Repeticoes de cada medicao de tempo (fica a menor)")
+    argumentos.add_argument('--semente', type=int, default=0)
+    argumentos.add_argument('--secoes', nargs='*', default=['construcao', 'consultas', 'todos_pontos'],
+                            choices=['construcao', 'consultas', 'todos_pontos'])
+    argumentos.add_argument('--saida', default='benchmark_resultados.json', help="JSON com os resultados")
+    argumentos.add_argument('--base', default=None, help="JSON de uma execucao anterior para comparar")
+    argumentos.add_argument('--tolerancia', type=float, default=0.2,
+                            help="Variacao relativa aceita nas metricas de custo")
+    args = argumentos.parse_args()
+
+    resultados = executar_suite(args)
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(resultados, f, indent=2, ensure_ascii=False)
+    imprimir_resultados(resultados)
+    print(f"Resultados gravados em {args.saida}")
+
+    if args.base:
+        with open(args.base, 'r', encoding='utf-8') as f:
+            base = json.load(f)
+        linhas = comparar(resultados, base, args.tolerancia)
+        contagem = imprimir_comparacao(linhas, resultados, base)
+        if contagem['regressao'] or contagem['diferente']:
+            sys.exit(1)
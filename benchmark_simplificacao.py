@@ -0,0 +1,95 @@
+# Compara o grafo original com o simplificado (cadeias de nós de grau 2
+# contraídas): nós, arestas, custo da simplificação e latência de cada
+# algoritmo nos mesmos pares de nós, que existem nos dois grafos.
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+from parser import criar_grafo_do_json
+from algoritmos_busca import ALGORITMOS, preparar_marcos, preparar_hierarquia
+from simplificacao import simplificar_grafo, expandir_caminho
+from dados_sinteticos import ampliar_export
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+def distancia(grafo, caminho):
+    if caminho is None:
+        return None
+    return sum(grafo[u][v]['weight'] for u, v in zip(caminho, caminho[1:]))
+
+def medir_consultas(grafo, funcao, pares):
+    tempos, distancias, fixados = [], [], 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for origem, destino in pares:
+            estatisticas = {}
+            inicio = time.perf_counter()
+            caminho = funcao(grafo, origem, destino, estatisticas=estatisticas)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+            distancias.append(distancia(grafo, caminho))
+            fixados += estatisticas['nos_fixados']
+    return tempos, distancias, fixados // len(pares)
+
+def medir(nome, arquivo_json, consultas):
+    for compacto in (False, True):
+        with contextlib.redirect_stdout(io.StringIO()):
+            grafo = criar_grafo_do_json(arquivo_json, compacto=compacto)
+        inicio = time.perf_counter()
+        simplificado = simplificar_grafo(grafo)
+        tempo_simplificacao = time.perf_counter() - inicio
+        simplificacao = simplificado.graph['simplificacao']
+        estatisticas = simplificacao.estatisticas
+        print(f"\n{nome} ({'GrafoCSR' if compacto else 'networkx'}): "
+              f"{estatisticas['nos_antes']} -> {estatisticas['nos_depois']} nos, "
+              f"{estatisticas['arestas_antes']} -> {estatisticas['arestas_depois']} arestas; "
+              f"{estatisticas['cadeias']} cadeias com {estatisticas['nos_removidos']} nos removidos "
+              f"em {tempo_simplificacao:.2f} s; geometria {simplificacao.tamanho_em_bytes() / 2**20:.2f} MiB")
+
+        rng = random.Random(0)
+        nos = list(simplificado.nodes())
+        pares = [(rng.choice(nos), rng.choice(nos)) for _ in range(consultas)]
+        for g in (grafo, simplificado):
+            preparar_marcos(g)
+            preparar_hierarquia(g)
+
+        print(f"{'Algoritmo':<26}{'Original (ms)':>15}{'Simplif. (ms)':>15}{'p99 orig.':>11}{'p99 simp.':>11}"
+              f"{'Fixados':>16}{'Ganho':>8}{'Iguais':>10}")
+        for algoritmo, funcao in ALGORITMOS.items():
+            tempos_original, referencia, fixados_original = medir_consultas(grafo, funcao, pares)
+            tempos_simplificado, distancias, fixados_simplificado = medir_consultas(simplificado, funcao, pares)
+            iguais = sum((d is None and r is None) or (d is not None and r is not None and abs(d - r) < 1e-6)
+                         for d, r in zip(distancias, referencia))
+            media_original = sum(tempos_original) / len(tempos_original)
+            media_simplificado = sum(tempos_simplificado) / len(tempos_simplificado)
+            print(f"{algoritmo:<26}{media_original:>15.3f}{media_simplificado:>15.3f}"
+                  f"{percentil(tempos_original, 99):>11.3f}{percentil(tempos_simplificado, 99):>11.3f}"
+                  f"{fixados_original:>8}->{fixados_simplificado:<6}{media_original / media_simplificado:>7.2f}x"
+                  f"{iguais:>6}/{len(pares)}")
+
+        # Custo de devolver os nós originais para desenhar as rotas.
+        with contextlib.redirect_stdout(io.StringIO()):
+            caminhos = [ALGORITMOS['dijkstra'](simplificado, origem, destino) for origem, destino in pares]
+        inicio = time.perf_counter()
+        expandidos = [expandir_caminho(simplificado, caminho) for caminho in caminhos]
+        duracao = (time.perf_counter() - inicio) * 1000
+        nos_expandidos = sum(len(caminho) for caminho in expandidos if caminho)
+        print(f"expandir_caminho: {duracao / len(pares):.3f} ms por rota, {nos_expandidos} nos ao todo")
+
+if __name__ == "__main__":
+    argumentos = argparse.ArgumentParser(description="Benchmark da simplificacao do grafo")
+    argumentos.add_argument('--arquivo', default='exporty.json')
+    argumentos.add_argument('--fatores', type=int, nargs='*', default=[],
+                            help="Copias do export em versoes ampliadas")
+    argumentos.add_argument('--consultas', type=int, default=300)
+    args = argumentos.parse_args()
+
+    medir(args.arquivo, args.arquivo, args.consultas)
+    with tempfile.TemporaryDirectory() as pasta:
+        for fator in args.fatores:
+            arquivo_ampliado = os.path.join(pasta, f'ampliado_{fator}.json')
+            ampliar_export(args.arquivo, arquivo_ampliado, fator)
+            medir(f"{args.arquivo} x{fator}", arquivo_ampliado, args.consultas)
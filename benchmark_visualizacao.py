@@ -0,0 +1,39 @@
+# Compara o mapa interativo detalhado (um elemento por nó e por aresta) com
+# o modo rápido do visu_grafo: tempo de geração e tamanho do HTML.
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+from parser import criar_grafo_do_json
+from visu_grafo import visualizar_mapa_interativo, polilinhas_das_vias
+
+def medir(grafo, pasta, nome, **opcoes):
+    arquivo = os.path.join(pasta, nome + '.html')
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        visualizar_mapa_interativo(grafo, nome_arquivo=arquivo, **opcoes)
+    return time.perf_counter() - inicio, os.path.getsize(arquivo)
+
+if __name__ == "__main__":
+    argumentos = argparse.ArgumentParser(description="Benchmark da geração do mapa interativo")
+    argumentos.add_argument('--arquivo', default='exporty.json')
+    args = argumentos.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        grafo = criar_grafo_do_json(args.arquivo, cache=True)
+    vias = polilinhas_das_vias(grafo)
+    print(f"{args.arquivo}: {grafo.number_of_nodes()} nos, {grafo.number_of_edges()} arestas, "
+          f"{sum(len(linhas) for linhas in vias.values())} polilinhas em {len(vias)} tipos de rodovia")
+
+    modos = [
+        ('detalhado', {'rapido': False}),
+        ('rapido, nos em cluster', {'rapido': True, 'nos': 'cluster'}),
+        ('rapido, sem nos', {'rapido': True, 'nos': 'nenhum'}),
+    ]
+    print(f"{'Modo':<26}{'Tempo (s)':>11}{'HTML (MiB)':>12}")
+    with tempfile.TemporaryDirectory() as pasta:
+        for i, (nome, opcoes) in enumerate(modos):
+            tempo, tamanho = medir(grafo, pasta, f'mapa_{i}', **opcoes)
+            print(f"{nome:<26}{tempo:>11.2f}{tamanho / 2**20:>12.2f}")
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+import numpy as np
+from grafo_csr import GrafoCSR
+from perfis import Perfil
+from componentes import Componentes
+
+# Incrementar sempre que o formato gravado em disco mudar.
+VERSAO_CACHE = 4
+
+# Arrays do GrafoCSR gravados como arquivos .npy, carregados com memory mapping.
+ARRAYS_GRAFO = ('ids', 'lat', 'lon', 'offsets', 'destinos', 'pesos', 'nome_idx', 'tipo_idx',
+                '_ordem', '_ids_ordenados')
+
+def _arquivo_dos_componentes(pasta, tipo):
+    return os.path.join(pasta, f'componentes_{tipo}.npy')
+
+def _arquivo_do_perfil(pasta, nome):
+    return os.path.join(pasta, f'perfil_{nome}.npy')
+
+def _descrever_perfis(perfis):
+    # Forma normalizada (como fica depois de gravada em JSON) para comparar
+    # os perfis do cache com os pedidos.
+    return json.loads(json.dumps([perfil.para_dict() for perfil in perfis]))
+
+def pasta_do_cache(arquivo_json):
+    """
+    Pasta onde fica o cache compilado de um export do OSM.
+    """
+    return arquivo_json + '.cache'
+
+def hash_do_arquivo(arquivo, tamanho_bloco=1 << 20):
+    """
+    Calcula o SHA-256 do arquivo, lendo-o em blocos.
+    """
+    h = hashlib.sha256()
+    with open(arquivo, 'rb') as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+def salvar_cache(grafo, arquivo_json, streaming=False, pasta=None):
+    """
+    Grava o GrafoCSR em disco, junto com a identificação do arquivo de origem.
+    Os componentes conexos precisam já estar em grafo.graph['componentes'].
+
+    A gravação é feita em uma pasta temporária que depois substitui a
+    anterior (ver substituir_pasta), então processos que já mapearam o cache
+    antigo não são afetados.
+
+    Args:
+        grafo (GrafoCSR): O grafo a ser gravado.
+        arquivo_json (str): Export do OSM de onde o grafo foi criado.
+        streaming (bool): Se o grafo foi criado pela leitura incremental.
+        pasta (str): Pasta do cache (padrão: pasta_do_cache(arquivo_json)).
+    """
+    pasta = pasta or pasta_do_cache(arquivo_json)
+    pasta_temporaria = f"{pasta}.tmp-{os.getpid()}"
+    os.makedirs(pasta_temporaria, exist_ok=True)
+
+    for nome in ARRAYS_GRAFO:
+        np.save(os.path.join(pasta_temporaria, nome + '.npy'), getattr(grafo, nome))
+    perfis = list(grafo.graph.get('perfis', {}).values())
+    for perfil in perfis:
+        np.save(_arquivo_do_perfil(pasta_temporaria, perfil.nome), grafo.pesos_do_perfil(perfil.nome))
+    for tipo, rotulos in grafo.graph['componentes'].para_arrays().items():
+        np.save(_arquivo_dos_componentes(pasta_temporaria, tipo), rotulos)
+
+    estado = os.stat(arquivo_json)
+    grafo.graph['sha256'] = hash_do_arquivo(arquivo_json)
+    metadados = {
+        'versao': VERSAO_CACHE,
+        'streaming': streaming,
+        'sha256': grafo.graph['sha256'],
+        'mtime_ns': estado.st_mtime_ns,
+        'tamanho': estado.st_size,
+        'nomes': grafo.nomes,
+        'tipos': grafo.tipos,
+        'perfis': _descrever_perfis(perfis),
+    }
+    with open(os.path.join(pasta_temporaria, 'metadados.json'), 'w', encoding='utf-8') as f:
+        json.dump(metadados, f, ensure_ascii=False)
+
+    substituir_pasta(pasta_temporaria, pasta)
+
+def substituir_pasta(pasta_temporaria, pasta):
+    """
+    Põe a pasta_temporaria, já completa, no lugar de pasta.
+
+    A pasta antiga é renomeada para o lado (e só depois apagada) em vez de
+    apagada antes da troca, então um leitor encontra a versão antiga ou a
+    nova, salvo no instante entre as duas renomeações. Se dois processos
+    gravam ao mesmo tempo, o que perde a corrida descarta a sua cópia e usa
+    a do outro: as duas vêm do mesmo arquivo de origem.
+    """
+    # Nome único: uma pasta antiga que não pôde ser apagada (outro processo
+    # ainda gravava nela) não atrapalha as próximas trocas.
+    antiga = f"{pasta}.antiga-{uuid.uuid4().hex}"
+    try:
+        os.replace(pasta, antiga)
+    except FileNotFoundError:
+        antiga = None
+    try:
+        os.replace(pasta_temporaria, pasta)
+    except OSError:
+        # Outro processo pôs a sua versão entre as duas renomeações.
+        if not os.path.isdir(pasta):
+            raise
+        shutil.rmtree(pasta_temporaria, ignore_errors=True)
+    if antiga is not None:
+        shutil.rmtree(antiga, ignore_errors=True)
+
+def cache_valido(arquivo_json, streaming=False, perfis=(), pasta=None):
+    """
+    Verifica se o cache corresponde ao arquivo de origem atual e foi
+    compilado com os mesmos perfis de roteamento.
+
+    Se o mtime e o tamanho forem os mesmos, o cache é aceito sem reler o
+    arquivo. Se só o mtime mudou, o hash decide; quando o conteúdo é o mesmo,
+    o novo mtime é registrado para evitar recalcular o hash da próxima vez.
+
+    Returns:
+        bool: True se o cache pode ser usado.
+    """
+    pasta = pasta or pasta_do_cache(arquivo_json)
+    caminho_metadados = os.path.join(pasta, 'metadados.json')
+    try:
+        with open(caminho_metadados, 'r', encoding='utf-8') as f:
+            metadados = json.load(f)
+        estado = os.stat(arquivo_json)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return False
+
+    if metadados.get('versao') != VERSAO_CACHE or metadados.get('streaming') != streaming:
+        return False
+    if metadados.get('perfis') != _descrever_perfis(perfis):
+        return False
+    if metadados['tamanho'] != estado.st_size:
+        return False
+    if metadados['mtime_ns'] == estado.st_mtime_ns:
+        return True
+    if metadados['sha256'] != hash_do_arquivo(arquivo_json):
+        return False
+
+    # Gravado ao lado e renomeado, para que ninguém leia o arquivo pela metade.
+    metadados['mtime_ns'] = estado.st_mtime_ns
+    caminho_temporario = f"{caminho_metadados}.tmp-{os.getpid()}"
+    with open(caminho_temporario, 'w', encoding='utf-8') as f:
+        json.dump(metadados, f, ensure_ascii=False)
+    os.replace(caminho_temporario, caminho_metadados)
+    return True
+
+def carregar_cache(pasta):
+    """
+    Carrega o GrafoCSR gravado por salvar_cache.
+
+    Os arrays são mapeados em memória (somente leitura): nada é lido até ser
+    usado, e processos diferentes que carregam o mesmo cache compartilham as
+    mesmas páginas do sistema operacional.
+
+    Returns:
+        GrafoCSR: O grafo carregado.
+    """
+    with open(os.path.join(pasta, 'metadados.json'), 'r', encoding='utf-8') as f:
+        metadados = json.load(f)
+    arrays = {nome: np.load(os.path.join(pasta, nome + '.npy'), mmap_mode='r') for nome in ARRAYS_GRAFO}
+    perfis = [Perfil(**dados) for dados in metadados['perfis']]
+    grafo = GrafoCSR(arrays['ids'], arrays['lat'], arrays['lon'], arrays['offsets'], arrays['destinos'],
+                     arrays['pesos'], arrays['nome_idx'], arrays['tipo_idx'],
+                     metadados['nomes'], metadados['tipos'],
+                     ordem=arrays['_ordem'], ids_ordenados=arrays['_ids_ordenados'],
+                     pesos_por_perfil={perfil.nome: np.load(_arquivo_do_perfil(pasta, perfil.nome), mmap_mode='r')
+                                       for perfil in perfis})
+    grafo.graph['sha256'] = metadados['sha256']
+    grafo.graph['perfis'] = {perfil.nome: perfil for perfil in perfis}
+    grafo.graph['componentes'] = Componentes(np.load(_arquivo_dos_componentes(pasta, 'forte')),
+                                             np.load(_arquivo_dos_componentes(pasta, 'fraco')),
+                                             num_arestas=grafo.number_of_edges())
+    return grafo
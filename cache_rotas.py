@@ -0,0 +1,179 @@
+import weakref
+from collections import OrderedDict
+import networkx as nx
+from algoritmos_busca import ALGORITMOS, arvore_caminhos_minimos, caminho_na_arvore
+
+class CacheRotas:
+    """
+    Cache LRU das consultas ponto a ponto feitas aos algoritmos de
+    algoritmos_busca.
+
+    As rotas são guardadas pela chave (origem, destino, algoritmo, perfil),
+    até tamanho_maximo entradas; ao passar do limite, a usada há mais tempo
+    é descartada. Caminhos inexistentes (None) também são guardados.
+
+    Quando uma mesma origem acumula consultas_para_arvore falhas, calcula-se
+    a árvore de caminhos mínimos a partir dela, que passa a responder
+    qualquer destino dessa origem. Todos os algoritmos são exatos, então a
+    árvore dá a mesma distância; em empates entre caminhos de mesmo
+    comprimento ela segue o desempate do dijkstra(). As árvores ficam em
+    outro LRU, limitado a max_arvores.
+
+    O cache pertence a um grafo por vez: se for consultado com outra
+    instância, ou se o 'sha256' ou a 'versao' em grafo.graph mudarem (o
+    arquivo de origem foi recompilado ou o grafo foi alterado), todo o
+    conteúdo é descartado. Registrado nos observadores de um
+    AtualizadorGrafo, o cache descarta só o que as alterações afetam.
+    """
+
+    def __init__(self, tamanho_maximo=4096, max_arvores=16, consultas_para_arvore=3):
+        self.tamanho_maximo = tamanho_maximo
+        self.max_arvores = max_arvores
+        self.consultas_para_arvore = consultas_para_arvore
+        self._rotas = OrderedDict()
+        self._arvores = OrderedDict()
+        self._falhas_por_origem = OrderedDict()
+        self._rotas_por_aresta = {}
+        self._grafo = None
+        self._assinatura = None
+        self.contadores = {'acertos': 0, 'acertos_arvore': 0, 'falhas': 0, 'despejos': 0, 'invalidacoes': 0}
+
+    def rota(self, grafo, origem_id, destino_id, algoritmo='dijkstra', perfil=None, estatisticas=None):
+        """
+        Caminho mínimo entre dois nós, do cache quando possível.
+
+        Args:
+            grafo: Grafo do NetworkX ou GrafoCSR
+            origem_id: ID do nó de origem
+            destino_id: ID do nó de destino
+            algoritmo (str): Nome do algoritmo em ALGORITMOS.
+            perfil: Perfil de roteamento, pelo nome ou Perfil (None usa o
+                peso 'weight' das arestas). Só dijkstra e a_estrela aceitam.
+            estatisticas: Dicionário opcional que recebe 'nos_fixados'
+                (0 quando a resposta vem do cache).
+
+        Returns:
+            list or None: Caminho como lista de IDs, ou None se não houver caminho.
+        """
+        self._verificar_grafo(grafo)
+        chave = (origem_id, destino_id, algoritmo, perfil)
+
+        if chave in self._rotas:
+            self._rotas.move_to_end(chave)
+            self.contadores['acertos'] += 1
+            if estatisticas is not None:
+                estatisticas['nos_fixados'] = 0
+            caminho = self._rotas[chave]
+            return None if caminho is None else list(caminho)
+
+        arvore = self._arvores.get((origem_id, perfil))
+        if arvore is not None:
+            self._arvores.move_to_end((origem_id, perfil))
+            if destino_id not in arvore and destino_id not in grafo:
+                raise nx.NodeNotFound(f"O nó {destino_id} não está no grafo.")
+            self.contadores['acertos_arvore'] += 1
+            if estatisticas is not None:
+                estatisticas['nos_fixados'] = 0
+            caminho = caminho_na_arvore(arvore, destino_id)
+            self._guardar(chave, caminho)
+            return caminho
+
+        self.contadores['falhas'] += 1
+        argumentos = {'estatisticas': estatisticas}
+        if perfil is not None:
+            argumentos['perfil'] = perfil
+        caminho = ALGORITMOS[algoritmo](grafo, origem_id, destino_id, **argumentos)
+        self._guardar(chave, caminho)
+        self._contar_falha(grafo, origem_id, perfil)
+        return caminho
+
+    def limpar(self):
+        """
+        Descarta todas as rotas e árvores guardadas (os contadores continuam).
+        """
+        self._rotas.clear()
+        self._arvores.clear()
+        self._falhas_por_origem.clear()
+        self._rotas_por_aresta.clear()
+
+    def grafo_atualizado(self, grafo, arestas, apenas_aumentos, estrutura):
+        """
+        Chamado pelo AtualizadorGrafo após cada alteração do grafo.
+
+        Se os pesos só aumentaram, um caminho mínimo que não passa por
+        nenhuma aresta alterada continua mínimo (e um destino inalcançável
+        continua inalcançável): só as rotas e as árvores que usam essas
+        arestas são descartadas. Qualquer redução de peso descarta tudo.
+        """
+        atual = self._grafo() if self._grafo is not None else None
+        if atual is not grafo:
+            return
+        if not apenas_aumentos:
+            self._verificar_grafo(grafo)
+            return
+        for aresta in arestas:
+            for chave in self._rotas_por_aresta.pop(aresta, ()):
+                self._descartar_rota(chave)
+        for chave_arvore, arvore in list(self._arvores.items()):
+            if any(arvore.get(destino) == origem for origem, destino in arestas):
+                del self._arvores[chave_arvore]
+        self._assinatura = _assinatura(grafo)
+
+    def estatisticas(self):
+        """
+        Contadores de acertos, falhas, despejos e invalidações, com a taxa de
+        acerto e a ocupação atual.
+        """
+        consultas = self.contadores['acertos'] + self.contadores['acertos_arvore'] + self.contadores['falhas']
+        acertos = self.contadores['acertos'] + self.contadores['acertos_arvore']
+        return dict(self.contadores, entradas=len(self._rotas), arvores=len(self._arvores),
+                    taxa_acerto=acertos / consultas if consultas else 0.0)
+
+    def _verificar_grafo(self, grafo):
+        assinatura = _assinatura(grafo)
+        atual = self._grafo() if self._grafo is not None else None
+        if atual is grafo and assinatura == self._assinatura:
+            return
+        if self._rotas or self._arvores:
+            self.contadores['invalidacoes'] += 1
+        self.limpar()
+        self._grafo = weakref.ref(grafo)
+        self._assinatura = assinatura
+
+    def _guardar(self, chave, caminho):
+        # Guardado como tupla: quem recebe a rota pode alterar a sua lista
+        # sem mudar o que as próximas consultas recebem.
+        caminho = None if caminho is None else tuple(caminho)
+        self._rotas[chave] = caminho
+        if caminho:
+            for aresta in zip(caminho, caminho[1:]):
+                self._rotas_por_aresta.setdefault(aresta, set()).add(chave)
+        if len(self._rotas) > self.tamanho_maximo:
+            self._descartar_rota(next(iter(self._rotas)))
+            self.contadores['despejos'] += 1
+
+    def _descartar_rota(self, chave):
+        caminho = self._rotas.pop(chave, None)
+        if caminho:
+            for aresta in zip(caminho, caminho[1:]):
+                chaves = self._rotas_por_aresta.get(aresta)
+                if chaves is not None:
+                    chaves.discard(chave)
+                    if not chaves:
+                        del self._rotas_por_aresta[aresta]
+
+    def _contar_falha(self, grafo, origem_id, perfil):
+        # Cada perfil tem a sua árvore, calculada com os pesos dele.
+        falhas = self._falhas_por_origem.pop((origem_id, perfil), 0) + 1
+        if falhas < self.consultas_para_arvore:
+            self._falhas_por_origem[(origem_id, perfil)] = falhas
+            if len(self._falhas_por_origem) > self.tamanho_maximo:
+                self._falhas_por_origem.popitem(last=False)
+            return
+        self._arvores[(origem_id, perfil)] = arvore_caminhos_minimos(grafo, origem_id, perfil=perfil)[1]
+        if len(self._arvores) > self.max_arvores:
+            self._arvores.popitem(last=False)
+            self.contadores['despejos'] += 1
+
+def _assinatura(grafo):
+    return grafo.graph.get('sha256'), grafo.graph.get('versao')
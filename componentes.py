@@ -0,0 +1,261 @@
+import numpy as np
+from grafo_csr import GrafoCSR
+
+class Componentes:
+    """
+    Componentes fortemente e fracamente conexos de um grafo, para descartar
+    sem busca os pares de nós sem caminho entre si.
+
+    Os rótulos dos componentes fortes seguem a ordem em que o algoritmo de
+    Tarjan os fecha, que é uma ordem topológica invertida: toda aresta entre
+    componentes diferentes vai de um rótulo maior para um menor. Então u só
+    alcança v se estiverem no mesmo componente fraco e forte[u] >= forte[v];
+    a condição é necessária, não suficiente (com rótulos diferentes, a
+    busca ainda decide).
+
+    Attributes:
+        forte, fraco: Rótulo de cada nó (na ordem dos nós do grafo).
+        tamanhos: Número de nós de cada componente forte.
+        maior (int): Rótulo do maior componente forte.
+        num_arestas (int): Número de arestas do grafo quando os componentes
+            foram calculados (None se desconhecido).
+    """
+
+    def __init__(self, forte, fraco, ids=None, num_arestas=None):
+        """
+        Args:
+            forte, fraco: Arrays com os rótulos de cada nó.
+            ids: No networkx, os IDs dos nós na ordem dos arrays (no
+                GrafoCSR a posição é o índice interno do nó).
+            num_arestas (int): Número de arestas do grafo de onde vieram.
+        """
+        self.forte = np.asarray(forte, dtype=np.int32)
+        self.fraco = np.asarray(fraco, dtype=np.int32)
+        self.tamanhos = np.bincount(self.forte, minlength=1)
+        self.maior = int(np.argmax(self.tamanhos))
+        self.num_arestas = num_arestas
+        self._posicoes = None if ids is None else {no: i for i, no in enumerate(ids)}
+        self._mv_forte = memoryview(self.forte)
+        self._mv_fraco = memoryview(self.fraco)
+
+    @property
+    def num_fortes(self):
+        return len(self.tamanhos) if len(self.forte) else 0
+
+    @property
+    def num_fracos(self):
+        return int(self.fraco.max()) + 1 if len(self.fraco) else 0
+
+    def do_grafo(self, grafo):
+        """
+        False se o grafo mudou de número de nós ou de arestas desde o
+        cálculo (por exemplo, alterado diretamente, sem o AtualizadorGrafo).
+        """
+        if len(self.forte) != grafo.number_of_nodes():
+            return False
+        return self.num_arestas is None or self.num_arestas == _numero_de_arestas(grafo)
+
+    def posicao(self, grafo, no_id):
+        """
+        Posição do nó nos arrays, ou None se ele não estiver no grafo.
+        """
+        if self._posicoes is not None:
+            return self._posicoes.get(no_id)
+        try:
+            return grafo.indice(no_id)
+        except KeyError:
+            return None
+
+    def posicoes(self, grafo, nos):
+        """
+        Versão vetorizada de posicao(), para IDs que estão no grafo.
+        """
+        if self._posicoes is not None:
+            return np.fromiter((self._posicoes[no] for no in nos), dtype=np.int64, count=len(nos))
+        return grafo.indices(nos)
+
+    def pode_alcancar(self, i, j):
+        """
+        False se o nó na posição i certamente não alcança o da posição j.
+        """
+        return self._mv_fraco[i] == self._mv_fraco[j] and self._mv_forte[i] >= self._mv_forte[j]
+
+    def alcancaveis(self, i, posicoes):
+        """
+        Versão vetorizada de pode_alcancar() para vários destinos.
+
+        Returns:
+            numpy.ndarray: Máscara booleana alinhada com posicoes.
+        """
+        return (self.fraco[posicoes] == self.fraco[i]) & (self.forte[posicoes] <= self.forte[i])
+
+    def para_arrays(self):
+        return {'forte': self.forte, 'fraco': self.fraco}
+
+def calcular_componentes(grafo):
+    """
+    Calcula os componentes fortes (Tarjan, iterativo) e fracos do grafo. As
+    arestas fechadas de um GrafoCSR (peso infinito) continuam contando como
+    ligações, o que mantém a condição de alcance válida ao reabri-las.
+
+    Returns:
+        Componentes: Os componentes do grafo.
+    """
+    if isinstance(grafo, GrafoCSR):
+        ids = None
+        offsets = grafo.offsets
+        destinos = grafo.destinos
+    else:
+        ids = list(grafo.nodes())
+        posicoes = {no: i for i, no in enumerate(ids)}
+        sucessores = grafo._succ
+        graus = np.fromiter((len(sucessores[no]) for no in ids), dtype=np.int64, count=len(ids))
+        offsets = np.zeros(len(ids) + 1, dtype=np.int64)
+        np.cumsum(graus, out=offsets[1:])
+        destinos = np.fromiter((posicoes[vizinho] for no in ids for vizinho in sucessores[no]),
+                               dtype=np.int32, count=int(offsets[-1]))
+
+    forte = _tarjan(offsets.tolist(), destinos.tolist())
+    origens = np.repeat(np.arange(len(forte), dtype=np.int32), np.diff(offsets))
+    return Componentes(forte, _componentes_fracos(forte, origens, destinos), ids, int(offsets[-1]))
+
+def componentes_do_grafo(grafo):
+    """
+    Componentes guardados em grafo.graph['componentes'], calculados agora
+    se o grafo ainda não os tiver (criar_grafo_do_json já os calcula) ou
+    se os guardados forem de antes de uma mudança nos nós ou arestas.
+    """
+    componentes = grafo.graph.get('componentes')
+    if componentes is None or not componentes.do_grafo(grafo):
+        componentes = grafo.graph['componentes'] = calcular_componentes(grafo)
+    return componentes
+
+def pode_alcancar(grafo, origem_id, destino_id):
+    """
+    False se os componentes já calculados do grafo garantem que não há
+    caminho de origem_id até destino_id. Sem componentes calculados, ou com
+    nós que não estão no grafo, retorna True e a busca decide. Componentes
+    desatualizados (ver Componentes.do_grafo) são descartados, e os
+    próximos são calculados por componentes_do_grafo().
+    """
+    componentes = grafo.graph.get('componentes')
+    if componentes is None:
+        return True
+    if not componentes.do_grafo(grafo):
+        del grafo.graph['componentes']
+        return True
+    i = componentes.posicao(grafo, origem_id)
+    j = componentes.posicao(grafo, destino_id)
+    return i is None or j is None or componentes.pode_alcancar(i, j)
+
+def manter_maior_componente(grafo):
+    """
+    Cria um grafo, do mesmo tipo do original, só com os nós do maior
+    componente fortemente conexo e as arestas entre eles: todo par de nós
+    passa a ter caminho. Os caminhos mínimos entre esses nós não mudam, pois
+    nenhum deles passa por nós de fora do componente.
+
+    Returns:
+        networkx.DiGraph or GrafoCSR: O grafo reduzido, com os perfis e a
+        simplificação do original em grafo.graph.
+    """
+    componentes = componentes_do_grafo(grafo)
+    manter = componentes.forte == componentes.maior
+    if isinstance(grafo, GrafoCSR):
+        novo_indice = np.cumsum(manter) - 1
+        origens = grafo.origens_das_arestas()
+        arestas = manter[origens] & manter[grafo.destinos]
+        reduzido = GrafoCSR._de_arrays(
+            grafo.ids[manter], grafo.lat[manter], grafo.lon[manter],
+            novo_indice[origens[arestas]], novo_indice[grafo.destinos[arestas]].astype(np.int32),
+            grafo.pesos[arestas], grafo.nome_idx[arestas], grafo.tipo_idx[arestas], grafo.nomes, grafo.tipos,
+            {nome: pesos_perfil[arestas] for nome, pesos_perfil in grafo.pesos_por_perfil.items()})
+    else:
+        ids = list(grafo.nodes())
+        reduzido = grafo.subgraph([no for no, mantido in zip(ids, manter.tolist()) if mantido]).copy()
+        reduzido.graph.clear()
+    for chave in ('perfis', 'simplificacao'):
+        if chave in grafo.graph:
+            reduzido.graph[chave] = grafo.graph[chave]
+    reduzido.graph['componentes'] = calcular_componentes(reduzido)
+    return reduzido
+
+def _numero_de_arestas(grafo):
+    # No networkx, number_of_edges() passa pela visão de graus e custa
+    # bem mais que somar os tamanhos das listas de sucessores.
+    if isinstance(grafo, GrafoCSR):
+        return grafo.number_of_edges()
+    return sum(map(len, grafo._succ.values()))
+
+def _tarjan(offsets, destinos):
+    # Tarjan sem recursão: chamadas guarda (nó, próxima aresta a examinar).
+    num_nos = len(offsets) - 1
+    ordem = [-1] * num_nos
+    menor = [0] * num_nos
+    na_pilha = [False] * num_nos
+    rotulo = [0] * num_nos
+    pilha = []
+    contador = 0
+    num_componentes = 0
+
+    for raiz in range(num_nos):
+        if ordem[raiz] != -1:
+            continue
+        ordem[raiz] = menor[raiz] = contador
+        contador += 1
+        pilha.append(raiz)
+        na_pilha[raiz] = True
+        chamadas = [(raiz, offsets[raiz])]
+        while chamadas:
+            v, e = chamadas[-1]
+            fim = offsets[v + 1]
+            while e < fim:
+                w = destinos[e]
+                e += 1
+                if ordem[w] == -1:
+                    chamadas[-1] = (v, e)
+                    ordem[w] = menor[w] = contador
+                    contador += 1
+                    pilha.append(w)
+                    na_pilha[w] = True
+                    chamadas.append((w, offsets[w]))
+                    break
+                if na_pilha[w] and ordem[w] < menor[v]:
+                    menor[v] = ordem[w]
+            else:
+                chamadas.pop()
+                if menor[v] == ordem[v]:
+                    while True:
+                        w = pilha.pop()
+                        na_pilha[w] = False
+                        rotulo[w] = num_componentes
+                        if w == v:
+                            break
+                    num_componentes += 1
+                if chamadas:
+                    u = chamadas[-1][0]
+                    if menor[v] < menor[u]:
+                        menor[u] = menor[v]
+    return np.array(rotulo, dtype=np.int32)
+
+def _componentes_fracos(forte, origens, destinos):
+    # União dos componentes fortes ligados por alguma aresta: só as arestas
+    # entre componentes diferentes precisam ser examinadas.
+    num_fortes = int(forte.max()) + 1 if len(forte) else 0
+    pai = list(range(num_fortes))
+
+    def raiz(x):
+        while pai[x] != x:
+            pai[x] = pai[pai[x]]
+            x = pai[x]
+        return x
+
+    de, para = forte[origens], forte[destinos]
+    cruzam = de != para
+    for a, b in zip(de[cruzam].tolist(), para[cruzam].tolist()):
+        ra, rb = raiz(a), raiz(b)
+        if ra != rb:
+            pai[max(ra, rb)] = min(ra, rb)
+    raizes = np.array([raiz(x) for x in range(num_fortes)], dtype=np.int64)
+    _, fraco_do_forte = np.unique(raizes, return_inverse=True)
+    return fraco_do_forte[forte] if num_fortes else forte.copy()
@@ -0,0 +1,83 @@
+# Geração de exports do Overpass sintéticos para os benchmarks.
+import json
+from osm_stream import iterar_elementos
+
+# Deslocamento de IDs entre cópias, maior que qualquer ID real do OSM.
+DESLOCAMENTO_ID = 10 ** 12
+
+def ampliar_export(arquivo_json, arquivo_saida, fator):
+    """
+    Gera um export fator vezes maior repetindo os elementos do original,
+    cada cópia com IDs próprios e deslocada para o norte, sem sobreposição.
+
+    Args:
+        arquivo_json (str): Export original.
+        arquivo_saida (str): Caminho do export ampliado.
+        fator (int): Número de cópias.
+    """
+    lat_min, lat_max = float('inf'), float('-inf')
+    for element in iterar_elementos(arquivo_json):
+        if element['type'] == 'node' and 'lat' in element:
+            lat_min = min(lat_min, element['lat'])
+            lat_max = max(lat_max, element['lat'])
+    altura = (lat_max - lat_min) * 1.01
+
+    with open(arquivo_saida, 'w', encoding='utf-8') as f:
+        f.write('{\n  "version": 0.6,\n  "generator": "dados_sinteticos.ampliar_export",\n  "elements": [\n')
+        primeiro = True
+        for copia in range(fator):
+            deslocamento = copia * DESLOCAMENTO_ID
+            for element in iterar_elementos(arquivo_json):
+                element = dict(element, id=element['id'] + deslocamento)
+                if element['type'] == 'node' and 'lat' in element:
+                    element['lat'] += copia * altura
+                elif element['type'] == 'way' and 'nodes' in element:
+                    element['nodes'] = [no + deslocamento for no in element['nodes']]
+                if not primeiro:
+                    f.write(',\n')
+                f.write(json.dumps(element, ensure_ascii=False))
+                primeiro = False
+        f.write('\n  ]\n}\n')
+
+def gerar_grade(arquivo_saida, linhas, colunas, espacamento_graus=0.001, fracao_mao_unica=0.2, semente=0):
+    """
+    Gera um export do Overpass com uma malha de ruas em grade: uma via por
+    linha e uma por coluna, com uma fração delas em mão única e pequenas
+    perturbações nas coordenadas para evitar empates entre caminhos.
+
+    Args:
+        arquivo_saida (str): Caminho do export gerado.
+        linhas, colunas (int): Dimensões da grade (nós = linhas * colunas).
+        espacamento_graus (float): Distância entre nós vizinhos, em graus.
+        fracao_mao_unica (float): Fração das vias marcadas com oneway=yes.
+        semente (int): Semente do gerador aleatório.
+    """
+    import random
+    rng = random.Random(semente)
+    lat_base, lon_base = -9.70, -35.80
+
+    def no_id(i, j):
+        return 1 + i * colunas + j
+
+    elementos = []
+    for i in range(linhas):
+        for j in range(colunas):
+            elementos.append({
+                'type': 'node', 'id': no_id(i, j),
+                'lat': lat_base + i * espacamento_graus + rng.uniform(-0.2, 0.2) * espacamento_graus,
+                'lon': lon_base + j * espacamento_graus + rng.uniform(-0.2, 0.2) * espacamento_graus,
+            })
+
+    vias = [[no_id(i, j) for j in range(colunas)] for i in range(linhas)]
+    vias += [[no_id(i, j) for i in range(linhas)] for j in range(colunas)]
+    tipos = ['residential', 'residential', 'tertiary', 'secondary', 'primary']
+    for k, nos in enumerate(vias):
+        tags = {'highway': rng.choice(tipos), 'name': f'Rua {k}'}
+        if rng.random() < fracao_mao_unica:
+            tags['oneway'] = 'yes'
+            if rng.random() < 0.5:
+                nos = nos[::-1]
+        elementos.append({'type': 'way', 'id': 10 ** 9 + k, 'nodes': nos, 'tags': tags})
+
+    with open(arquivo_saida, 'w', encoding='utf-8') as f:
+        json.dump({'version': 0.6, 'generator': 'dados_sinteticos.gerar_grade', 'elements': elementos}, f)
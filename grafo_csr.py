@@ -0,0 +1,429 @@
+import numpy as np
+
+class GrafoCSR:
+    """
+    Grafo dirigido compacto, armazenado em arrays no formato CSR
+    (Compressed Sparse Row), com a mesma interface de leitura do
+    networkx.DiGraph usada no projeto.
+
+    Os IDs do OpenStreetMap são remapeados para índices contíguos 0..N-1, na
+    ordem em que os nós aparecem no arquivo. As arestas que saem do nó i
+    ocupam as posições offsets[i]..offsets[i+1]-1 dos arrays de arestas.
+    Nomes de rua e tipos de via são guardados uma única vez em tabelas
+    (nomes, tipos) e cada aresta guarda apenas o índice na tabela.
+
+    Os pesos de cada perfil de roteamento (ver perfis.py) ficam em
+    pesos_por_perfil, um array por perfil alinhado com o de pesos.
+    """
+
+    def __init__(self, ids, lat, lon, offsets, destinos, pesos, nome_idx, tipo_idx, nomes, tipos,
+                 ordem=None, ids_ordenados=None, pesos_por_perfil=None):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.destinos = np.asarray(destinos, dtype=np.int32)
+        self.pesos = np.asarray(pesos, dtype=np.float64)
+        self.nome_idx = np.asarray(nome_idx, dtype=np.int32)
+        self.tipo_idx = np.asarray(tipo_idx, dtype=np.int16)
+        self.nomes = list(nomes)
+        self.tipos = list(tipos)
+        self.pesos_por_perfil = {nome: np.asarray(pesos_perfil, dtype=np.float64)
+                                 for nome, pesos_perfil in (pesos_por_perfil or {}).items()}
+
+        # Permutação que ordena os IDs, usada para converter ID -> índice
+        # com busca binária sem manter um dicionário com todos os nós.
+        if ordem is None:
+            ordem = np.argsort(self.ids, kind='stable')
+        self._ordem = np.asarray(ordem, dtype=np.int64)
+        if ids_ordenados is None:
+            ids_ordenados = self.ids[self._ordem]
+        self._ids_ordenados = np.asarray(ids_ordenados, dtype=np.int64)
+
+        # Memoryviews dão acesso elemento a elemento como int/float do Python,
+        # bem mais rápido que indexar o array numpy dentro dos laços de busca.
+        self._mv_ids = memoryview(self.ids)
+        self._mv_offsets = memoryview(self.offsets)
+        self._mv_destinos = memoryview(self.destinos)
+        self._mv_pesos = memoryview(self.pesos)
+
+        self._radianos = None
+        self._reverso = None
+
+        # Atributos do grafo, como o DiGraph.graph do networkx (por exemplo,
+        # o 'sha256' do arquivo de origem quando o grafo vem do cache).
+        self.graph = {}
+
+        self.nodes = _VisaoNos(self)
+        self.edges = _VisaoArestas(self)
+
+    # --- Construção ---
+
+    @classmethod
+    def de_listas(cls, nos, arestas, pesos_por_perfil=None):
+        """
+        Cria o grafo a partir de dicionários de nós e arestas.
+
+        Args:
+            nos (dict): {id_osm: (lat, lon)}, na ordem desejada dos nós.
+            arestas (dict): {(origem_id, destino_id): (peso, nome, highway)},
+                na ordem de inserção das arestas.
+            pesos_por_perfil (dict): {perfil: pesos}, com os pesos na ordem
+                de arestas.
+
+        Returns:
+            GrafoCSR: O grafo compacto.
+        """
+        num_nos = len(nos)
+        ids = np.fromiter(nos.keys(), dtype=np.int64, count=num_nos)
+        coords = np.array(list(nos.values()), dtype=np.float64).reshape(num_nos, 2)
+        indice = {no: i for i, no in enumerate(nos)}
+
+        num_arestas = len(arestas)
+        origens = np.empty(num_arestas, dtype=np.int64)
+        destinos = np.empty(num_arestas, dtype=np.int32)
+        pesos = np.empty(num_arestas, dtype=np.float64)
+        nome_idx = np.empty(num_arestas, dtype=np.int32)
+        tipo_idx = np.empty(num_arestas, dtype=np.int16)
+        tabela_nomes = {}
+        tabela_tipos = {}
+
+        for e, ((origem, destino), (peso, nome, tipo)) in enumerate(arestas.items()):
+            origens[e] = indice[origem]
+            destinos[e] = indice[destino]
+            pesos[e] = peso
+            nome_idx[e] = tabela_nomes.setdefault(nome, len(tabela_nomes))
+            tipo_idx[e] = tabela_tipos.setdefault(tipo, len(tabela_tipos))
+
+        return cls._de_arrays(ids, coords[:, 0], coords[:, 1], origens, destinos, pesos,
+                              nome_idx, tipo_idx, list(tabela_nomes), list(tabela_tipos), pesos_por_perfil)
+
+    @classmethod
+    def de_segmentos(cls, ids, lat, lon, origens, destinos, pesos, mao_unica, nome_idx, tipo_idx, nomes, tipos,
+                     pesos_por_perfil=None):
+        """
+        Cria o grafo a partir dos segmentos das vias, já como arrays de
+        índices de nós, na ordem em que aparecem no arquivo.
+
+        Segmentos de mão dupla geram também a aresta de volta. Arestas
+        repetidas são resolvidas como no add_edge do networkx: a aresta de
+        ida sobrescreve os atributos de uma existente, a de volta só é
+        criada se ainda não existir, e a posição é a da primeira inserção.
+
+        Args:
+            ids, lat, lon: Arrays com ID do OSM e coordenadas de cada nó.
+            origens, destinos: Índices dos nós de cada segmento.
+            pesos: Comprimento de cada segmento.
+            mao_unica: Array booleano, True para segmentos de mão única.
+            nome_idx, tipo_idx: Índices de cada segmento nas tabelas nomes e tipos.
+            nomes, tipos: Tabelas de nomes de rua e tipos de via.
+            pesos_por_perfil (dict): {perfil: peso de cada segmento}.
+
+        Returns:
+            GrafoCSR: O grafo compacto.
+        """
+        origens = np.asarray(origens, dtype=np.int64)
+        destinos = np.asarray(destinos, dtype=np.int64)
+        mao_dupla = ~np.asarray(mao_unica, dtype=bool)
+        num_segmentos = len(origens)
+
+        # Sequência de inserções: cada segmento gera a ida e, se for de mão
+        # dupla, a volta logo em seguida.
+        sequencia = np.sort(np.concatenate([np.arange(num_segmentos) * 2, np.flatnonzero(mao_dupla) * 2 + 1]))
+        segmento = sequencia // 2
+        ida = (sequencia % 2) == 0
+        u = np.where(ida, origens[segmento], destinos[segmento])
+        v = np.where(ida, destinos[segmento], origens[segmento])
+        chave = u * len(ids) + v
+
+        # Para cada aresta, os atributos vêm da última inserção de ida ou,
+        # se só houver voltas, da primeira volta.
+        prioridade = np.where(ida, sequencia, -sequencia)
+        ordem = np.lexsort((prioridade, ida, chave))
+        ultimo_do_grupo = np.ones(len(ordem), dtype=bool)
+        ultimo_do_grupo[:-1] = chave[ordem][1:] != chave[ordem][:-1]
+        escolhido = ordem[ultimo_do_grupo]
+
+        # A posição da aresta é a da primeira inserção da chave.
+        _, primeira = np.unique(chave, return_index=True)
+        escolhido = escolhido[np.argsort(primeira, kind='stable')]
+
+        segmento = segmento[escolhido]
+        return cls._de_arrays(ids, lat, lon, u[escolhido], v[escolhido],
+                              np.asarray(pesos, dtype=np.float64)[segmento],
+                              np.asarray(nome_idx, dtype=np.int32)[segmento],
+                              np.asarray(tipo_idx, dtype=np.int16)[segmento], nomes, tipos,
+                              {nome: np.asarray(pesos_perfil, dtype=np.float64)[segmento]
+                               for nome, pesos_perfil in (pesos_por_perfil or {}).items()})
+
+    @classmethod
+    def _de_arrays(cls, ids, lat, lon, origens, destinos, pesos, nome_idx, tipo_idx, nomes, tipos,
+                   pesos_por_perfil=None):
+        # Ordenação estável por origem: preserva, para cada nó, a ordem de
+        # inserção dos vizinhos (a mesma ordem que o networkx usaria).
+        ordem = np.argsort(origens, kind='stable')
+        contagem = np.bincount(origens, minlength=len(ids))
+        offsets = np.zeros(len(ids) + 1, dtype=np.int64)
+        np.cumsum(contagem, out=offsets[1:])
+        return cls(ids, lat, lon, offsets, destinos[ordem], pesos[ordem],
+                   nome_idx[ordem], tipo_idx[ordem], nomes, tipos,
+                   pesos_por_perfil={nome: np.asarray(pesos_perfil, dtype=np.float64)[ordem]
+                                     for nome, pesos_perfil in (pesos_por_perfil or {}).items()})
+
+    @classmethod
+    def de_networkx(cls, grafo):
+        """
+        Converte um networkx.DiGraph criado por criar_grafo_do_json.
+        """
+        nos = {no: (dados['lat'], dados['lon']) for no, dados in grafo.nodes(data=True)}
+        arestas = {
+            (origem, destino): (dados.get('weight', 1), dados.get('name', 'unknown'),
+                                dados.get('highway', 'unclassified'))
+            for origem, destino, dados in grafo.edges(data=True)
+        }
+        perfis = grafo.graph.get('perfis', {})
+        pesos_por_perfil = {
+            nome: [dados.get(perfil.atributo, float('inf')) for _, _, dados in grafo.edges(data=True)]
+            for nome, perfil in perfis.items()
+        }
+        compacto = cls.de_listas(nos, arestas, pesos_por_perfil)
+        compacto.graph['perfis'] = dict(perfis)
+        return compacto
+
+    def acrescentar(self, nos, arestas, pesos_por_perfil=None):
+        """
+        Acrescenta nós e arestas, reconstruindo os arrays no próprio objeto,
+        de modo que as referências existentes ao grafo continuam válidas.
+        Os nós novos recebem os índices seguintes aos atuais e as arestas
+        novas ficam depois das existentes entre os vizinhos de cada nó.
+
+        Args:
+            nos (dict): {id_osm: (lat, lon)} dos nós novos.
+            arestas (list): [(origem_id, destino_id, peso, nome, highway)]
+                das arestas novas.
+            pesos_por_perfil (dict): {perfil: pesos das arestas novas}; nos
+                perfis omitidos, as arestas novas ficam inacessíveis.
+        """
+        num_antigos = len(self.ids)
+        novos = {no: num_antigos + k for k, no in enumerate(nos)}
+        coords = np.array(list(nos.values()), dtype=np.float64).reshape(-1, 2)
+        tabela_nomes = {nome: i for i, nome in enumerate(self.nomes)}
+        tabela_tipos = {tipo: i for i, tipo in enumerate(self.tipos)}
+
+        def indice(no):
+            return novos[no] if no in novos else self.indice(no)
+
+        origens = [indice(origem) for origem, _, _, _, _ in arestas]
+        destinos = [indice(destino) for _, destino, _, _, _ in arestas]
+        nome_idx = [tabela_nomes.setdefault(nome, len(tabela_nomes)) for _, _, _, nome, _ in arestas]
+        tipo_idx = [tabela_tipos.setdefault(tipo, len(tabela_tipos)) for _, _, _, _, tipo in arestas]
+        pesos = [peso for _, _, peso, _, _ in arestas]
+        novos_pesos_perfil = pesos_por_perfil or {}
+
+        novo = GrafoCSR._de_arrays(
+            np.concatenate([self.ids, np.fromiter(novos, dtype=np.int64, count=len(novos))]),
+            np.concatenate([self.lat, coords[:, 0]]), np.concatenate([self.lon, coords[:, 1]]),
+            np.concatenate([self.origens_das_arestas(), np.array(origens, dtype=np.int64)]),
+            np.concatenate([self.destinos, np.array(destinos, dtype=np.int32)]),
+            np.concatenate([self.pesos, np.array(pesos, dtype=np.float64)]),
+            np.concatenate([self.nome_idx, np.array(nome_idx, dtype=np.int32)]),
+            np.concatenate([self.tipo_idx, np.array(tipo_idx, dtype=np.int16)]),
+            list(tabela_nomes), list(tabela_tipos),
+            {nome: np.concatenate([pesos_perfil, np.array(novos_pesos_perfil.get(nome, [np.inf] * len(arestas)),
+                                                          dtype=np.float64)])
+             for nome, pesos_perfil in self.pesos_por_perfil.items()})
+        graph = self.graph
+        self.__init__(novo.ids, novo.lat, novo.lon, novo.offsets, novo.destinos, novo.pesos,
+                      novo.nome_idx, novo.tipo_idx, novo.nomes, novo.tipos,
+                      pesos_por_perfil=novo.pesos_por_perfil)
+        self.graph = graph
+
+    # --- Conversão entre IDs do OSM e índices internos ---
+
+    def indice(self, no):
+        """
+        Retorna o índice interno de um ID do OSM (KeyError se não existir).
+        """
+        pos = int(np.searchsorted(self._ids_ordenados, no))
+        if pos < len(self._ids_ordenados) and self._ids_ordenados[pos] == no:
+            return int(self._ordem[pos])
+        raise KeyError(no)
+
+    def indices(self, nos):
+        """
+        Versão vetorizada de indice() para um array de IDs do OSM.
+        """
+        nos = np.asarray(nos, dtype=np.int64)
+        pos = np.searchsorted(self._ids_ordenados, nos)
+        pos_valida = np.minimum(pos, len(self._ids_ordenados) - 1)
+        if len(nos) and not np.all(self._ids_ordenados[pos_valida] == nos):
+            faltando = nos[self._ids_ordenados[pos_valida] != nos]
+            raise KeyError(int(faltando[0]))
+        return self._ordem[pos_valida]
+
+    # --- Interface compatível com networkx.DiGraph ---
+
+    def number_of_nodes(self):
+        return len(self.ids)
+
+    def number_of_edges(self):
+        return len(self.destinos)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.ids.tolist())
+
+    def __contains__(self, no):
+        try:
+            self.indice(no)
+        except (KeyError, TypeError):
+            return False
+        return True
+
+    has_node = __contains__
+
+    def _aresta(self, i, j):
+        # Posição da aresta i -> j nos arrays de arestas, ou -1.
+        inicio, fim = self._mv_offsets[i], self._mv_offsets[i + 1]
+        for e in range(inicio, fim):
+            if self._mv_destinos[e] == j:
+                return e
+        return -1
+
+    def has_edge(self, origem, destino):
+        if origem not in self or destino not in self:
+            return False
+        return self._aresta(self.indice(origem), self.indice(destino)) >= 0
+
+    def _dados_aresta(self, e):
+        dados = {
+            'weight': self._mv_pesos[e],
+            'name': self.nomes[self.nome_idx[e]],
+            'highway': self.tipos[self.tipo_idx[e]],
+        }
+        for nome, pesos_perfil in self.pesos_por_perfil.items():
+            dados[f'tempo_{nome}'] = float(pesos_perfil[e])
+        return dados
+
+    def pesos_do_perfil(self, nome):
+        """
+        Array com o peso de cada aresta no perfil (ValueError se o perfil
+        não foi compilado no grafo).
+        """
+        if nome not in self.pesos_por_perfil:
+            raise ValueError(f"O perfil {nome} não foi compilado neste grafo.")
+        return self.pesos_por_perfil[nome]
+
+    def successors(self, no):
+        i = self.indice(no)
+        inicio, fim = self._mv_offsets[i], self._mv_offsets[i + 1]
+        return iter(self.ids[self.destinos[inicio:fim]].tolist())
+
+    neighbors = successors
+
+    def __getitem__(self, no):
+        """
+        Adjacência de um nó no formato {vizinho: {weight, name, highway}}.
+        """
+        i = self.indice(no)
+        inicio, fim = self._mv_offsets[i], self._mv_offsets[i + 1]
+        return {self._mv_ids[self._mv_destinos[e]]: self._dados_aresta(e) for e in range(inicio, fim)}
+
+    def coordenadas_radianos(self):
+        """
+        Latitude e longitude em radianos e cosseno da latitude de cada nó,
+        calculados uma única vez e usados pela heurística do A*.
+
+        Returns:
+            tuple: (lat_rad, lon_rad, cos_lat), arrays float64.
+        """
+        if self._radianos is None:
+            lat_rad = np.radians(self.lat)
+            self._radianos = (lat_rad, np.radians(self.lon), np.cos(lat_rad))
+        return self._radianos
+
+    def origens_das_arestas(self):
+        """
+        Índice do nó de origem de cada aresta (o inverso de offsets).
+        """
+        return np.repeat(np.arange(len(self.ids), dtype=np.int32), np.diff(self.offsets))
+
+    def csr_reverso(self):
+        """
+        Arestas agrupadas pelo nó de destino, para buscas no sentido
+        contrário (do destino para a origem). Calculado uma única vez.
+
+        Returns:
+            tuple: (offsets, origens, pesos) no mesmo formato CSR do grafo.
+        """
+        if self._reverso is None:
+            ordem = np.argsort(self.destinos, kind='stable')
+            contagem = np.bincount(self.destinos, minlength=len(self.ids))
+            offsets = np.zeros(len(self.ids) + 1, dtype=np.int64)
+            np.cumsum(contagem, out=offsets[1:])
+            self._reverso = (offsets, self.origens_das_arestas()[ordem], self.pesos[ordem])
+        return self._reverso
+
+    def tamanho_em_bytes(self):
+        """
+        Memória ocupada pelos arrays do grafo (sem contar as tabelas de nomes).
+        """
+        arrays = (self.ids, self.lat, self.lon, self.offsets, self.destinos, self.pesos,
+                  self.nome_idx, self.tipo_idx, self._ordem, self._ids_ordenados, *self.pesos_por_perfil.values())
+        return sum(a.nbytes for a in arrays)
+
+class _VisaoNos:
+    """
+    Equivalente a grafo.nodes do networkx: iterável, indexável por ID e
+    chamável com data=True.
+    """
+
+    def __init__(self, grafo):
+        self._grafo = grafo
+
+    def __call__(self, data=False):
+        grafo = self._grafo
+        if data:
+            return ((no, {'lat': lat, 'lon': lon})
+                    for no, lat, lon in zip(grafo.ids.tolist(), grafo.lat.tolist(), grafo.lon.tolist()))
+        return iter(grafo)
+
+    def __iter__(self):
+        return iter(self._grafo)
+
+    def __len__(self):
+        return len(self._grafo)
+
+    def __contains__(self, no):
+        return no in self._grafo
+
+    def __getitem__(self, no):
+        i = self._grafo.indice(no)
+        return {'lat': float(self._grafo.lat[i]), 'lon': float(self._grafo.lon[i])}
+
+class _VisaoArestas:
+    """
+    Equivalente a grafo.edges do networkx, chamável com data=True.
+    """
+
+    def __init__(self, grafo):
+        self._grafo = grafo
+
+    def __call__(self, data=False):
+        grafo = self._grafo
+        ids = grafo._mv_ids
+        destinos = grafo._mv_destinos
+        for i in range(grafo.number_of_nodes()):
+            for e in range(grafo._mv_offsets[i], grafo._mv_offsets[i + 1]):
+                if data:
+                    yield ids[i], ids[destinos[e]], grafo._dados_aresta(e)
+                else:
+                    yield ids[i], ids[destinos[e]]
+
+    def __iter__(self):
+        return self()
+
+    def __len__(self):
+        return self._grafo.number_of_edges()
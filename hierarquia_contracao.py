@@ -0,0 +1,389 @@
+import json
+import os
+from heapq import heappush, heappop
+from itertools import count
+import numpy as np
+from grafo_csr import GrafoCSR
+from cache_grafo import substituir_pasta
+
+# Incrementar sempre que o formato gravado em disco mudar.
+VERSAO_HIERARQUIA = 2
+
+ARRAYS_HIERARQUIA = ('ids', 'nivel', 'subida_offsets', 'subida_destinos', 'subida_pesos', 'subida_meios',
+                     'descida_offsets', 'descida_origens', 'descida_pesos', 'descida_meios')
+
+class HierarquiaContracao:
+    """
+    Resultado do pré-processamento de Contraction Hierarchies.
+
+    Cada nó recebe um nível (a ordem em que foi contraído). As arestas do
+    grafo original e os atalhos criados durante a contração são divididos em:
+
+    - subida: arestas u -> v com nivel[u] < nivel[v], agrupadas por u
+      (usadas pela busca a partir da origem);
+    - descida: arestas u -> v com nivel[u] > nivel[v], agrupadas por v
+      (usadas pela busca reversa a partir do destino).
+
+    Para cada aresta, meio guarda o nó contraído que o atalho substitui,
+    ou -1 se for uma aresta do grafo original.
+
+    origem identifica o grafo contraído: {'sha256', 'nos', 'arestas'}, com
+    o 'sha256' do arquivo de origem (None se o grafo não o tiver) e os
+    totais de nós e arestas.
+    """
+
+    def __init__(self, ids, nivel, subida_offsets, subida_destinos, subida_pesos, subida_meios,
+                 descida_offsets, descida_origens, descida_pesos, descida_meios, origem=None):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.nivel = np.asarray(nivel, dtype=np.int32)
+        self.subida_offsets = np.asarray(subida_offsets, dtype=np.int64)
+        self.subida_destinos = np.asarray(subida_destinos, dtype=np.int32)
+        self.subida_pesos = np.asarray(subida_pesos, dtype=np.float64)
+        self.subida_meios = np.asarray(subida_meios, dtype=np.int32)
+        self.descida_offsets = np.asarray(descida_offsets, dtype=np.int64)
+        self.descida_origens = np.asarray(descida_origens, dtype=np.int32)
+        self.descida_pesos = np.asarray(descida_pesos, dtype=np.float64)
+        self.descida_meios = np.asarray(descida_meios, dtype=np.int32)
+        self.origem = dict(origem) if origem is not None else _identidade(None)
+
+        self._ordem = np.argsort(self.ids, kind='stable')
+        self._ids_ordenados = self.ids[self._ordem]
+        self._mv = {nome: memoryview(getattr(self, nome)) for nome in ARRAYS_HIERARQUIA}
+
+    def indice(self, no):
+        """
+        Retorna o índice interno de um ID do OSM (KeyError se não existir).
+        """
+        pos = int(np.searchsorted(self._ids_ordenados, no))
+        if pos < len(self._ids_ordenados) and self._ids_ordenados[pos] == no:
+            return int(self._ordem[pos])
+        raise KeyError(no)
+
+    def number_of_nodes(self):
+        return len(self.ids)
+
+    def numero_de_arestas(self):
+        """
+        Total de arestas da hierarquia (originais + atalhos).
+        """
+        return len(self.subida_destinos) + len(self.descida_origens)
+
+    def numero_de_atalhos(self):
+        return int(np.count_nonzero(self.subida_meios >= 0) + np.count_nonzero(self.descida_meios >= 0))
+
+    def do_grafo(self, grafo):
+        """
+        Indica se a hierarquia foi construída para este grafo: mesmo arquivo
+        de origem (quando os dois têm 'sha256'), mesmos totais de nós e
+        arestas e mesmos nós (no GrafoCSR, também na mesma ordem).
+        """
+        atual = _identidade(grafo)
+        if self.origem['sha256'] is not None and atual['sha256'] is not None \
+                and self.origem['sha256'] != atual['sha256']:
+            return False
+        if (self.origem['nos'], self.origem['arestas']) != (atual['nos'], atual['arestas']):
+            return False
+        if isinstance(grafo, GrafoCSR):
+            return np.array_equal(self.ids, grafo.ids)
+        ids = np.fromiter(grafo.nodes(), dtype=np.int64, count=grafo.number_of_nodes())
+        return np.array_equal(self._ids_ordenados, np.sort(ids))
+
+def _identidade(grafo):
+    if grafo is None:
+        return {'sha256': None, 'nos': None, 'arestas': None}
+    return {'sha256': grafo.graph.get('sha256'), 'nos': grafo.number_of_nodes(), 'arestas': grafo.number_of_edges()}
+
+# --- Pré-processamento ---
+
+def construir_hierarquia(grafo, max_fixados_testemunha=100, mostrar_progresso=False):
+    """
+    Contrai os nós do grafo um a um, na ordem dada pela diferença de arestas
+    (atalhos criados - arestas removidas) somada ao número de vizinhos já
+    contraídos e à profundidade do nó na hierarquia, com atualização
+    preguiçosa das prioridades.
+
+    Ao contrair v, para cada par u -> v -> w procura-se um caminho de u a w
+    que não passe por v e não seja mais longo (busca de testemunha). Se não
+    houver, cria-se o atalho u -> w. A busca de testemunha é limitada a
+    max_fixados_testemunha nós; quando o limite corta a busca, o atalho é
+    criado mesmo que talvez não fosse necessário, o que não afeta a
+    correção das consultas.
+
+    Args:
+        grafo: Grafo do NetworkX ou GrafoCSR
+        max_fixados_testemunha (int): Limite de nós fixados por busca de testemunha.
+        mostrar_progresso (bool): Imprime o andamento da contração.
+
+    Returns:
+        HierarquiaContracao: A hierarquia pronta para consultas.
+    """
+    origem = _identidade(grafo)
+    if not isinstance(grafo, GrafoCSR):
+        grafo = GrafoCSR.de_networkx(grafo)
+
+    num_nos = grafo.number_of_nodes()
+    saida = [dict() for _ in range(num_nos)]
+    entrada = [dict() for _ in range(num_nos)]
+    arestas = {}
+    for u, v, peso in zip(grafo.origens_das_arestas().tolist(), grafo.destinos.tolist(), grafo.pesos.tolist()):
+        # Laços e arestas fechadas (peso infinito) não entram na hierarquia.
+        if u == v or peso == float('inf'):
+            continue
+        if v not in saida[u] or peso < saida[u][v][0]:
+            saida[u][v] = entrada[v][u] = arestas[(u, v)] = (peso, -1)
+
+    vizinhos_contraidos = [0] * num_nos
+    profundidade = [0] * num_nos
+    nivel = [0] * num_nos
+
+    def atalhos_necessarios(v):
+        atalhos = []
+        for u, (peso_uv, _) in entrada[v].items():
+            alvos = {w: peso_uv + peso_vw for w, (peso_vw, _) in saida[v].items() if w != u}
+            if not alvos:
+                continue
+            distancias = _busca_testemunha(saida, u, v, alvos, max_fixados_testemunha)
+            for w, peso_uvw in alvos.items():
+                if distancias.get(w, float('inf')) > peso_uvw:
+                    atalhos.append((u, w, peso_uvw))
+        return atalhos
+
+    def prioridade(v, atalhos):
+        return len(atalhos) - len(entrada[v]) - len(saida[v]) + vizinhos_contraidos[v] + profundidade[v]
+
+    fila = [(prioridade(v, atalhos_necessarios(v)), v) for v in range(num_nos)]
+    fila.sort()
+
+    proximo_nivel = 0
+    while fila:
+        _, v = heappop(fila)
+        atalhos = atalhos_necessarios(v)
+        nova_prioridade = prioridade(v, atalhos)
+        if fila and nova_prioridade > fila[0][0]:
+            heappush(fila, (nova_prioridade, v))
+            continue
+
+        for u, w, peso in atalhos:
+            if w not in saida[u] or peso < saida[u][w][0]:
+                saida[u][w] = entrada[w][u] = arestas[(u, w)] = (peso, v)
+
+        vizinhos = set(entrada[v]) | set(saida[v])
+        for u in entrada[v]:
+            del saida[u][v]
+        for w in saida[v]:
+            del entrada[w][v]
+        entrada[v].clear()
+        saida[v].clear()
+        for n in vizinhos:
+            vizinhos_contraidos[n] += 1
+            profundidade[n] = max(profundidade[n], profundidade[v] + 1)
+
+        nivel[v] = proximo_nivel
+        proximo_nivel += 1
+        if mostrar_progresso and proximo_nivel % 10000 == 0:
+            print(f"   {proximo_nivel}/{num_nos} nos contraidos, {len(arestas)} arestas")
+
+    return _montar_hierarquia(grafo.ids, nivel, arestas, origem)
+
+def _busca_testemunha(saida, origem, ignorado, alvos, max_fixados):
+    """
+    Dijkstra limitado a partir de origem, evitando o nó ignorado. Para
+    quando todos os alvos foram fixados, quando a distância passa do maior
+    custo em alvos ou quando max_fixados nós foram fixados.
+
+    Returns:
+        dict: Distâncias dos nós fixados.
+    """
+    limite = max(alvos.values())
+    restantes = len(alvos)
+    distancias = {}
+    vistos = {origem: 0}
+    fila = [(0, origem)]
+    while fila and len(distancias) < max_fixados:
+        dist_v, v = heappop(fila)
+        if v in distancias:
+            continue
+        if dist_v > limite:
+            break
+        distancias[v] = dist_v
+        if v in alvos:
+            restantes -= 1
+            if restantes == 0:
+                break
+        for u, (peso, _) in saida[v].items():
+            if u == ignorado:
+                continue
+            dist_u = dist_v + peso
+            if u not in vistos or dist_u < vistos[u]:
+                vistos[u] = dist_u
+                heappush(fila, (dist_u, u))
+    return distancias
+
+def _montar_hierarquia(ids, nivel, arestas, origem):
+    num_nos = len(ids)
+    nivel = np.array(nivel, dtype=np.int32)
+    if arestas:
+        origens, destinos = (np.array(x, dtype=np.int64) for x in zip(*arestas.keys()))
+        pesos, meios = (np.array(x) for x in zip(*arestas.values()))
+    else:
+        origens = destinos = meios = np.empty(0, dtype=np.int64)
+        pesos = np.empty(0, dtype=np.float64)
+    sobe = nivel[origens] < nivel[destinos]
+
+    def agrupar(chave, outro, mascara):
+        ordem = np.argsort(chave[mascara], kind='stable')
+        offsets = np.zeros(num_nos + 1, dtype=np.int64)
+        np.cumsum(np.bincount(chave[mascara], minlength=num_nos), out=offsets[1:])
+        return offsets, outro[mascara][ordem], pesos[mascara][ordem], meios[mascara][ordem]
+
+    return HierarquiaContracao(ids, nivel, *agrupar(origens, destinos, sobe), *agrupar(destinos, origens, ~sobe),
+                               origem)
+
+# --- Consulta ---
+
+def consultar_hierarquia(hierarquia, origem_id, destino_id, estatisticas=None):
+    """
+    Caminho mínimo entre dois nós usando a hierarquia: busca bidirecional em
+    que a origem só sobe de nível e o destino só desce (no sentido reverso).
+    Os atalhos do caminho encontrado são desfeitos recursivamente, então o
+    resultado é a sequência de nós do grafo original.
+
+    Args:
+        hierarquia (HierarquiaContracao): Resultado de construir_hierarquia.
+        origem_id: ID do nó de origem
+        destino_id: ID do nó de destino
+        estatisticas: Dicionário opcional que recebe 'nos_fixados'
+
+    Returns:
+        list or None: Caminho como lista de IDs, ou None se não houver caminho.
+    """
+    origem, destino = hierarquia.indice(origem_id), hierarquia.indice(destino_id)
+    mv = hierarquia._mv
+    adjacencias = (
+        (mv['subida_offsets'], mv['subida_destinos'], mv['subida_pesos']),
+        (mv['descida_offsets'], mv['descida_origens'], mv['descida_pesos']),
+    )
+    fixados = ({}, {})
+    vistos = ({origem: 0}, {destino: 0})
+    predecessores = ({origem: None}, {destino: None})
+    contador = count()
+    filas = ([(0, next(contador), origem)], [(0, next(contador), destino)])
+    mu = float('inf')
+    encontro = origem if origem == destino else None
+    if encontro is not None:
+        mu = 0
+
+    while filas[0] or filas[1]:
+        # Cada lado para quando seu menor valor já não pode melhorar mu.
+        for lado in (0, 1):
+            if filas[lado] and filas[lado][0][0] >= mu:
+                filas[lado].clear()
+        if not (filas[0] or filas[1]):
+            break
+        if not filas[1] or (filas[0] and filas[0][0][0] <= filas[1][0][0]):
+            lado = 0
+        else:
+            lado = 1
+        dist_v, _, v = heappop(filas[lado])
+        if v in fixados[lado]:
+            continue
+        fixados[lado][v] = dist_v
+        if v in vistos[1 - lado] and dist_v + vistos[1 - lado][v] < mu:
+            mu = dist_v + vistos[1 - lado][v]
+            encontro = v
+
+        offsets, vizinhos, pesos = adjacencias[lado]
+        inicio, fim = offsets[v], offsets[v + 1]
+        for u, peso in zip(vizinhos[inicio:fim], pesos[inicio:fim]):
+            dist_u = dist_v + peso
+            if u not in vistos[lado] or dist_u < vistos[lado][u]:
+                vistos[lado][u] = dist_u
+                predecessores[lado][u] = v
+                heappush(filas[lado], (dist_u, next(contador), u))
+
+    if estatisticas is not None:
+        estatisticas['nos_fixados'] = len(fixados[0]) + len(fixados[1])
+    if encontro is None:
+        return None
+
+    caminho_ch = []
+    v = encontro
+    while v is not None:
+        caminho_ch.append(v)
+        v = predecessores[0][v]
+    caminho_ch.reverse()
+    v = predecessores[1][encontro]
+    while v is not None:
+        caminho_ch.append(v)
+        v = predecessores[1][v]
+
+    caminho = [caminho_ch[0]]
+    for u, v in zip(caminho_ch, caminho_ch[1:]):
+        _desempacotar(hierarquia, u, v, caminho)
+    ids = mv['ids']
+    return [ids[v] for v in caminho]
+
+def _meio_da_aresta(hierarquia, u, v):
+    # A aresta u -> v está na subida de u ou na descida de v, conforme os níveis.
+    mv = hierarquia._mv
+    if mv['nivel'][u] < mv['nivel'][v]:
+        offsets, vizinhos, meios, dono, outro = mv['subida_offsets'], mv['subida_destinos'], mv['subida_meios'], u, v
+    else:
+        offsets, vizinhos, meios, dono, outro = mv['descida_offsets'], mv['descida_origens'], mv['descida_meios'], v, u
+    for e in range(offsets[dono], offsets[dono + 1]):
+        if vizinhos[e] == outro:
+            return meios[e]
+    raise KeyError((u, v))
+
+def _desempacotar(hierarquia, u, v, caminho):
+    # Acrescenta ao caminho os nós originais da aresta u -> v (sem u).
+    pilha = [(u, v)]
+    while pilha:
+        a, b = pilha.pop()
+        meio = _meio_da_aresta(hierarquia, a, b)
+        if meio < 0:
+            caminho.append(b)
+        else:
+            pilha.append((meio, b))
+            pilha.append((a, meio))
+
+# --- Persistência ---
+
+def salvar_hierarquia(hierarquia, pasta):
+    """
+    Grava a hierarquia em uma pasta, um arquivo .npy por array.
+    """
+    pasta_temporaria = f"{pasta}.tmp-{os.getpid()}"
+    os.makedirs(pasta_temporaria, exist_ok=True)
+    for nome in ARRAYS_HIERARQUIA:
+        np.save(os.path.join(pasta_temporaria, nome + '.npy'), getattr(hierarquia, nome))
+    with open(os.path.join(pasta_temporaria, 'metadados.json'), 'w', encoding='utf-8') as f:
+        json.dump({'versao': VERSAO_HIERARQUIA, 'origem': hierarquia.origem}, f)
+    substituir_pasta(pasta_temporaria, pasta)
+
+def carregar_hierarquia(pasta, grafo=None):
+    """
+    Carrega uma hierarquia gravada por salvar_hierarquia, com os arrays
+    mapeados em memória.
+
+    Args:
+        pasta: Pasta gravada por salvar_hierarquia.
+        grafo: Se dado, a hierarquia só é carregada se tiver sido
+            construída para ele (ver HierarquiaContracao.do_grafo).
+
+    Returns:
+        HierarquiaContracao or None: A hierarquia, ou None se a pasta não
+        existir, for de uma versão antiga do formato ou de outro grafo.
+    """
+    try:
+        with open(os.path.join(pasta, 'metadados.json'), 'r', encoding='utf-8') as f:
+            metadados = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if metadados.get('versao') != VERSAO_HIERARQUIA:
+        return None
+    arrays = [np.load(os.path.join(pasta, nome + '.npy'), mmap_mode='r') for nome in ARRAYS_HIERARQUIA]
+    hierarquia = HierarquiaContracao(*arrays, metadados['origem'])
+    if grafo is not None and not hierarquia.do_grafo(grafo):
+        return None
+    return hierarquia
@@ -0,0 +1,256 @@
+import numpy as np
+from parser import RAIO_TERRA_M, haversine_vetorizado
+from grafo_csr import GrafoCSR
+
+class IndiceEspacial:
+    """
+    Índice em grade para encontrar o nó (ou a aresta) mais próximo de uma
+    coordenada GPS sem percorrer todos os nós do grafo.
+
+    As coordenadas são projetadas em metros (equirretangular, centrada na
+    latitude média do grafo) e divididas em células quadradas com, em média,
+    um nó cada. Uma consulta examina blocos de células cada vez maiores em
+    volta do ponto até que o melhor candidato esteja mais perto que a borda
+    do bloco, o que garante que nenhum item de fora seria melhor.
+
+    A distância até os nós é a de Haversine, igual à de uma varredura
+    completa. A distância até as arestas é medida no plano projetado, o que
+    na escala de uma cidade difere da geodésica em frações de milímetro.
+    """
+
+    def __init__(self, grafo, arestas=False):
+        """
+        Args:
+            grafo: Grafo do NetworkX ou GrafoCSR
+            arestas (bool): Também indexa as arestas, para aresta_mais_proxima().
+        """
+        if isinstance(grafo, GrafoCSR):
+            self.ids = np.asarray(grafo.ids)
+            self.lat = np.asarray(grafo.lat)
+            self.lon = np.asarray(grafo.lon)
+        else:
+            nos = list(grafo.nodes(data=True))
+            self.ids = np.array([no for no, _ in nos], dtype=np.int64)
+            self.lat = np.array([dados['lat'] for _, dados in nos], dtype=np.float64)
+            self.lon = np.array([dados['lon'] for _, dados in nos], dtype=np.float64)
+
+        self._cos_lat0 = float(np.cos(np.radians(self.lat.mean()))) if len(self.lat) else 1.0
+        self._lat_max = float(np.abs(self.lat).max()) if len(self.lat) else 0.0
+        self._x, self._y = self._projetar(self.lat, self.lon)
+
+        # Geometria da grade: cerca de um nó por célula.
+        x_min, y_min = float(self._x.min()), float(self._y.min())
+        largura = max(float(self._x.max()) - x_min, 1.0)
+        altura = max(float(self._y.max()) - y_min, 1.0)
+        tamanho = max(np.sqrt(largura * altura / max(len(self.ids), 1)), 1.0)
+        colunas = int(largura // tamanho) + 1
+        linhas = int(altura // tamanho) + 1
+        geometria = (x_min, y_min, tamanho, colunas, linhas)
+        self._nos = _Grade(geometria, self._x, self._y, self._x, self._y)
+
+        self._arestas = None
+        if arestas:
+            if isinstance(grafo, GrafoCSR):
+                origens = grafo.origens_das_arestas()
+                destinos = np.asarray(grafo.destinos, dtype=np.int64)
+            else:
+                posicoes = dict(zip(self.ids.tolist(), range(len(self.ids))))
+                pares = np.array([(posicoes[u], posicoes[v]) for u, v in grafo.edges()],
+                                 dtype=np.int64).reshape(-1, 2)
+                origens, destinos = pares[:, 0], pares[:, 1]
+            self._aresta_origens, self._aresta_destinos = origens, destinos
+            self._extremos = (self._x[origens], self._y[origens], self._x[destinos], self._y[destinos])
+            x_o, y_o, x_d, y_d = self._extremos
+            self._arestas = _Grade(geometria, np.minimum(x_o, x_d), np.minimum(y_o, y_d),
+                                   np.maximum(x_o, x_d), np.maximum(y_o, y_d))
+
+    def grafo_atualizado(self, grafo, arestas, apenas_aumentos, estrutura):
+        """
+        Chamado pelo AtualizadorGrafo após cada alteração do grafo. Mudanças
+        de peso não afetam o índice (arestas fechadas continuam indexadas,
+        pois um ponto GPS pode estar sobre uma rua interditada); quando nós
+        ou arestas são acrescentados, o índice é refeito.
+        """
+        if estrutura:
+            self.__init__(grafo, arestas=self._arestas is not None)
+
+    def _projetar(self, lat, lon):
+        lat_rad = np.radians(np.asarray(lat, dtype=np.float64))
+        lon_rad = np.radians(np.asarray(lon, dtype=np.float64))
+        return RAIO_TERRA_M * self._cos_lat0 * lon_rad, RAIO_TERRA_M * lat_rad
+
+    def _desprojetar(self, x, y):
+        return np.degrees(y / RAIO_TERRA_M), np.degrees(x / (RAIO_TERRA_M * self._cos_lat0))
+
+    # --- Nós ---
+
+    def no_mais_proximo(self, lat, lon):
+        """
+        Retorna (ID do nó mais próximo, distância em metros).
+        """
+        ids, distancias = self.nos_mais_proximos([lat], [lon])
+        return int(ids[0]), float(distancias[0])
+
+    def nos_mais_proximos(self, lats, lons):
+        """
+        Versão em lote de no_mais_proximo(): as consultas que caem na mesma
+        célula são resolvidas juntas, com operações vetorizadas.
+
+        Returns:
+            tuple: (ids, distancias) como arrays numpy, na ordem das consultas.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        x, y = self._projetar(lats, lons)
+
+        def distancia(consultas, candidatos):
+            return haversine_vetorizado(lats[consultas, None], lons[consultas, None],
+                                        self.lat[candidatos][None, :], self.lon[candidatos][None, :])
+
+        # A projeção encurta as distâncias leste-oeste em latitudes mais
+        # afastadas do equador que a de referência; o fator corrige a borda.
+        lat_max = np.radians(max(self._lat_max, np.abs(lats).max()))
+        fator = 0.99 * min(1.0, float(np.cos(lat_max)) / self._cos_lat0)
+        indices, distancias = self._nos.buscar(x, y, distancia, fator)
+        return self.ids[indices], distancias
+
+    # --- Arestas ---
+
+    def aresta_mais_proxima(self, lat, lon):
+        """
+        Projeta o ponto na aresta mais próxima.
+
+        Returns:
+            tuple: (origem_id, destino_id, fracao, lat, lon, distancia), onde
+            fracao (0 a 1) é a posição do ponto projetado ao longo da aresta
+            e lat/lon são as coordenadas desse ponto.
+        """
+        origens, destinos, fracoes, lats, lons, distancias = self.arestas_mais_proximas([lat], [lon])
+        return (int(origens[0]), int(destinos[0]), float(fracoes[0]), float(lats[0]), float(lons[0]),
+                float(distancias[0]))
+
+    def arestas_mais_proximas(self, lats, lons):
+        """
+        Versão em lote de aresta_mais_proxima().
+
+        Returns:
+            tuple: arrays (origens, destinos, fracoes, lats, lons, distancias).
+        """
+        if self._arestas is None:
+            raise ValueError("O índice foi criado sem as arestas (use arestas=True).")
+        x, y = self._projetar(lats, lons)
+        x_o, y_o, x_d, y_d = self._extremos
+
+        def projetar(px, py, arestas):
+            ax, ay = x_o[arestas], y_o[arestas]
+            dx, dy = x_d[arestas] - ax, y_d[arestas] - ay
+            comprimento2 = dx * dx + dy * dy
+            with np.errstate(invalid='ignore', divide='ignore'):
+                t = np.where(comprimento2 > 0, ((px - ax) * dx + (py - ay) * dy) / comprimento2, 0.0)
+            t = np.clip(t, 0.0, 1.0)
+            return t, ax + t * dx, ay + t * dy
+
+        def distancia(consultas, candidatos):
+            px, py = x[consultas, None], y[consultas, None]
+            _, qx, qy = projetar(px, py, candidatos[None, :])
+            return np.hypot(px - qx, py - qy)
+
+        arestas, distancias = self._arestas.buscar(x, y, distancia, 1.0)
+        t, qx, qy = projetar(x, y, arestas)
+        lat_q, lon_q = self._desprojetar(qx, qy)
+        return (self.ids[self._aresta_origens[arestas]], self.ids[self._aresta_destinos[arestas]],
+                t, lat_q, lon_q, distancias)
+
+class _Grade:
+    """
+    Itens (nós ou arestas) distribuídos em células de uma grade, no formato
+    CSR: os itens da célula c ocupam itens[offsets[c]:offsets[c+1]]. As
+    células são numeradas linha a linha, então cada linha de um bloco de
+    células é um trecho contíguo de itens.
+
+    Um item cuja caixa envolvente cobre várias células aparece em todas elas.
+    """
+
+    def __init__(self, geometria, x_min, y_min, x_max, y_max):
+        self.x0, self.y0, self.tamanho, self.colunas, self.linhas = geometria
+        c0, l0 = self._celula(x_min, y_min)
+        c1, l1 = self._celula(x_max, y_max)
+        largura, altura = c1 - c0 + 1, l1 - l0 + 1
+        por_item = largura * altura
+
+        item = np.repeat(np.arange(len(por_item)), por_item)
+        k = np.arange(int(por_item.sum())) - np.repeat(np.cumsum(por_item) - por_item, por_item)
+        coluna = np.repeat(c0, por_item) + k % np.repeat(largura, por_item)
+        linha = np.repeat(l0, por_item) + k // np.repeat(largura, por_item)
+        celula = linha * self.colunas + coluna
+
+        ordem = np.argsort(celula, kind='stable')
+        self.itens = item[ordem]
+        self.offsets = np.zeros(self.colunas * self.linhas + 1, dtype=np.int64)
+        np.cumsum(np.bincount(celula, minlength=self.colunas * self.linhas), out=self.offsets[1:])
+
+    def _celula(self, x, y):
+        coluna = np.clip(np.floor((np.asarray(x) - self.x0) / self.tamanho), 0, self.colunas - 1).astype(np.int64)
+        linha = np.clip(np.floor((np.asarray(y) - self.y0) / self.tamanho), 0, self.linhas - 1).astype(np.int64)
+        return coluna, linha
+
+    def buscar(self, x, y, distancia, fator):
+        """
+        Item mais próximo de cada ponto (x, y).
+
+        Args:
+            distancia: Função (consultas, candidatos) -> matriz de distâncias.
+            fator: Razão mínima entre a distância de distancia() e a distância
+                no plano projetado, usada para decidir quando parar.
+
+        Returns:
+            tuple: (itens, distancias) como arrays, um por consulta.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        melhores = np.zeros(len(x), dtype=np.int64)
+        distancias = np.full(len(x), np.inf)
+        colunas_q, linhas_q = self._celula(x, y)
+        celulas, grupos = np.unique(linhas_q * self.colunas + colunas_q, return_inverse=True)
+        ordem = np.argsort(grupos, kind='stable')
+        limites = np.searchsorted(grupos[ordem], np.arange(len(celulas) + 1))
+
+        for g, celula in enumerate(celulas.tolist()):
+            consultas = ordem[limites[g]:limites[g + 1]]
+            coluna, linha = celula % self.colunas, celula // self.colunas
+            raio = 1
+            while len(consultas):
+                c_ini, c_fim = max(coluna - raio, 0), min(coluna + raio, self.colunas - 1)
+                l_ini, l_fim = max(linha - raio, 0), min(linha + raio, self.linhas - 1)
+                bloco_inteiro = c_ini == 0 and l_ini == 0 and c_fim == self.colunas - 1 and l_fim == self.linhas - 1
+                candidatos = np.concatenate([
+                    self.itens[self.offsets[l * self.colunas + c_ini]:self.offsets[l * self.colunas + c_fim + 1]]
+                    for l in range(l_ini, l_fim + 1)
+                ])
+                if len(candidatos) == 0:
+                    if bloco_inteiro:
+                        break
+                    raio *= 2
+                    continue
+
+                d = distancia(consultas, candidatos)
+                escolhidos = np.argmin(d, axis=1)
+                menores = d[np.arange(len(consultas)), escolhidos]
+
+                # Distância até a borda do bloco (infinita nos lados que já
+                # coincidem com a borda da grade, pois além deles não há itens).
+                xq, yq = x[consultas], y[consultas]
+                inf = np.inf
+                margem = np.minimum.reduce([
+                    xq - (self.x0 + c_ini * self.tamanho) if c_ini > 0 else np.full(len(xq), inf),
+                    self.x0 + (c_fim + 1) * self.tamanho - xq if c_fim < self.colunas - 1 else np.full(len(xq), inf),
+                    yq - (self.y0 + l_ini * self.tamanho) if l_ini > 0 else np.full(len(yq), inf),
+                    self.y0 + (l_fim + 1) * self.tamanho - yq if l_fim < self.linhas - 1 else np.full(len(yq), inf),
+                ])
+                prontas = (menores <= margem * fator) | bloco_inteiro
+                melhores[consultas[prontas]] = candidatos[escolhidos[prontas]]
+                distancias[consultas[prontas]] = menores[prontas]
+                consultas = consultas[~prontas]
+                raio *= 2
+
+        return melhores, distancias
@@ -0,0 +1,198 @@
+import time
+from bisect import bisect_left
+from collections import namedtuple
+from heapq import heappush, heappop
+
+# Caminho encontrado e as medidas da busca que o encontrou.
+ResultadoBusca = namedtuple('ResultadoBusca', ['caminho', 'estatisticas'])
+
+# Limites superiores das faixas dos histogramas de cada consulta.
+LIMITES_TEMPO_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 10000)
+LIMITES_NOS_FIXADOS = (10, 30, 100, 300, 1000, 3000, 10000, 30000, 100000, 300000, 1000000)
+
+# Contadores somados por algoritmo em Instrumentacao.estatisticas().
+CONTADORES = ('consultas', 'sem_caminho', 'nos_fixados', 'arestas_relaxadas', 'insercoes_heap',
+              'remocoes_heap', 'chamadas_heuristica', 'tempo_heuristica_s', 'tempo_total_s')
+
+class Histograma:
+    """
+    Histograma de faixas fixas: contagens[i] conta os valores até
+    limites[i] (e acima de limites[i-1]); a última posição conta os valores
+    acima do maior limite.
+    """
+
+    def __init__(self, limites):
+        self.limites = tuple(limites)
+        self.contagens = [0] * (len(self.limites) + 1)
+        self.total = 0
+        self.soma = 0.0
+        self.maximo = 0.0
+
+    def registrar(self, valor):
+        self.contagens[bisect_left(self.limites, valor)] += 1
+        self.total += 1
+        self.soma += valor
+        self.maximo = max(self.maximo, valor)
+
+    def percentil(self, p):
+        """
+        Limite superior da faixa que contém o percentil p (o máximo
+        observado, se for a última faixa), ou 0.0 sem valores.
+        """
+        if not self.total:
+            return 0.0
+        posicao = p / 100 * self.total
+        acumulado = 0
+        for limite, contagem in zip(self.limites, self.contagens):
+            acumulado += contagem
+            if acumulado >= posicao:
+                return min(float(limite), self.maximo)
+        return self.maximo
+
+    def para_dict(self):
+        return {'limites': list(self.limites), 'contagens': list(self.contagens), 'total': self.total,
+                'soma': self.soma, 'maximo': self.maximo,
+                'p50': self.percentil(50), 'p95': self.percentil(95), 'p99': self.percentil(99)}
+
+class EstatisticasBusca:
+    """
+    Medidas de uma consulta instrumentada, criadas por
+    Instrumentacao.iniciar() e preenchidas pela própria busca.
+
+    Attributes:
+        algoritmo (str): Nome do algoritmo em ALGORITMOS.
+        nos_fixados (int): Nós retirados da fila com a distância final.
+        arestas_relaxadas (int): Arestas examinadas a partir dos nós fixados.
+        insercoes_heap, remocoes_heap (int): Operações na fila de prioridade.
+        chamadas_heuristica (int): Avaliações da heurística (0 no Dijkstra).
+        tempo_heuristica_s (float): Tempo gasto dentro da heurística.
+        tempo_total_s (float): Tempo da consulta, da conversão dos IDs até
+            o caminho pronto.
+        sem_caminho (bool): True se o destino não é alcançável.
+    """
+
+    def __init__(self, algoritmo, coletor=None):
+        self.algoritmo = algoritmo
+        self.nos_fixados = 0
+        self.arestas_relaxadas = 0
+        self.insercoes_heap = 0
+        self.remocoes_heap = 0
+        self.chamadas_heuristica = 0
+        self.tempo_heuristica_s = 0.0
+        self.tempo_total_s = 0.0
+        self.sem_caminho = False
+        self._coletor = coletor
+        self._inicio = time.perf_counter()
+
+    def para_dict(self):
+        return {'algoritmo': self.algoritmo, 'nos_fixados': self.nos_fixados,
+                'arestas_relaxadas': self.arestas_relaxadas, 'insercoes_heap': self.insercoes_heap,
+                'remocoes_heap': self.remocoes_heap, 'chamadas_heuristica': self.chamadas_heuristica,
+                'tempo_heuristica_s': self.tempo_heuristica_s, 'tempo_total_s': self.tempo_total_s,
+                'sem_caminho': self.sem_caminho}
+
+    def __repr__(self):
+        return (f"EstatisticasBusca({self.algoritmo!r}, nos_fixados={self.nos_fixados}, "
+                f"arestas_relaxadas={self.arestas_relaxadas}, tempo_total_s={self.tempo_total_s:.6f})")
+
+    # --- Envoltórios usados pelas buscas de algoritmos_busca ---
+
+    def vizinhos(self, funcao):
+        """
+        Envolve a função de vizinhos da busca, contando as arestas examinadas.
+        """
+        def contados(v):
+            lista = list(funcao(v))
+            self.arestas_relaxadas += len(lista)
+            return lista
+        return contados
+
+    def heuristica(self, funcao):
+        """
+        Envolve a heurística, contando as chamadas e o tempo gasto nelas.
+        """
+        relogio = time.perf_counter
+
+        def medida(v):
+            inicio = relogio()
+            valor = funcao(v)
+            self.tempo_heuristica_s += relogio() - inicio
+            self.chamadas_heuristica += 1
+            return valor
+        return medida
+
+    def heap(self):
+        """
+        Par (heappush, heappop) que conta as operações na fila.
+        """
+        def inserir(fila, item):
+            self.insercoes_heap += 1
+            heappush(fila, item)
+
+        def remover(fila):
+            self.remocoes_heap += 1
+            return heappop(fila)
+        return inserir, remover
+
+    def concluir(self, nos_fixados, encontrou):
+        """
+        Registra o fim da busca e entrega as medidas ao coletor.
+        """
+        self.tempo_total_s = time.perf_counter() - self._inicio
+        self.nos_fixados = nos_fixados
+        self.sem_caminho = not encontrou
+        if self._coletor is not None:
+            self._coletor.registrar(self)
+
+class Instrumentacao:
+    """
+    Coletor das medidas das consultas ponto a ponto. Passado como argumento
+    instrumentacao de dijkstra(), a_estrela() ou a_estrela_alt(), faz a
+    busca usar os envoltórios de EstatisticasBusca; sem ele a busca roda sem
+    nenhuma contagem.
+
+    Por algoritmo, soma os contadores de todas as consultas e mantém
+    histogramas do tempo total (ms) e dos nós fixados. A medida da última
+    consulta fica em ultima.
+    """
+
+    def __init__(self, limites_tempo_ms=LIMITES_TEMPO_MS, limites_nos_fixados=LIMITES_NOS_FIXADOS):
+        self.limites_tempo_ms = limites_tempo_ms
+        self.limites_nos_fixados = limites_nos_fixados
+        self.contadores = {}
+        self.histogramas = {}
+        self.ultima = None
+
+    def iniciar(self, algoritmo):
+        return EstatisticasBusca(algoritmo, self)
+
+    def registrar(self, medida):
+        contadores = self.contadores.get(medida.algoritmo)
+        if contadores is None:
+            contadores = self.contadores[medida.algoritmo] = dict.fromkeys(CONTADORES, 0)
+            self.histogramas[medida.algoritmo] = {'tempo_ms': Histograma(self.limites_tempo_ms),
+                                                  'nos_fixados': Histograma(self.limites_nos_fixados)}
+        contadores['consultas'] += 1
+        for chave in CONTADORES[1:]:
+            contadores[chave] += getattr(medida, chave)
+        histogramas = self.histogramas[medida.algoritmo]
+        histogramas['tempo_ms'].registrar(medida.tempo_total_s * 1000)
+        histogramas['nos_fixados'].registrar(medida.nos_fixados)
+        self.ultima = medida
+
+    def limpar(self):
+        """
+        Zera os contadores e os histogramas.
+        """
+        self.contadores.clear()
+        self.histogramas.clear()
+        self.ultima = None
+
+    def estatisticas(self):
+        """
+        Contadores e histogramas por algoritmo, em um dicionário que pode
+        ser gravado em JSON.
+        """
+        return {algoritmo: dict(contadores, histogramas={nome: histograma.para_dict()
+                                                         for nome, histograma in self.histogramas[algoritmo].items()})
+                for algoritmo, contadores in self.contadores.items()}
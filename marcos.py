@@ -0,0 +1,307 @@
+import json
+import os
+import random
+from heapq import heappush, heappop
+import numpy as np
+from grafo_csr import GrafoCSR
+from cache_grafo import pasta_do_cache, substituir_pasta
+
+# Incrementar sempre que o formato gravado em disco mudar.
+VERSAO_MARCOS = 1
+
+ARRAYS_MARCOS = ('ids', 'marcos', 'ida', 'volta')
+
+# Estratégias de escolha dos marcos aceitas por construir_marcos.
+SELECOES = ('distante', 'evitar')
+
+class MarcosALT:
+    """
+    Tabelas de distâncias da heurística ALT (A*, Landmarks e desigualdade
+    Triangular).
+
+    Para o i-ésimo marco L, ida[i][v] guarda d(L, v) e volta[i][v] guarda
+    d(v, L), em float32 (inf quando não há caminho). Pela desigualdade
+    triangular, para qualquer destino t:
+
+        d(v, t) >= d(v, L) - d(t, L)   e   d(v, t) >= d(L, t) - d(L, v)
+
+    O arredondamento para float32 pode deixar esses limites alguns
+    milímetros acima do valor real; a heurística desconta a tolerancia
+    calculada na construção para continuar admissível.
+    """
+
+    def __init__(self, ids, marcos, ida, volta, tolerancia):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.marcos = np.asarray(marcos, dtype=np.int32)
+        self.ida = np.asarray(ida, dtype=np.float32)
+        self.volta = np.asarray(volta, dtype=np.float32)
+        self.tolerancia = float(tolerancia)
+
+        self._ordem = np.argsort(self.ids, kind='stable')
+        self._ids_ordenados = self.ids[self._ordem]
+        self._mv_ida = [memoryview(linha) for linha in self.ida]
+        self._mv_volta = [memoryview(linha) for linha in self.volta]
+        self._posicoes = None
+
+    def indice(self, no):
+        """
+        Retorna o índice interno de um ID do OSM (KeyError se não existir).
+        """
+        pos = int(np.searchsorted(self._ids_ordenados, no))
+        if pos < len(self._ids_ordenados) and self._ids_ordenados[pos] == no:
+            return int(self._ordem[pos])
+        raise KeyError(no)
+
+    def posicoes(self):
+        """
+        Dicionário {ID do OSM: índice interno}, montado na primeira chamada.
+        """
+        if self._posicoes is None:
+            self._posicoes = dict(zip(self.ids.tolist(), range(len(self.ids))))
+        return self._posicoes
+
+    def number_of_nodes(self):
+        return len(self.ids)
+
+    def numero_de_marcos(self):
+        return len(self.marcos)
+
+    def tamanho_em_bytes(self):
+        """
+        Memória ocupada pelas tabelas de distâncias.
+        """
+        return self.ida.nbytes + self.volta.nbytes
+
+    def heuristica(self, alvo, origem=None, ativos=4):
+        """
+        Retorna uma função v -> limite inferior de d(v, alvo), em metros,
+        com v e alvo dados como índices internos.
+
+        Com a origem informada, apenas os 'ativos' marcos que dão o maior
+        limite para d(origem, alvo) são consultados em cada nó, o que
+        barateia a avaliação quase sem perder qualidade.
+        """
+        inf = float('inf')
+        termos_por_marco = []
+        for ida, volta in zip(self._mv_ida, self._mv_volta):
+            # Marcos que não alcançam o alvo (ou não são alcançados por ele)
+            # não dão limite nesse sentido; descartá-los também evita inf - inf.
+            termos = []
+            if volta[alvo] != inf:
+                termos.append((volta, volta[alvo], 1.0))
+            if ida[alvo] != inf:
+                termos.append((ida, ida[alvo], -1.0))
+            if termos:
+                termos_por_marco.append(termos)
+
+        if origem is not None and len(termos_por_marco) > ativos:
+            termos_por_marco.sort(key=lambda termos: max(sinal * (tabela[origem] - constante)
+                                                         for tabela, constante, sinal in termos),
+                                  reverse=True)
+            termos_por_marco = termos_por_marco[:ativos]
+        termos = [termo for termos in termos_por_marco for termo in termos]
+        tolerancia = self.tolerancia
+
+        def limite_inferior(v):
+            melhor = 0.0
+            for tabela, constante, sinal in termos:
+                limite = sinal * (tabela[v] - constante)
+                if limite > melhor:
+                    melhor = limite
+            return melhor - tolerancia if melhor > tolerancia else 0.0
+        return limite_inferior
+
+# --- Pré-processamento ---
+
+def construir_marcos(grafo, num_marcos=16, selecao='evitar', semente=0):
+    """
+    Escolhe os marcos e calcula as tabelas de distâncias de ida e volta de
+    cada um, com um Dijkstra completo em cada sentido.
+
+    Estratégias de escolha:
+
+    - 'distante': cada novo marco é o nó mais distante (ida + volta) dos
+      marcos já escolhidos. O primeiro é o mais distante de um nó sorteado.
+    - 'evitar': a partir de um nó sorteado r, monta a árvore de caminhos
+      mínimos e dá a cada nó o peso d(r, v) menos o limite que os marcos
+      atuais já garantem. Desce pelos ramos mais pesados que ainda não
+      contêm marco e escolhe a folha onde termina. Assim os novos marcos
+      ficam onde a heurística atual é pior.
+
+    Nós fora da componente fortemente conexa dos marcos não são escolhidos.
+
+    Args:
+        grafo: Grafo do NetworkX ou GrafoCSR
+        num_marcos (int): Quantidade de marcos.
+        selecao (str): 'distante' ou 'evitar'.
+        semente (int): Semente dos sorteios, para resultados reprodutíveis.
+
+    Returns:
+        MarcosALT: As tabelas prontas para a heurística.
+    """
+    if selecao not in SELECOES:
+        raise ValueError(f"Seleção de marcos desconhecida: {selecao}. Use uma de {SELECOES}.")
+    if not isinstance(grafo, GrafoCSR):
+        grafo = GrafoCSR.de_networkx(grafo)
+
+    num_nos = grafo.number_of_nodes()
+    num_marcos = min(num_marcos, num_nos)
+    direto = (grafo._mv_offsets, grafo._mv_destinos, grafo._mv_pesos)
+    reverso = tuple(memoryview(a) for a in grafo.csr_reverso())
+    rng = random.Random(semente)
+
+    ida = np.empty((num_marcos, num_nos), dtype=np.float32)
+    volta = np.empty((num_marcos, num_nos), dtype=np.float32)
+    marcos = []
+    proximidade = None
+
+    while len(marcos) < num_marcos:
+        k = len(marcos)
+        if selecao == 'distante':
+            if proximidade is None:
+                inicio = rng.randrange(num_nos)
+                proximidade = _arvore(direto, inicio)[0] + _arvore(reverso, inicio)[0]
+            marco = _mais_distante(proximidade)
+        else:
+            marco = _proximo_evitando(direto, ida[:k], volta[:k], marcos, num_nos, rng)
+        if marco is None:
+            break
+
+        marcos.append(marco)
+        distancias_ida = _arvore(direto, marco)[0]
+        distancias_volta = _arvore(reverso, marco)[0]
+        ida[k] = distancias_ida
+        volta[k] = distancias_volta
+        if selecao == 'distante':
+            proximidade = np.minimum(proximidade, distancias_ida + distancias_volta)
+
+    ida, volta = ida[:len(marcos)], volta[:len(marcos)]
+    # Cada valor em float32 erra no máximo 2^-24 do seu módulo, e cada
+    # limite é a diferença de dois valores da mesma tabela.
+    finitos = np.concatenate([ida[np.isfinite(ida)], volta[np.isfinite(volta)], [0]])
+    tolerancia = 2.0 ** -23 * float(finitos.max())
+    return MarcosALT(grafo.ids, marcos, ida, volta, tolerancia)
+
+def _arvore(adjacencia, origem):
+    """
+    Dijkstra completo sobre arrays CSR.
+
+    Returns:
+        tuple: (distancias como array float64 com inf nos nós não alcançados,
+                lista de predecessores (-1 na raiz e fora da árvore),
+                nós na ordem em que foram fixados)
+    """
+    offsets, vizinhos, pesos = adjacencia
+    inf = float('inf')
+    distancias = [inf] * (len(offsets) - 1)
+    predecessores = [-1] * (len(offsets) - 1)
+    fixado = bytearray(len(offsets) - 1)
+    ordem = []
+    distancias[origem] = 0.0
+    fila = [(0.0, origem)]
+
+    while fila:
+        dist_v, v = heappop(fila)
+        if fixado[v]:
+            continue
+        fixado[v] = 1
+        ordem.append(v)
+        for i in range(offsets[v], offsets[v + 1]):
+            u = vizinhos[i]
+            dist_u = dist_v + pesos[i]
+            if dist_u < distancias[u]:
+                distancias[u] = dist_u
+                predecessores[u] = v
+                heappush(fila, (dist_u, u))
+
+    return np.array(distancias), predecessores, ordem
+
+def _mais_distante(proximidade):
+    # Maior valor finito e positivo (os marcos já escolhidos valem 0).
+    candidatos = np.where(np.isfinite(proximidade), proximidade, -1.0)
+    marco = int(np.argmax(candidatos))
+    return marco if candidatos[marco] > 0 else None
+
+def _proximo_evitando(direto, ida, volta, marcos, num_nos, rng, tentativas=16):
+    for _ in range(tentativas):
+        raiz = rng.randrange(num_nos)
+        distancias, predecessores, ordem = _arvore(direto, raiz)
+
+        # Limite inferior de d(raiz, v) que os marcos atuais já garantem.
+        limite = np.zeros(num_nos)
+        with np.errstate(invalid='ignore'):
+            for i in range(len(marcos)):
+                limites = np.fmax(volta[i][raiz] - volta[i].astype(np.float64),
+                                  ida[i].astype(np.float64) - ida[i][raiz])
+                limite = np.fmax(limite, limites)
+            peso = np.maximum(distancias - limite, 0.0)
+        peso[~np.isfinite(peso)] = 0.0
+        tamanho = peso.tolist()
+
+        # Acumula os pesos de baixo para cima; subárvores com marco valem 0.
+        tem_marco = bytearray(num_nos)
+        for marco in marcos:
+            tem_marco[marco] = 1
+        filhos = {}
+        for v in reversed(ordem):
+            if tem_marco[v]:
+                tamanho[v] = 0.0
+            pai = predecessores[v]
+            if pai >= 0:
+                filhos.setdefault(pai, []).append(v)
+                if tem_marco[v]:
+                    tem_marco[pai] = 1
+                else:
+                    tamanho[pai] += tamanho[v]
+
+        # A própria raiz é ancestral dos marcos que alcança; a descida
+        # começa pelos filhos dela.
+        v = raiz
+        while True:
+            candidatos = [u for u in filhos.get(v, ()) if tamanho[u] > 0]
+            if not candidatos:
+                break
+            v = max(candidatos, key=tamanho.__getitem__)
+        if v != raiz:
+            return v
+    return None
+
+# --- Gravação em disco ---
+
+def pasta_dos_marcos(arquivo_json):
+    """
+    Pasta das tabelas de marcos de um export do OSM. Fica dentro da pasta do
+    cache compilado do grafo, então é descartada junto com ele quando o
+    arquivo de origem muda.
+    """
+    return os.path.join(pasta_do_cache(arquivo_json), 'marcos')
+
+def salvar_marcos(marcos, pasta):
+    """
+    Grava as tabelas de marcos em uma pasta, um arquivo .npy por array.
+    """
+    pasta_temporaria = f"{pasta}.tmp-{os.getpid()}"
+    os.makedirs(pasta_temporaria, exist_ok=True)
+    for nome in ARRAYS_MARCOS:
+        np.save(os.path.join(pasta_temporaria, nome + '.npy'), getattr(marcos, nome))
+    with open(os.path.join(pasta_temporaria, 'metadados.json'), 'w', encoding='utf-8') as f:
+        json.dump({'versao': VERSAO_MARCOS, 'tolerancia': marcos.tolerancia}, f)
+    substituir_pasta(pasta_temporaria, pasta)
+
+def carregar_marcos(pasta):
+    """
+    Carrega as tabelas gravadas por salvar_marcos, mapeadas em memória.
+
+    Returns:
+        MarcosALT or None: As tabelas, ou None se a pasta não existir ou
+        for de uma versão antiga do formato.
+    """
+    try:
+        with open(os.path.join(pasta, 'metadados.json'), 'r', encoding='utf-8') as f:
+            metadados = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if metadados.get('versao') != VERSAO_MARCOS:
+        return None
+    arrays = [np.load(os.path.join(pasta, nome + '.npy'), mmap_mode='r') for nome in ARRAYS_MARCOS]
+    return MarcosALT(*arrays, metadados['tolerancia'])
@@ -0,0 +1,207 @@
+import json
+import os
+import tempfile
+import networkx as nx
+import numpy as np
+from parser import haversine_vetorizado
+from grafo_csr import GrafoCSR
+from perfis import PERFIS, velocidades_da_via, tempos_da_aresta, tempos_vetorizados
+
+# Registro gravado no arquivo temporário para cada segmento de via.
+SEGMENTO_DTYPE = np.dtype([
+    ('origem', np.int64),
+    ('destino', np.int64),
+    ('mao_unica', np.bool_),
+    ('nome', np.int32),
+    ('tipo', np.int16),
+    ('velocidade', np.int32),
+])
+
+def iterar_elementos(arquivo_json, tamanho_bloco=1 << 20):
+    """
+    Lê incrementalmente a lista 'elements' de um export do Overpass,
+    gerando um elemento (dict) por vez sem carregar o arquivo inteiro.
+
+    Args:
+        arquivo_json (str): O caminho para o arquivo JSON.
+        tamanho_bloco (int): Quantidade de caracteres lidos por vez.
+
+    Yields:
+        dict: Cada elemento (node, way, relation) do arquivo.
+    """
+    decodificador = json.JSONDecoder()
+    with open(arquivo_json, 'r', encoding='utf-8') as f:
+        buffer = ''
+        while True:
+            inicio = buffer.find('"elements"')
+            if inicio >= 0 and buffer.find('[', inicio) >= 0:
+                buffer = buffer[buffer.find('[', inicio) + 1:]
+                break
+            bloco = f.read(tamanho_bloco)
+            if not bloco:
+                raise json.JSONDecodeError("Lista 'elements' não encontrada", buffer, 0)
+            buffer += bloco
+
+        pos = 0
+        fim_do_arquivo = False
+        while True:
+            # Pula espaços e vírgulas entre os elementos.
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == ']':
+                return
+            try:
+                if pos >= len(buffer):
+                    raise json.JSONDecodeError("Fim do bloco", buffer, pos)
+                elemento, pos = decodificador.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # O elemento pode estar cortado no fim do bloco: lê mais e tenta de novo.
+                if fim_do_arquivo:
+                    raise
+                bloco = f.read(tamanho_bloco)
+                fim_do_arquivo = not bloco
+                buffer = buffer[pos:] + bloco
+                pos = 0
+                continue
+            yield elemento
+
+def criar_grafo_streaming(arquivo_json, compacto=False, tamanho_bloco=1 << 20, perfis=None):
+    """
+    Cria o grafo lendo o export do Overpass de forma incremental.
+
+    Na primeira passagem os segmentos das vias com tag highway são gravados
+    em um arquivo temporário. Na segunda, guardam-se apenas as coordenadas
+    dos nós referenciados por esses segmentos. As arestas são então geradas
+    a partir do arquivo temporário. Nós que nenhuma via referencia (pontos
+    isolados) não entram no grafo.
+
+    Args:
+        arquivo_json (str): O caminho para o arquivo JSON.
+        compacto (bool): Se True, retorna um GrafoCSR em vez de um networkx.DiGraph.
+        tamanho_bloco (int): Quantidade de caracteres lidos por vez.
+        perfis (list): Perfis de roteamento compilados no grafo (ver
+            parser.criar_grafo_do_json).
+
+    Returns:
+        networkx.DiGraph, GrafoCSR or None: O grafo criado ou None se houver um erro.
+    """
+    print("")
+    print("Iniciando a criação do grafo (leitura incremental)...")
+    perfis = list(PERFIS.values()) if perfis is None else list(perfis)
+    descritor, arquivo_segmentos = tempfile.mkstemp(suffix='.seg')
+    try:
+        with os.fdopen(descritor, 'wb') as saida:
+            nomes, tipos, velocidades = _gravar_segmentos(arquivo_json, saida, tamanho_bloco, perfis)
+        segmentos = np.fromfile(arquivo_segmentos, dtype=SEGMENTO_DTYPE)
+        referenciados = np.unique(np.concatenate([segmentos['origem'], segmentos['destino']]))
+        ids, lat, lon = _ler_coordenadas(arquivo_json, referenciados, tamanho_bloco)
+    except FileNotFoundError:
+        print(f"Erro: O arquivo {arquivo_json} não foi encontrado.")
+        return None
+    except json.JSONDecodeError:
+        print(f"Erro: Não foi possível decifrar o arquivo JSON {arquivo_json}.")
+        return None
+    finally:
+        os.remove(arquivo_segmentos)
+
+    # Converte os IDs dos segmentos em índices de nós e descarta os
+    # segmentos com extremidades sem coordenadas no arquivo.
+    ordem = np.argsort(ids, kind='stable')
+    ids_ordenados = ids[ordem]
+    origens, valida_origem = _localizar(ids_ordenados, ordem, segmentos['origem'])
+    destinos, valida_destino = _localizar(ids_ordenados, ordem, segmentos['destino'])
+    validos = valida_origem & valida_destino
+    segmentos, origens, destinos = segmentos[validos], origens[validos], destinos[validos]
+
+    pesos = haversine_vetorizado(lat[origens], lon[origens], lat[destinos], lon[destinos])
+
+    if compacto:
+        velocidades = np.array(velocidades, dtype=np.float64).reshape(len(velocidades), len(perfis))
+        grafo = GrafoCSR.de_segmentos(ids, lat, lon, origens, destinos, pesos, segmentos['mao_unica'],
+                                      segmentos['nome'], segmentos['tipo'], nomes, tipos,
+                                      tempos_vetorizados(pesos, velocidades[segmentos['velocidade']], perfis))
+        grafo.graph['perfis'] = {perfil.nome: perfil for perfil in perfis}
+    else:
+        grafo = nx.DiGraph(perfis={perfil.nome: perfil for perfil in perfis})
+        for no, lat_no, lon_no in zip(ids.tolist(), lat.tolist(), lon.tolist()):
+            grafo.add_node(no, lat=lat_no, lon=lon_no)
+        ids_lista = ids.tolist()
+        for o, d, peso, mao_unica, nome, tipo, velocidade in zip(
+                origens.tolist(), destinos.tolist(), pesos.tolist(), segmentos['mao_unica'].tolist(),
+                segmentos['nome'].tolist(), segmentos['tipo'].tolist(), segmentos['velocidade'].tolist()):
+            origem_id, destino_id = ids_lista[o], ids_lista[d]
+            tempos = tempos_da_aresta(peso, velocidades[velocidade], perfis)
+            grafo.add_edge(origem_id, destino_id, weight=peso, name=nomes[nome], highway=tipos[tipo], **tempos)
+            if not mao_unica and not grafo.has_edge(destino_id, origem_id):
+                grafo.add_edge(destino_id, origem_id, weight=peso, name=nomes[nome], highway=tipos[tipo], **tempos)
+
+    print(f"Número de nós referenciados pelas vias: {grafo.number_of_nodes()}")
+    print(f"Número de arestas adicionadas ao grafo: {grafo.number_of_edges()}")
+    print(f"¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨")
+    return grafo
+
+def _gravar_segmentos(arquivo_json, saida, tamanho_bloco, perfis, segmentos_por_lote=65536):
+    """
+    Primeira passagem: grava os segmentos das vias no arquivo de saída.
+
+    Returns:
+        tuple: (nomes, tipos, velocidades), tabelas de nomes de rua, tipos
+            de via e velocidades de cada perfil.
+    """
+    tabela_nomes = {}
+    tabela_tipos = {}
+    tabela_velocidades = {}
+    lote = []
+
+    for element in iterar_elementos(arquivo_json, tamanho_bloco):
+        if element['type'] == 'way' and 'tags' in element and 'highway' in element['tags']:
+            if 'nodes' in element:
+                node_ids = element['nodes']
+                is_oneway = element['tags'].get('oneway') == 'yes'
+                nome = tabela_nomes.setdefault(element['tags'].get('name', 'unknown'), len(tabela_nomes))
+                tipo = tabela_tipos.setdefault(element['tags'].get('highway', 'unclassified'), len(tabela_tipos))
+                velocidade = tabela_velocidades.setdefault(velocidades_da_via(element['tags'], perfis),
+                                                           len(tabela_velocidades))
+                for i in range(len(node_ids) - 1):
+                    lote.append((node_ids[i], node_ids[i+1], is_oneway, nome, tipo, velocidade))
+
+                if len(lote) >= segmentos_por_lote:
+                    np.array(lote, dtype=SEGMENTO_DTYPE).tofile(saida)
+                    lote = []
+
+    if lote:
+        np.array(lote, dtype=SEGMENTO_DTYPE).tofile(saida)
+    return list(tabela_nomes), list(tabela_tipos), list(tabela_velocidades)
+
+def _ler_coordenadas(arquivo_json, referenciados, tamanho_bloco):
+    """
+    Segunda passagem: lê as coordenadas apenas dos nós referenciados.
+
+    Returns:
+        tuple: (ids, lat, lon) na ordem em que os nós aparecem no arquivo.
+    """
+    lat = np.full(len(referenciados), np.nan)
+    lon = np.full(len(referenciados), np.nan)
+    posicao_no_arquivo = np.full(len(referenciados), -1, dtype=np.int64)
+    contador = 0
+
+    for element in iterar_elementos(arquivo_json, tamanho_bloco):
+        if element['type'] == 'node' and 'lat' in element and 'lon' in element:
+            k = int(np.searchsorted(referenciados, element['id']))
+            if k < len(referenciados) and referenciados[k] == element['id']:
+                lat[k] = element['lat']
+                lon[k] = element['lon']
+                if posicao_no_arquivo[k] < 0:
+                    posicao_no_arquivo[k] = contador
+                    contador += 1
+
+    encontrados = np.flatnonzero(posicao_no_arquivo >= 0)
+    encontrados = encontrados[np.argsort(posicao_no_arquivo[encontrados])]
+    return referenciados[encontrados], lat[encontrados], lon[encontrados]
+
+def _localizar(ids_ordenados, ordem, nos):
+    # Índice de cada ID em nos e máscara dos IDs que existem no grafo.
+    if len(ids_ordenados) == 0:
+        return np.zeros(len(nos), dtype=np.int64), np.zeros(len(nos), dtype=bool)
+    pos = np.minimum(np.searchsorted(ids_ordenados, nos), len(ids_ordenados) - 1)
+    return ordem[pos], ids_ordenados[pos] == nos
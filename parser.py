@@ -1,6 +1,11 @@
 import json
 import networkx as nx
-from math import radians, sin, cos, sqrt, atan2
+import numpy as np
+from grafo_csr import GrafoCSR
+from cache_grafo import pasta_do_cache, cache_valido, salvar_cache, carregar_cache
+from perfis import PERFIS, velocidades_da_via, tempos_da_aresta, tempos_vetorizados
+from simplificacao import simplificar_grafo
+from componentes import componentes_do_grafo, manter_maior_componente
 
 # Constante da Terra para cálculo da distância
 RAIO_TERRA_M = 6371000
@@ -18,24 +23,98 @@ def haversine(lat1, lon1, lat2, lon2):
     Returns:
         float: A distância entre os dois pontos em metros.
     """
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-    a = sin(dlat / 2)**2 + cos(lat1) * cos(lat2) * sin(dlon / 2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
+    return float(haversine_vetorizado(lat1, lon1, lat2, lon2))
+
+def haversine_vetorizado(lat1, lon1, lat2, lon2):
+    """
+    Versão da fórmula de Haversine que opera sobre arrays NumPy, calculando
+    todas as distâncias de uma vez.
+
+    Args:
+        lat1, lon1 (array): Coordenadas (em graus) dos pontos de partida.
+        lat2, lon2 (array): Coordenadas (em graus) dos pontos de chegada.
+
+    Returns:
+        numpy.ndarray: As distâncias em metros, elemento a elemento.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype=np.float64)) for x in (lat1, lon1, lat2, lon2))
+    return haversine_radianos(lat1, lon1, np.cos(lat1), lat2, lon2, np.cos(lat2))
+
+def haversine_radianos(lat1, lon1, cos_lat1, lat2, lon2, cos_lat2):
+    """
+    Fórmula de Haversine para coordenadas já em radianos, com o cosseno das
+    latitudes pré-calculado. Aceita arrays NumPy ou floats.
+    """
+    a = np.sin((lat2 - lat1) / 2)**2 + cos_lat1 * cos_lat2 * np.sin((lon2 - lon1) / 2)**2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
     return RAIO_TERRA_M * c
 
-def criar_grafo_do_json(arquivo_json):
+def criar_grafo_do_json(arquivo_json, compacto=False, streaming=False, cache=False, perfis=None,
+                        simplificar=False, maior_componente=False):
     """
     Cria um grafo NetworkX a partir de um arquivo JSON de dados do OpenStreetMap.
     Otimizado para grandes arquivos.
 
     Args:
         arquivo_json (str): O caminho para o arquivo JSON.
+        compacto (bool): Se True, retorna um GrafoCSR (arrays compactos)
+            em vez de um networkx.DiGraph.
+        streaming (bool): Se True, lê o arquivo de forma incremental sem
+            carregá-lo inteiro na memória (ver osm_stream.criar_grafo_streaming).
+            Nós que nenhuma via referencia ficam fora do grafo.
+        cache (bool): Se True, reutiliza o grafo compilado em disco
+            (ver cache_grafo), recriando-o quando o arquivo JSON mudar.
+            Implica compacto=True.
+        perfis (list): Perfis de roteamento (ver perfis.py) cujos tempos de
+            viagem são calculados para cada aresta. Por padrão, carro,
+            bicicleta e pé. O atributo 'weight' continua sendo a distância
+            em metros.
+        simplificar (bool): Se True, contrai as cadeias de nós de grau 2
+            (ver simplificacao.simplificar_grafo); use
+            simplificacao.expandir_caminho para obter os nós originais
+            de um caminho.
+        maior_componente (bool): Se True, mantém só o maior componente
+            fortemente conexo (ver componentes.manter_maior_componente), em
+            que todo par de nós tem caminho.
+
+    Os componentes fortemente conexos do grafo são calculados junto com ele
+    e ficam em grafo.graph['componentes']; as buscas os usam para responder
+    sem busca os pares que não têm caminho.
 
     Returns:
-        networkx.DiGraph or None: O grafo criado ou None se houver um erro.
+        networkx.DiGraph, GrafoCSR or None: O grafo criado ou None se houver um erro.
     """
+    perfis = list(PERFIS.values()) if perfis is None else list(perfis)
+    if cache:
+        grafo = _criar_grafo_com_cache(arquivo_json, streaming, perfis)
+    else:
+        grafo = _criar_grafo(arquivo_json, compacto, streaming, perfis)
+    if grafo is None:
+        return None
+
+    componentes = componentes_do_grafo(grafo)
+    print(f"Componentes fortemente conexos: {componentes.num_fortes} "
+          f"(o maior com {componentes.tamanhos[componentes.maior]} nós)")
+    if maior_componente:
+        grafo = manter_maior_componente(grafo)
+        print(f"Mantido só o maior componente: {grafo.number_of_nodes()} nós e {grafo.number_of_edges()} arestas")
+    if simplificar:
+        grafo = simplificar_grafo(grafo)
+        componentes_do_grafo(grafo)
+        estatisticas = grafo.graph['simplificacao'].estatisticas
+        print(f"Grafo simplificado: {estatisticas['nos_depois']} nós e {estatisticas['arestas_depois']} arestas "
+              f"({estatisticas['nos_removidos']} nós de passagem removidos)")
+    return grafo
+
+def _criar_grafo(arquivo_json, compacto, streaming, perfis):
+    """
+    Cria o grafo a partir do JSON, sem cache e sem os passos posteriores de
+    criar_grafo_do_json.
+    """
+    if streaming:
+        from osm_stream import criar_grafo_streaming
+        return criar_grafo_streaming(arquivo_json, compacto=compacto, perfis=perfis)
+
     print("")
     print("Iniciando a criação do grafo...")
     try:
@@ -48,7 +127,14 @@ def criar_grafo_do_json(arquivo_json):
         print(f"Erro: Não foi possível decifrar o arquivo JSON {arquivo_json}.")
         return None
 
-    grafo = nx.DiGraph()
+    if compacto:
+        grafo = _criar_grafo_compacto(dados, perfis)
+        print(f"Número de nós encontrados no arquivo: {grafo.number_of_nodes()}")
+        print(f"Número de arestas adicionadas ao grafo: {grafo.number_of_edges()}")
+        print(f"¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨")
+        return grafo
+
+    grafo = nx.DiGraph(perfis={perfil.nome: perfil for perfil in perfis})
     nodes_dict = {}
 
     # Primeira iteração para adicionar todos os nós (pontos)
@@ -59,7 +145,31 @@ def criar_grafo_do_json(arquivo_json):
                 nodes_dict[element['id']] = element
                 grafo.add_node(element['id'], lat=element['lat'], lon=element['lon'])
 
-    # Segunda iteração para adicionar as arestas (ruas)
+    # Segunda iteração para adicionar as arestas (ruas), com os pesos de
+    # todos os segmentos calculados de uma vez
+    segmentos = list(_segmentos_das_vias(dados, nodes_dict, perfis))
+    pesos = _pesos_dos_segmentos(
+        [(nodes_dict[s[0]]['lat'], nodes_dict[s[0]]['lon'], nodes_dict[s[1]]['lat'], nodes_dict[s[1]]['lon'])
+         for s in segmentos])
+    for (origem_id, destino_id, nome_da_rua, tipo_da_rua, is_oneway, velocidades), peso in zip(segmentos,
+                                                                                               pesos.tolist()):
+        tempos = tempos_da_aresta(peso, velocidades, perfis)
+        grafo.add_edge(origem_id, destino_id, weight=peso, name=nome_da_rua, highway=tipo_da_rua, **tempos)
+        
+        if not is_oneway and not grafo.has_edge(destino_id, origem_id):
+            grafo.add_edge(destino_id, origem_id, weight=peso, name=nome_da_rua, highway=tipo_da_rua, **tempos)
+
+    print(f"Número de nós encontrados no arquivo: {len(nodes_dict)}")
+    print(f"Número de arestas adicionadas ao grafo: {grafo.number_of_edges()}")
+    print(f"¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨")
+    return grafo
+
+def _segmentos_das_vias(dados, nodes_dict, perfis):
+    """
+    Percorre as vias (ways com tag highway) e gera cada segmento entre nós
+    consecutivos como (origem_id, destino_id, nome, highway, mao_unica,
+    velocidades), com a velocidade da via em cada perfil.
+    """
     for element in dados['elements']:
         if element['type'] == 'way' and 'tags' in element and 'highway' in element['tags']:
             if 'nodes' in element:
@@ -67,23 +177,85 @@ def criar_grafo_do_json(arquivo_json):
                 is_oneway = element['tags'].get('oneway') == 'yes'
                 nome_da_rua = element['tags'].get('name', 'unknown')
                 tipo_da_rua = element['tags'].get('highway', 'unclassified')
+                velocidades = velocidades_da_via(element['tags'], perfis)
 
                 for i in range(len(node_ids) - 1):
                     origem_id = node_ids[i]
                     destino_id = node_ids[i+1]
 
                     if origem_id in nodes_dict and destino_id in nodes_dict:
-                        origem_coords = (nodes_dict[origem_id]['lat'], nodes_dict[origem_id]['lon'])
-                        destino_coords = (nodes_dict[destino_id]['lat'], nodes_dict[destino_id]['lon'])
-                        
-                        peso = haversine(origem_coords[0], origem_coords[1], destino_coords[0], destino_coords[1])
-                        
-                        grafo.add_edge(origem_id, destino_id, weight=peso, name=nome_da_rua, highway=tipo_da_rua)
-                        
-                        if not is_oneway and not grafo.has_edge(destino_id, origem_id):
-                            grafo.add_edge(destino_id, origem_id, weight=peso, name=nome_da_rua, highway=tipo_da_rua)
+                        yield origem_id, destino_id, nome_da_rua, tipo_da_rua, is_oneway, velocidades
 
-    print(f"Número de nós encontrados no arquivo: {len(nodes_dict)}")
-    print(f"Número de arestas adicionadas ao grafo: {grafo.number_of_edges()}")
-    print(f"¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨")
-    return grafo
\ No newline at end of file
+def _pesos_dos_segmentos(coordenadas):
+    """
+    Calcula em uma única passada vetorizada o comprimento de cada segmento,
+    dado como (lat_origem, lon_origem, lat_destino, lon_destino).
+    """
+    coords = np.array(coordenadas, dtype=np.float64).reshape(-1, 4)
+    return haversine_vetorizado(coords[:, 0], coords[:, 1], coords[:, 2], coords[:, 3])
+
+def _criar_grafo_compacto(dados, perfis):
+    """
+    Cria um GrafoCSR sem passar pelo networkx, com as mesmas regras de
+    inserção de arestas usadas na versão networkx.
+    """
+    nos = {}
+    for element in dados['elements']:
+        if element['type'] == 'node':
+            if 'lat' in element and 'lon' in element:
+                nos[element['id']] = element
+    indice = {no: i for i, no in enumerate(nos)}
+    ids = np.fromiter(nos.keys(), dtype=np.int64, count=len(nos))
+    lat = np.fromiter((element['lat'] for element in nos.values()), dtype=np.float64, count=len(nos))
+    lon = np.fromiter((element['lon'] for element in nos.values()), dtype=np.float64, count=len(nos))
+
+    tabela_nomes = {}
+    tabela_tipos = {}
+    # Vias com as mesmas tags de acesso e velocidade compartilham uma
+    # linha da tabela de velocidades.
+    tabela_velocidades = {}
+    segmentos = [
+        (indice[origem_id], indice[destino_id], is_oneway,
+         tabela_nomes.setdefault(nome_da_rua, len(tabela_nomes)),
+         tabela_tipos.setdefault(tipo_da_rua, len(tabela_tipos)),
+         tabela_velocidades.setdefault(velocidades, len(tabela_velocidades)))
+        for origem_id, destino_id, nome_da_rua, tipo_da_rua, is_oneway, velocidades
+        in _segmentos_das_vias(dados, nos, perfis)
+    ]
+    segmentos = np.array(segmentos, dtype=np.int64).reshape(-1, 6)
+    origens, destinos = segmentos[:, 0], segmentos[:, 1]
+    pesos = haversine_vetorizado(lat[origens], lon[origens], lat[destinos], lon[destinos])
+    velocidades = np.array(list(tabela_velocidades), dtype=np.float64).reshape(len(tabela_velocidades), len(perfis))
+
+    grafo = GrafoCSR.de_segmentos(ids, lat, lon, origens, destinos, pesos, segmentos[:, 2].astype(bool),
+                                  segmentos[:, 3], segmentos[:, 4], list(tabela_nomes), list(tabela_tipos),
+                                  tempos_vetorizados(pesos, velocidades[segmentos[:, 5]], perfis))
+    grafo.graph['perfis'] = {perfil.nome: perfil for perfil in perfis}
+    return grafo
+
+def _criar_grafo_com_cache(arquivo_json, streaming, perfis):
+    """
+    Carrega o grafo compilado em disco ou, se ele não existir ou estiver
+    desatualizado, cria o GrafoCSR a partir do JSON e grava o cache.
+    """
+    pasta = pasta_do_cache(arquivo_json)
+    if cache_valido(arquivo_json, streaming, perfis):
+        print("")
+        print(f"Carregando grafo do cache '{pasta}'...")
+        try:
+            grafo = carregar_cache(pasta)
+        except FileNotFoundError:
+            # Outro processo estava substituindo o cache; ele é recriado aqui.
+            grafo = None
+        if grafo is not None:
+            print(f"Número de nós: {grafo.number_of_nodes()}")
+            print(f"Número de arestas: {grafo.number_of_edges()}")
+            print(f"¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨¨")
+            return grafo
+
+    grafo = _criar_grafo(arquivo_json, compacto=True, streaming=streaming, perfis=perfis)
+    if grafo is not None:
+        componentes_do_grafo(grafo)
+        salvar_cache(grafo, arquivo_json, streaming)
+        print(f"Cache do grafo gravado em '{pasta}'.")
+    return grafo
@@ -0,0 +1,153 @@
+import re
+import numpy as np
+
+# Valores das tags de acesso que proíbem o uso da via.
+ACESSO_PROIBIDO = ('no', 'private')
+
+class Perfil:
+    """
+    Perfil de roteamento: decide quem pode usar cada via e com que
+    velocidade, a partir das tags do OSM. O peso das arestas no perfil é o
+    tempo de viagem em segundos (comprimento / velocidade), e infinito nas
+    vias que o perfil não pode usar.
+
+    Args:
+        nome (str): Nome do perfil. No networkx, o peso de cada aresta fica
+            no atributo 'tempo_<nome>'.
+        velocidades (dict): {valor da tag highway: km/h}. Tipos de via
+            ausentes não são acessíveis no perfil.
+        chaves_acesso (tuple): Tags de acesso consultadas da mais
+            específica para a mais geral; a primeira presente decide se a
+            via é proibida ('no' ou 'private').
+        usar_maxspeed (bool): Se True, a tag maxspeed substitui a
+            velocidade da tabela; se False, só a limita.
+        velocidade_maxima (float): Maior velocidade do perfil, em km/h.
+            Nenhuma aresta passa dela, o que torna a heurística do A*
+            (distância em linha reta / velocidade_maxima) admissível.
+    """
+
+    def __init__(self, nome, velocidades, chaves_acesso=('access',), usar_maxspeed=False, velocidade_maxima=None):
+        self.nome = nome
+        self.velocidades = dict(velocidades)
+        self.chaves_acesso = tuple(chaves_acesso)
+        self.usar_maxspeed = usar_maxspeed
+        self.velocidade_maxima = float(velocidade_maxima or max(self.velocidades.values()))
+        self.atributo = f'tempo_{nome}'
+
+    def velocidade(self, tags):
+        """
+        Velocidade em m/s em uma via com essas tags, ou 0.0 se o perfil não
+        puder usá-la.
+        """
+        km_h = self.velocidades.get(tags.get('highway'))
+        if km_h is None:
+            return 0.0
+        for chave in self.chaves_acesso:
+            if chave in tags:
+                if tags[chave] in ACESSO_PROIBIDO:
+                    return 0.0
+                break
+        limite = _ler_maxspeed(tags.get('maxspeed'))
+        if limite is not None:
+            km_h = limite if self.usar_maxspeed else min(km_h, limite)
+        return min(km_h, self.velocidade_maxima) / 3.6
+
+    def velocidade_maxima_ms(self):
+        return self.velocidade_maxima / 3.6
+
+    def para_dict(self):
+        """
+        Parâmetros do perfil, para gravar junto com o cache do grafo.
+        """
+        return {'nome': self.nome, 'velocidades': self.velocidades, 'chaves_acesso': list(self.chaves_acesso),
+                'usar_maxspeed': self.usar_maxspeed, 'velocidade_maxima': self.velocidade_maxima}
+
+    def __repr__(self):
+        return f"Perfil({self.nome!r})"
+
+def _ler_maxspeed(valor):
+    # Aceita '50', '50 km/h' e '30 mph'; valores como 'none' ou 'BR:urban'
+    # não dão um número e são ignorados.
+    if not valor:
+        return None
+    numero = re.match(r'\s*(\d+(?:\.\d+)?)\s*(mph)?', valor)
+    if numero is None or float(numero.group(1)) <= 0:
+        return None
+    return float(numero.group(1)) * (1.609344 if numero.group(2) else 1.0)
+
+CARRO = Perfil('carro', {
+    'motorway': 100, 'motorway_link': 60, 'trunk': 80, 'trunk_link': 50,
+    'primary': 60, 'primary_link': 50, 'secondary': 50, 'secondary_link': 40,
+    'tertiary': 40, 'tertiary_link': 30, 'unclassified': 30, 'residential': 30,
+    'road': 30, 'service': 20, 'living_street': 10,
+}, chaves_acesso=('motorcar', 'motor_vehicle', 'vehicle', 'access'), usar_maxspeed=True, velocidade_maxima=130)
+
+BICICLETA = Perfil('bicicleta', {
+    'cycleway': 18, 'primary': 16, 'primary_link': 16, 'secondary': 16, 'secondary_link': 16,
+    'tertiary': 16, 'tertiary_link': 16, 'unclassified': 16, 'residential': 16, 'road': 16,
+    'service': 14, 'living_street': 12, 'track': 12, 'path': 12,
+    # Em calçadas e calçadões a bicicleta vai empurrada.
+    'footway': 5, 'pedestrian': 5,
+}, chaves_acesso=('bicycle', 'vehicle', 'access'), velocidade_maxima=25)
+
+PE = Perfil('pe', {
+    'footway': 5, 'pedestrian': 5, 'path': 5, 'steps': 3, 'track': 5, 'cycleway': 5,
+    'living_street': 5, 'residential': 5, 'service': 5, 'unclassified': 5, 'road': 5,
+    'tertiary': 5, 'tertiary_link': 5, 'secondary': 5, 'secondary_link': 5,
+    'primary': 5, 'primary_link': 5,
+}, chaves_acesso=('foot', 'access'), velocidade_maxima=5)
+
+# Perfis compilados por padrão ao criar o grafo.
+PERFIS = {perfil.nome: perfil for perfil in (CARRO, BICICLETA, PE)}
+
+def obter_perfil(perfil, grafo=None):
+    """
+    Resolve um perfil dado pelo nome ou como Perfil. Com o grafo, confere se
+    os pesos do perfil foram compilados nele.
+
+    Returns:
+        Perfil: O perfil.
+    """
+    if isinstance(perfil, str):
+        perfis = grafo.graph.get('perfis', {}) if grafo is not None else PERFIS
+        if perfil not in perfis:
+            disponiveis = sorted(perfis) or "nenhum"
+            raise ValueError(f"Perfil desconhecido: {perfil}. Perfis disponíveis: {disponiveis}.")
+        return perfis[perfil]
+    if grafo is not None:
+        if perfil.nome not in grafo.graph.get('perfis', {}):
+            raise ValueError(f"O perfil {perfil.nome} não foi compilado neste grafo.")
+        # Os pesos do grafo valem para o perfil com que foram compilados.
+        return grafo.graph['perfis'][perfil.nome]
+    return perfil
+
+def velocidades_da_via(tags, perfis):
+    """
+    Velocidade (m/s, 0.0 se inacessível) de uma via em cada perfil.
+    """
+    return tuple(perfil.velocidade(tags) for perfil in perfis)
+
+def tempos_da_aresta(comprimento, velocidades, perfis):
+    """
+    Atributos de tempo de uma aresta no networkx, {'tempo_<nome>': segundos},
+    com inf nos perfis que não podem usá-la.
+    """
+    return {perfil.atributo: comprimento / velocidade if velocidade > 0 else float('inf')
+            for perfil, velocidade in zip(perfis, velocidades)}
+
+def tempos_vetorizados(comprimentos, velocidades, perfis):
+    """
+    Versão vetorizada de tempos_da_aresta para o GrafoCSR.
+
+    Args:
+        comprimentos: Array com o comprimento de cada segmento.
+        velocidades: Matriz (segmentos x perfis) de velocidades em m/s.
+
+    Returns:
+        dict: {nome do perfil: array de tempos}
+    """
+    comprimentos = np.asarray(comprimentos, dtype=np.float64)
+    velocidades = np.asarray(velocidades, dtype=np.float64).reshape(len(comprimentos), len(perfis))
+    acessivel = velocidades > 0
+    tempos = np.where(acessivel, comprimentos[:, None] / np.where(acessivel, velocidades, 1.0), np.inf)
+    return {perfil.nome: tempos[:, k] for k, perfil in enumerate(perfis)}
@@ -0,0 +1,191 @@
+import json
+import os
+
+FORMATO = 'todos_pontos_ndjson'
+VERSAO_FORMATO = 1
+
+# Os registros são gravados sempre com as mesmas chaves na mesma ordem, com
+# as colunas por destino no fim: para ler só os totais de uma origem basta
+# decodificar a linha até o início delas.
+_INICIO_COLUNAS = b',"distancias":'
+
+class GravadorResultados:
+    """
+    Grava os resultados da análise de todos os pontos em um arquivo NDJSON,
+    uma linha por origem assim que ela termina, sem manter os resultados em
+    memória.
+
+    A primeira linha é o cabeçalho, com os parâmetros da análise e a lista
+    de pontos; cada linha seguinte é um registro com a origem, os totais de
+    processar_ponto() e as colunas 'distancias' e 'arestas', alinhadas com
+    a lista de pontos do cabeçalho (a coluna de destinos). Sem caminho (e
+    na posição da própria origem) a distância é null e as arestas, 0. Os
+    números são escritos com repr(), então, exceto tempo_execucao, a mesma
+    análise gera sempre o mesmo arquivo.
+
+    Cada linha é gravada de uma vez e descarregada no disco. Se a análise
+    for interrompida, um novo gravador com retomar=True descarta a linha
+    incompleta do fim, volta a usar os pontos do cabeçalho e passa a
+    acrescentar só as origens que ainda não estão no arquivo.
+
+    Attributes:
+        pontos (list): Pontos da análise, na ordem das colunas.
+        concluidos (set): Origens já gravadas.
+    """
+
+    def __init__(self, arquivo, pontos, parametros, retomar=False):
+        """
+        Args:
+            arquivo: Caminho do arquivo .ndjson.
+            pontos: Pontos da análise (ignorados ao retomar um arquivo
+                existente, que já tem os seus).
+            parametros (dict): Parâmetros gravados no cabeçalho, como
+                algoritmo, modo e perfil. Ao retomar, precisam ser iguais
+                aos do arquivo.
+            retomar (bool): Continua o arquivo existente em vez de
+                sobrescrevê-lo.
+
+        Raises:
+            ValueError: Se o arquivo a retomar foi gerado com outros
+                parâmetros ou não está nesse formato.
+        """
+        self.arquivo = arquivo
+        cabecalho, self.concluidos = None, set()
+        if retomar and os.path.exists(arquivo):
+            cabecalho, self.concluidos = _preparar_retomada(arquivo)
+
+        if cabecalho is not None:
+            for chave, valor in parametros.items():
+                if cabecalho.get(chave) != valor:
+                    raise ValueError(f"{arquivo} foi gerado com {chave}={cabecalho.get(chave)!r}, não {valor!r}.")
+            self._saida = open(arquivo, 'ab')
+        else:
+            cabecalho = {'formato': FORMATO, 'versao': VERSAO_FORMATO, **parametros, 'pontos': list(pontos)}
+            self._saida = open(arquivo, 'wb')
+            self._escrever(cabecalho)
+
+        self.pontos = cabecalho['pontos']
+        self._posicoes = {ponto: i for i, ponto in enumerate(self.pontos)}
+
+    def pendentes(self):
+        """
+        Pontos ainda não gravados, na ordem do cabeçalho.
+        """
+        return [ponto for ponto in self.pontos if ponto not in self.concluidos]
+
+    def gravar(self, ponto, resultados_ponto):
+        """
+        Grava os resultados de uma origem, no formato de processar_ponto().
+        """
+        distancias = [None] * len(self.pontos)
+        arestas = [0] * len(self.pontos)
+        for destino, detalhe in resultados_ponto['detalhes'].items():
+            if detalhe['distancia'] != float('inf'):
+                i = self._posicoes[destino]
+                distancias[i] = float(detalhe['distancia'])
+                arestas[i] = int(detalhe['num_arestas'])
+        self._escrever({'origem': ponto,
+                        'tempo_total': float(resultados_ponto['tempo_total']),
+                        'caminhos_validos': resultados_ponto['caminhos_validos'],
+                        'caminhos_invalidos': resultados_ponto['caminhos_invalidos'],
+                        'tempo_execucao': resultados_ponto['tempo_execucao'],
+                        'distancias': distancias,
+                        'arestas': arestas})
+        self.concluidos.add(ponto)
+
+    def fechar(self):
+        self._saida.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        self.fechar()
+
+    def _escrever(self, registro):
+        linha = json.dumps(registro, separators=(',', ':'), allow_nan=False).encode('utf-8')
+        self._saida.write(linha + b'\n')
+        self._saida.flush()
+
+def ler_cabecalho(arquivo):
+    """
+    Cabeçalho de um arquivo de GravadorResultados.
+
+    Raises:
+        ValueError: Se o arquivo não está nesse formato.
+    """
+    with open(arquivo, 'rb') as entrada:
+        linha = entrada.readline()
+    try:
+        cabecalho = json.loads(linha)
+    except ValueError:
+        cabecalho = None
+    if not isinstance(cabecalho, dict) or cabecalho.get('formato') != FORMATO:
+        raise ValueError(f"{arquivo} não é um arquivo de resultados {FORMATO}.")
+    if cabecalho['versao'] != VERSAO_FORMATO:
+        raise ValueError(f"{arquivo} está na versão {cabecalho['versao']} do formato, não {VERSAO_FORMATO}.")
+    return cabecalho
+
+def ler_resultados(arquivo, detalhes=False):
+    """
+    Percorre os registros de um arquivo de GravadorResultados, um por vez.
+    Uma linha incompleta no fim (análise interrompida) é ignorada.
+
+    Args:
+        arquivo: Caminho do arquivo .ndjson.
+        detalhes (bool): Se True, inclui o dicionário 'detalhes' por
+            destino, como o de processar_ponto(); sem ele só os totais da
+            linha são decodificados.
+
+    Yields:
+        tuple: (origem, {tempo_total, caminhos_validos, caminhos_invalidos,
+        tempo_execucao[, detalhes]}), na ordem do arquivo.
+    """
+    pontos = ler_cabecalho(arquivo)['pontos']
+    with open(arquivo, 'rb') as entrada:
+        entrada.readline()
+        for linha in entrada:
+            if not linha.endswith(b'\n'):
+                break
+            if not detalhes:
+                dados = _totais(linha)
+                yield dados.pop('origem'), dados
+                continue
+            dados = json.loads(linha)
+            origem = dados.pop('origem')
+            distancias, arestas = dados.pop('distancias'), dados.pop('arestas')
+            dados['detalhes'] = {destino: {'distancia': float('inf') if distancia is None else distancia,
+                                           'num_arestas': num_arestas}
+                                 for destino, distancia, num_arestas in zip(pontos, distancias, arestas)
+                                 if destino != origem}
+            yield origem, dados
+
+def _totais(linha):
+    # Decodifica o registro sem as colunas por destino.
+    fim = linha.find(_INICIO_COLUNAS)
+    if fim == -1:
+        return json.loads(linha)
+    return json.loads(linha[:fim] + b'}')
+
+def _preparar_retomada(arquivo):
+    """
+    Corta a linha incompleta do fim do arquivo e lê o cabeçalho e as
+    origens já gravadas. Sem um cabeçalho completo, retorna (None, set())
+    e o arquivo é recomeçado.
+    """
+    cabecalho, concluidos = None, set()
+    tamanho_valido = 0
+    with open(arquivo, 'rb') as entrada:
+        primeira = entrada.readline()
+        if primeira.endswith(b'\n'):
+            cabecalho = ler_cabecalho(arquivo)
+            tamanho_valido = len(primeira)
+            for linha in entrada:
+                if not linha.endswith(b'\n'):
+                    break
+                concluidos.add(_totais(linha)['origem'])
+                tamanho_valido += len(linha)
+    if cabecalho is not None and os.path.getsize(arquivo) != tamanho_valido:
+        with open(arquivo, 'r+b') as saida:
+            saida.truncate(tamanho_valido)
+    return cabecalho, concluidos
@@ -0,0 +1,342 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import math
+import multiprocessing
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+import networkx as nx
+from parser import criar_grafo_do_json
+from algoritmos_busca import ALGORITMOS, arvore_caminhos_minimos, caminho_na_arvore, matriz_distancias
+from indice_espacial import IndiceEspacial
+
+# Grafo de cada processo do pool, carregado uma única vez por processo.
+_grafo_worker = None
+
+def _inicializar_worker(grafo, arquivo_json):
+    global _grafo_worker
+    if grafo is None:
+        # Sem fork, cada worker mapeia o cache compilado do grafo.
+        with contextlib.redirect_stdout(io.StringIO()):
+            grafo = criar_grafo_do_json(arquivo_json, cache=True)
+    _grafo_worker = grafo
+
+def _worker_pronto():
+    return _grafo_worker is not None
+
+def _trabalho_rotas_agrupadas(origem_id, destinos):
+    # Uma única busca a partir da origem responde todos os destinos do grupo.
+    distancias, predecessores = arvore_caminhos_minimos(_grafo_worker, origem_id, destinos)
+    return {destino: (distancias.get(destino), caminho_na_arvore(predecessores, destino)) for destino in destinos}
+
+def _trabalho_rota(algoritmo, origem_id, destino_id):
+    with contextlib.redirect_stdout(io.StringIO()):
+        caminho = ALGORITMOS[algoritmo](_grafo_worker, origem_id, destino_id)
+    if caminho is None:
+        return None, None
+    distancia = sum(_grafo_worker[u][v]['weight'] for u, v in zip(caminho, caminho[1:]))
+    return distancia, caminho
+
+def _trabalho_matriz(origens, destinos):
+    matriz = matriz_distancias(_grafo_worker, origens, destinos)
+    return [[valor if math.isfinite(valor) else None for valor in linha] for linha in matriz.tolist()]
+
+class ErroRequisicao(Exception):
+    """
+    Erro que vira uma resposta HTTP com o status e a mensagem dados.
+    """
+
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+        self.mensagem = mensagem
+
+class ServidorRotas:
+    """
+    Servidor HTTP local (asyncio) que carrega o grafo uma vez e responde:
+
+    - GET  /rota?origem=ID&destino=ID[&algoritmo=nome]
+      (ou origem_lat, origem_lon, destino_lat, destino_lon, ajustados ao
+      nó mais próximo)
+    - POST /matriz  com {"origens": [...], "destinos": [...]}
+    - GET  /ajustar?lat=..&lon=..
+    - GET  /estatisticas
+
+    As buscas rodam em um pool de processos. Rotas sem algoritmo explícito
+    que chegam com a mesma origem dentro da janela de agrupamento são
+    respondidas por uma única busca um-para-muitos.
+
+    Quando há max_pendentes requisições em andamento, novas requisições
+    recebem 503 na hora em vez de aumentar a fila; cada requisição tem até
+    tempo_limite segundos para terminar, senão recebe 504. Qualquer outra
+    falha vira 500 com o erro em JSON, contada em 'erros'.
+    """
+
+    def __init__(self, grafo, arquivo_json=None, workers=2, max_pendentes=256, tempo_limite=10.0,
+                 janela_agrupamento=0.002):
+        self.grafo = grafo
+        self.indice = IndiceEspacial(grafo)
+        self.max_pendentes = max_pendentes
+        self.tempo_limite = tempo_limite
+        self.janela_agrupamento = janela_agrupamento
+        self.pendentes = 0
+        self.contadores = {'requisicoes': 0, 'rotas': 0, 'buscas_agrupadas': 0, 'rotas_agrupadas': 0,
+                           'rejeitadas': 0, 'tempo_esgotado': 0, 'erros': 0}
+        self._grupos = {}
+
+        if 'fork' in multiprocessing.get_all_start_methods():
+            contexto = multiprocessing.get_context('fork')
+            argumentos = (grafo, None)
+        else:
+            if arquivo_json is None:
+                raise ValueError("arquivo_json é obrigatório sem suporte a fork.")
+            contexto = multiprocessing.get_context('spawn')
+            argumentos = (None, arquivo_json)
+        self.executor = ProcessPoolExecutor(workers, mp_context=contexto, initializer=_inicializar_worker,
+                                            initargs=argumentos)
+
+    async def iniciar(self, host='127.0.0.1', porta=8080):
+        # Os workers são criados antes do socket de escuta; criados depois,
+        # herdariam o socket e poderiam segurar a porta após o servidor sair.
+        await asyncio.get_running_loop().run_in_executor(self.executor, _worker_pronto)
+        return await asyncio.start_server(self._atender, host, porta)
+
+    def encerrar(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- HTTP ---
+
+    async def _atender(self, leitor, escritor):
+        try:
+            while True:
+                try:
+                    requisicao = await _ler_requisicao(leitor)
+                except ErroRequisicao as erro:
+                    await _escrever(escritor, erro.status, {'erro': erro.mensagem}, manter=False)
+                    break
+                if requisicao is None:
+                    break
+                metodo, alvo, cabecalhos, corpo = requisicao
+                status, resposta = await self._responder(metodo, alvo, corpo)
+                manter = cabecalhos.get('connection', '').lower() != 'close'
+                await _escrever(escritor, status, resposta, manter)
+                if not manter:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            escritor.close()
+
+    async def _responder(self, metodo, alvo, corpo):
+        self.contadores['requisicoes'] += 1
+        url = urlsplit(alvo)
+        parametros = {chave: valores[-1] for chave, valores in parse_qs(url.query).items()}
+        rotas = {
+            ('GET', '/rota'): lambda: self._rota(parametros),
+            ('POST', '/matriz'): lambda: self._matriz(corpo),
+            ('GET', '/ajustar'): lambda: self._ajustar(parametros),
+        }
+        if (metodo, url.path) == ('GET', '/estatisticas'):
+            return 200, dict(self.contadores, pendentes=self.pendentes)
+        if (metodo, url.path) not in rotas:
+            return 404, {'erro': f"Caminho desconhecido: {metodo} {url.path}"}
+
+        if self.pendentes >= self.max_pendentes:
+            self.contadores['rejeitadas'] += 1
+            return 503, {'erro': "Servidor ocupado, tente novamente."}
+        self.pendentes += 1
+        try:
+            return 200, await asyncio.wait_for(rotas[(metodo, url.path)](), self.tempo_limite)
+        except asyncio.TimeoutError:
+            self.contadores['tempo_esgotado'] += 1
+            return 504, {'erro': f"A requisição passou de {self.tempo_limite} segundos."}
+        except ErroRequisicao as erro:
+            self.contadores['erros'] += 1
+            return erro.status, {'erro': erro.mensagem}
+        except Exception as erro:
+            # Falha inesperada (inclusive de um worker ou repassada a todo um
+            # grupo de rotas): o cliente recebe 500 em vez de uma conexão
+            # fechada sem resposta.
+            self.contadores['erros'] += 1
+            print(f"Erro interno em {metodo} {url.path}:", file=sys.stderr)
+            traceback.print_exception(type(erro), erro, erro.__traceback__, file=sys.stderr)
+            return 500, {'erro': f"Erro interno: {type(erro).__name__}: {erro}"}
+        finally:
+            self.pendentes -= 1
+
+    # --- Endpoints ---
+
+    async def _rota(self, parametros):
+        origem = self._no_da_requisicao(parametros, 'origem')
+        destino = self._no_da_requisicao(parametros, 'destino')
+        algoritmo = parametros.get('algoritmo')
+        self.contadores['rotas'] += 1
+
+        if algoritmo is None:
+            distancia, caminho = await self._rota_agrupada(origem, destino)
+        elif algoritmo in ALGORITMOS:
+            distancia, caminho = await self._executar(_trabalho_rota, algoritmo, origem, destino)
+        else:
+            raise ErroRequisicao(400, f"Algoritmo desconhecido: {algoritmo}. Use um de {sorted(ALGORITMOS)}.")
+        return {'origem': origem, 'destino': destino, 'distancia': distancia, 'caminho': caminho}
+
+    async def _matriz(self, corpo):
+        try:
+            dados = json.loads(corpo or b'{}')
+            origens = [int(no) for no in dados['origens']]
+            destinos = [int(no) for no in dados['destinos']]
+        except (ValueError, KeyError, TypeError):
+            raise ErroRequisicao(400, "Envie um JSON com as listas 'origens' e 'destinos'.")
+        for no in origens + destinos:
+            self._verificar_no(no)
+        matriz = await self._executar(_trabalho_matriz, origens, destinos)
+        return {'origens': origens, 'destinos': destinos, 'distancias': matriz}
+
+    async def _ajustar(self, parametros):
+        lat, lon = _coordenada(parametros, 'lat'), _coordenada(parametros, 'lon')
+        no, distancia = self.indice.no_mais_proximo(lat, lon)
+        return {'no': no, 'distancia': distancia}
+
+    # --- Agrupamento por origem ---
+
+    async def _rota_agrupada(self, origem, destino):
+        laco = asyncio.get_running_loop()
+        grupo = self._grupos.get(origem)
+        if grupo is None:
+            grupo = self._grupos[origem] = {}
+            laco.call_later(self.janela_agrupamento, lambda: asyncio.ensure_future(self._disparar(origem)))
+        futuro = grupo.get(destino)
+        if futuro is None:
+            futuro = grupo[destino] = laco.create_future()
+        # shield: o tempo limite de uma requisição não cancela o resultado
+        # compartilhado pelas outras do mesmo grupo.
+        return await asyncio.shield(futuro)
+
+    async def _disparar(self, origem):
+        grupo = self._grupos.pop(origem)
+        destinos = list(grupo)
+        self.contadores['buscas_agrupadas'] += 1
+        self.contadores['rotas_agrupadas'] += len(destinos)
+        try:
+            resultados = await self._executar(_trabalho_rotas_agrupadas, origem, destinos)
+        except Exception as erro:
+            for futuro in grupo.values():
+                if not futuro.done():
+                    futuro.set_exception(erro)
+            return
+        for destino, futuro in grupo.items():
+            if not futuro.done():
+                futuro.set_result(resultados[destino])
+
+    # --- Auxiliares ---
+
+    async def _executar(self, funcao, *argumentos):
+        laco = asyncio.get_running_loop()
+        try:
+            return await laco.run_in_executor(self.executor, funcao, *argumentos)
+        except nx.NodeNotFound as erro:
+            raise ErroRequisicao(404, str(erro))
+
+    def _verificar_no(self, no):
+        if no not in self.grafo:
+            raise ErroRequisicao(404, f"O nó {no} não está no grafo.")
+
+    def _no_da_requisicao(self, parametros, nome):
+        if nome in parametros:
+            try:
+                no = int(parametros[nome])
+            except ValueError:
+                raise ErroRequisicao(400, f"O parâmetro '{nome}' deve ser um ID de nó.")
+            self._verificar_no(no)
+            return no
+        lat, lon = _coordenada(parametros, f'{nome}_lat'), _coordenada(parametros, f'{nome}_lon')
+        return self.indice.no_mais_proximo(lat, lon)[0]
+
+_MOTIVOS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 413: 'Payload Too Large',
+            500: 'Internal Server Error', 503: 'Service Unavailable', 504: 'Gateway Timeout'}
+
+def _coordenada(parametros, nome):
+    try:
+        return float(parametros[nome])
+    except KeyError:
+        raise ErroRequisicao(400, f"Parâmetro obrigatório ausente: '{nome}'.")
+    except ValueError:
+        raise ErroRequisicao(400, f"O parâmetro '{nome}' deve ser um número.")
+
+async def _ler_requisicao(leitor, tamanho_maximo=16 << 20):
+    """
+    Lê uma requisição HTTP/1.1 (linha inicial, cabeçalhos e corpo com
+    Content-Length).
+
+    Returns:
+        tuple or None: (metodo, alvo, cabecalhos, corpo), ou None se a
+        conexão foi fechada.
+    """
+    linha = await leitor.readline()
+    if not linha:
+        return None
+    partes = linha.decode('latin-1').split()
+    if len(partes) != 3:
+        raise ErroRequisicao(400, "Linha de requisição HTTP inválida.")
+    metodo, alvo, _ = partes
+    cabecalhos = {}
+    while True:
+        linha = await leitor.readline()
+        if linha in (b'\r\n', b'\n', b''):
+            break
+        chave, _, valor = linha.decode('latin-1').partition(':')
+        cabecalhos[chave.strip().lower()] = valor.strip()
+    try:
+        tamanho = int(cabecalhos.get('content-length', 0))
+    except ValueError:
+        raise ErroRequisicao(400, "Content-Length inválido.")
+    if tamanho > tamanho_maximo:
+        raise ErroRequisicao(413, f"O corpo da requisição passa de {tamanho_maximo} bytes.")
+    corpo = await leitor.readexactly(tamanho) if tamanho else b''
+    return metodo, alvo, cabecalhos, corpo
+
+async def _escrever(escritor, status, resposta, manter):
+    dados = json.dumps(resposta, ensure_ascii=False).encode('utf-8')
+    escritor.write(
+        f"HTTP/1.1 {status} {_MOTIVOS.get(status, '')}\r\n"
+        f"Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(dados)}\r\n"
+        f"Connection: {'keep-alive' if manter else 'close'}\r\n\r\n".encode('ascii') + dados)
+    await escritor.drain()
+
+async def _servir(args):
+    print("Carregando grafo...")
+    grafo = criar_grafo_do_json(args.arquivo, cache=True)
+    if grafo is None:
+        print("Erro ao carregar o grafo!")
+        return
+    servidor_rotas = ServidorRotas(grafo, args.arquivo, workers=args.workers, max_pendentes=args.max_pendentes,
+                                   tempo_limite=args.tempo_limite, janela_agrupamento=args.janela / 1000)
+    servidor = await servidor_rotas.iniciar(args.host, args.porta)
+    print(f"Servidor de rotas em http://{args.host}:{args.porta} ({args.workers} workers)")
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        servidor_rotas.encerrar()
+
+if __name__ == "__main__":
+    argumentos = argparse.ArgumentParser(description="Servidor HTTP de rotas")
+    argumentos.add_argument('--arquivo', default='exporty.json', help="Arquivo JSON do OpenStreetMap")
+    argumentos.add_argument('--host', default='127.0.0.1')
+    argumentos.add_argument('--porta', type=int, default=8080)
+    argumentos.add_argument('--workers', type=int, default=2, help="Processos para as buscas")
+    argumentos.add_argument('--max-pendentes', type=int, default=256,
+                            help="Requisicoes simultaneas antes de responder 503")
+    argumentos.add_argument('--tempo-limite', type=float, default=10.0, help="Segundos por requisicao")
+    argumentos.add_argument('--janela', type=float, default=2.0,
+                            help="Janela de agrupamento de rotas com a mesma origem, em ms")
+    args = argumentos.parse_args()
+    try:
+        asyncio.run(_servir(args))
+    except KeyboardInterrupt:
+        print("\nServidor encerrado.")
@@ -0,0 +1,229 @@
+import networkx as nx
+import numpy as np
+from grafo_csr import GrafoCSR
+
+class Simplificacao:
+    """
+    Registro das cadeias contraídas por simplificar_grafo(), guardado em
+    grafo.graph['simplificacao'] do grafo simplificado.
+
+    Os nós intermediários de todas as cadeias ficam em um único array (nos),
+    com as coordenadas em lat e lon; os da cadeia k ocupam as posições
+    offsets[k]..offsets[k+1]-1, na ordem do percurso. As duas mãos de uma
+    via de mão dupla são cadeias separadas.
+
+    Attributes:
+        estatisticas (dict): Nós e arestas antes e depois, cadeias
+            contraídas e nós removidos.
+    """
+
+    def __init__(self, cadeias, coordenadas, estatisticas):
+        """
+        Args:
+            cadeias (dict): {(origem_id, destino_id): [IDs intermediários]}
+            coordenadas (dict): {ID: (lat, lon)} dos nós intermediários.
+            estatisticas (dict): Contagens da simplificação.
+        """
+        self._indice = {aresta: k for k, aresta in enumerate(cadeias)}
+        tamanhos = np.fromiter((len(nos) for nos in cadeias.values()), dtype=np.int64, count=len(cadeias))
+        self.offsets = np.zeros(len(cadeias) + 1, dtype=np.int64)
+        np.cumsum(tamanhos, out=self.offsets[1:])
+        self.nos = np.fromiter((no for nos in cadeias.values() for no in nos), dtype=np.int64,
+                               count=int(self.offsets[-1]))
+        posicoes = np.array([coordenadas[no] for no in self.nos.tolist()], dtype=np.float64).reshape(-1, 2)
+        self.lat = posicoes[:, 0].copy()
+        self.lon = posicoes[:, 1].copy()
+        self.estatisticas = estatisticas
+
+    def intermediarios(self, origem_id, destino_id):
+        """
+        IDs dos nós removidos entre origem e destino, na ordem do percurso
+        (vazio se a aresta não veio de uma cadeia).
+        """
+        k = self._indice.get((origem_id, destino_id))
+        if k is None:
+            return self.nos[:0]
+        return self.nos[self.offsets[k]:self.offsets[k + 1]]
+
+    def coordenadas_intermediarias(self, origem_id, destino_id):
+        """
+        Coordenadas [(lat, lon), ...] dos nós removidos entre origem e
+        destino, na ordem do percurso.
+        """
+        k = self._indice.get((origem_id, destino_id))
+        if k is None:
+            return []
+        inicio, fim = self.offsets[k], self.offsets[k + 1]
+        return list(zip(self.lat[inicio:fim].tolist(), self.lon[inicio:fim].tolist()))
+
+    def tamanho_em_bytes(self):
+        """
+        Memória ocupada pelos arrays (sem contar o índice das cadeias).
+        """
+        return sum(a.nbytes for a in (self.offsets, self.nos, self.lat, self.lon))
+
+def simplificar_grafo(grafo, preservar=()):
+    """
+    Contrai as cadeias de nós de grau 2 (pontos de forma das vias, com uma
+    única via entrando e saindo) em arestas únicas.
+
+    Um nó é removido quando tem exatamente um antecessor e um sucessor
+    distintos (trecho de mão única) ou os mesmos dois vizinhos nos dois
+    sentidos (trecho de mão dupla). A aresta que substitui a cadeia soma o
+    'weight' e os tempos dos perfis das arestas originais e leva o nome e o
+    tipo da primeira delas, então as distâncias entre os nós mantidos não
+    mudam. Cadeias que ligariam um nó a ele mesmo, ou dois nós já ligados
+    por outra aresta, mantêm um nó do meio.
+
+    Args:
+        grafo: Grafo do NetworkX ou GrafoCSR
+        preservar: IDs de nós que não podem ser removidos (por exemplo,
+            origens e destinos de interesse)
+
+    Returns:
+        networkx.DiGraph or GrafoCSR: Grafo simplificado, do mesmo tipo do
+        original, com a Simplificacao em grafo.graph['simplificacao'].
+    """
+    coordenadas = {no: (dados['lat'], dados['lon']) for no, dados in grafo.nodes(data=True)}
+    sucessores = {no: {} for no in coordenadas}
+    antecessores = {no: {} for no in coordenadas}
+    for origem, destino, dados in grafo.edges(data=True):
+        sucessores[origem][destino] = dados
+        antecessores[destino][origem] = dados
+
+    # Cada rodada mantém o nó do meio das cadeias rejeitadas; em geral
+    # basta uma segunda rodada.
+    mantidos = set(preservar)
+    while True:
+        arestas, rejeitados = _contrair(sucessores, antecessores, mantidos)
+        if not rejeitados:
+            break
+        mantidos.update(rejeitados)
+
+    cadeias = {aresta: meio for aresta, meio in arestas.items() if meio}
+    removidos = {no for meio in cadeias.values() for no in meio}
+    perfis = grafo.graph.get('perfis', {})
+    infinito = float('inf')
+    nos = {no: posicao for no, posicao in coordenadas.items() if no not in removidos}
+    dados_arestas = {}
+    tempos = {nome: [] for nome in perfis}
+    for (origem, destino), meio in arestas.items():
+        percurso = [origem, *meio, destino]
+        trechos = [sucessores[u][v] for u, v in zip(percurso, percurso[1:])]
+        dados_arestas[(origem, destino)] = (sum(trecho.get('weight', 1) for trecho in trechos),
+                                            trechos[0].get('name', 'unknown'),
+                                            trechos[0].get('highway', 'unclassified'))
+        for nome, perfil in perfis.items():
+            tempos[nome].append(sum(trecho.get(perfil.atributo, infinito) for trecho in trechos))
+
+    if isinstance(grafo, GrafoCSR):
+        simplificado = GrafoCSR.de_listas(nos, dados_arestas, tempos)
+    else:
+        simplificado = nx.DiGraph()
+        for no, (lat, lon) in nos.items():
+            simplificado.add_node(no, lat=lat, lon=lon)
+        for k, ((origem, destino), (peso, nome_da_rua, tipo_da_rua)) in enumerate(dados_arestas.items()):
+            simplificado.add_edge(origem, destino, weight=peso, name=nome_da_rua, highway=tipo_da_rua,
+                                  **{perfil.atributo: tempos[nome][k] for nome, perfil in perfis.items()})
+    simplificado.graph['perfis'] = dict(perfis)
+    simplificado.graph['simplificacao'] = Simplificacao(cadeias, coordenadas, {
+        'nos_antes': grafo.number_of_nodes(), 'arestas_antes': grafo.number_of_edges(),
+        'nos_depois': simplificado.number_of_nodes(), 'arestas_depois': simplificado.number_of_edges(),
+        'cadeias': len(cadeias), 'nos_removidos': len(removidos),
+    })
+    return simplificado
+
+def expandir_caminho(grafo, caminho):
+    """
+    Converte um caminho do grafo simplificado na sequência completa de nós
+    do grafo original. Caminhos de grafos não simplificados (e None) são
+    retornados sem mudança.
+    """
+    simplificacao = grafo.graph.get('simplificacao')
+    if caminho is None or simplificacao is None:
+        return caminho
+    expandido = list(caminho[:1])
+    for origem, destino in zip(caminho, caminho[1:]):
+        expandido.extend(simplificacao.intermediarios(origem, destino).tolist())
+        expandido.append(destino)
+    return expandido
+
+def coordenadas_da_aresta(grafo, origem_id, destino_id):
+    """
+    Geometria [(lat, lon), ...] da aresta, incluindo os pontos das cadeias
+    contraídas quando o grafo foi simplificado.
+    """
+    simplificacao = grafo.graph.get('simplificacao')
+    meio = simplificacao.coordenadas_intermediarias(origem_id, destino_id) if simplificacao else []
+    origem, destino = grafo.nodes[origem_id], grafo.nodes[destino_id]
+    return [(origem['lat'], origem['lon']), *meio, (destino['lat'], destino['lon'])]
+
+def coordenadas_do_caminho(grafo, caminho):
+    """
+    Geometria [(lat, lon), ...] de um caminho, para desenhá-lo no mapa.
+    """
+    if not caminho:
+        return []
+    dados = grafo.nodes[caminho[0]]
+    pontos = [(dados['lat'], dados['lon'])]
+    for origem, destino in zip(caminho, caminho[1:]):
+        pontos.extend(coordenadas_da_aresta(grafo, origem, destino)[1:])
+    return pontos
+
+def _e_interno(no, sucessores, antecessores, mantidos):
+    # Nó de passagem: mão única (u -> no -> w) ou mão dupla (u <-> no <-> w).
+    saida, entrada = sucessores[no], antecessores[no]
+    if no in mantidos or no in saida:
+        return False
+    if len(saida) == 1 and len(entrada) == 1:
+        return saida.keys() != entrada.keys()
+    return len(saida) == 2 and saida.keys() == entrada.keys()
+
+def _contrair(sucessores, antecessores, mantidos):
+    """
+    Percorre as cadeias a partir de cada nó mantido.
+
+    Returns:
+        tuple: ({(origem, destino): [intermediários]} com todas as arestas
+        do grafo simplificado, na ordem dos nós e dos sucessores; nós que
+        precisam ser mantidos para desfazer colisões)
+    """
+    interno = {no: _e_interno(no, sucessores, antecessores, mantidos) for no in sucessores}
+    arestas = {}
+    rejeitados = set()
+    visitados = set()
+
+    def meio_da_cadeia(meio):
+        # O mesmo nó nos dois sentidos de uma cadeia de mão dupla.
+        return min(meio[len(meio) // 2], meio[(len(meio) - 1) // 2])
+
+    for origem in sucessores:
+        if interno[origem]:
+            continue
+        for proximo in sucessores[origem]:
+            anterior, atual, meio = origem, proximo, []
+            while interno[atual]:
+                meio.append(atual)
+                seguinte = next(no for no in sucessores[atual] if no != anterior)
+                anterior, atual = atual, seguinte
+            visitados.update(meio)
+            existente = arestas.get((origem, atual))
+            if meio and (atual == origem or existente is not None):
+                rejeitados.add(meio_da_cadeia(meio))
+            elif existente:
+                # Uma aresta direta chegou depois de uma cadeia entre os mesmos nós.
+                rejeitados.add(meio_da_cadeia(existente))
+                arestas[(origem, atual)] = meio
+            else:
+                arestas[(origem, atual)] = meio
+
+    # Ciclos formados só por nós de passagem: um nó de cada passa a ser mantido.
+    for no in sucessores:
+        if interno[no] and no not in visitados:
+            rejeitados.add(no)
+            anterior, atual = next(iter(antecessores[no])), no
+            while atual not in visitados:
+                visitados.add(atual)
+                seguinte = next(v for v in sucessores[atual] if v != anterior)
+                anterior, atual = atual, seguinte
+    return arestas, rejeitados
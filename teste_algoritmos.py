@@ -1,12 +1,20 @@
 import networkx as nx
 import folium
 import random
+import time
+import contextlib
+import io
 from parser import criar_grafo_do_json
-from algoritmos_busca import dijkstra, a_estrela
+from algoritmos_busca import dijkstra, a_estrela, ALGORITMOS, preparar_marcos, preparar_hierarquia
+from indice_espacial import IndiceEspacial
+from simplificacao import coordenadas_da_aresta, coordenadas_do_caminho
 
 def visualizar_mapa_com_rota(grafo, caminho=None, nome_arquivo='mapa_com_rota.html'):
     """
     Cria e salva um mapa interativo em HTML, destacando uma rota específica.
+
+    Em um grafo simplificado, as arestas e a rota são desenhadas com a
+    geometria completa das cadeias contraídas.
     """
     if grafo is None:
         print("Erro: O grafo não pode ser nulo para visualização.")
@@ -20,10 +28,8 @@ def visualizar_mapa_com_rota(grafo, caminho=None, nome_arquivo='mapa_com_rota.ht
 
     # Adiciona as arestas do grafo
     for origem, destino, data in grafo.edges(data=True):
-        origem_coords = (grafo.nodes[origem]['lat'], grafo.nodes[origem]['lon'])
-        destino_coords = (grafo.nodes[destino]['lat'], grafo.nodes[destino]['lon'])
         folium.PolyLine(
-            locations=[origem_coords, destino_coords],
+            locations=coordenadas_da_aresta(grafo, origem, destino),
             color='gray',
             weight=1,
             opacity=0.7
@@ -31,12 +37,8 @@ def visualizar_mapa_com_rota(grafo, caminho=None, nome_arquivo='mapa_com_rota.ht
 
     # Destaca o caminho encontrado
     if caminho:
-        pontos_caminho = []
-        for node_id in caminho:
-            pontos_caminho.append((grafo.nodes[node_id]['lat'], grafo.nodes[node_id]['lon']))
-        
         folium.PolyLine(
-            locations=pontos_caminho,
+            locations=coordenadas_do_caminho(grafo, caminho),
             color='red',
             weight=5,
             opacity=1.0,
@@ -47,17 +49,70 @@ def visualizar_mapa_com_rota(grafo, caminho=None, nome_arquivo='mapa_com_rota.ht
     print(f"...Mapa com a rota salvo como '{nome_arquivo}'. Abra-o no seu navegador.")
     print("")
 
+def comparar_algoritmos(grafo, num_pares=100, semente=0):
+    """
+    Executa todos os algoritmos de ALGORITMOS nos mesmos pares aleatórios de
+    nós, confere se as distâncias coincidem com as do Dijkstra e mostra o
+    tempo total, os nós fixados e o ganho em relação ao Dijkstra.
+
+    Os marcos do ALT e a hierarquia de contração são preparados antes, com
+    o tempo mostrado à parte, para que a tabela compare só as consultas.
+    """
+    rng = random.Random(semente)
+    nos = list(grafo.nodes)
+    pares = [(rng.choice(nos), rng.choice(nos)) for _ in range(num_pares)]
+
+    def distancia(caminho):
+        if caminho is None:
+            return None
+        return sum(grafo[u][v]['weight'] for u, v in zip(caminho, caminho[1:]))
+
+    inicio = time.perf_counter()
+    preparar_marcos(grafo)
+    tempo_marcos = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    preparar_hierarquia(grafo)
+    tempo_hierarquia = time.perf_counter() - inicio
+
+    referencia = None
+    print(f"\n--- Comparando algoritmos em {num_pares} pares aleatorios ---")
+    print(f"Preparacao: marcos em {tempo_marcos * 1000:.1f} ms, hierarquia em {tempo_hierarquia * 1000:.1f} ms")
+    print(f"{'Algoritmo':<26}{'Tempo (ms)':>12}{'Nos fixados':>14}{'Ganho':>8}{'Iguais':>10}")
+    for nome, funcao in ALGORITMOS.items():
+        distancias = []
+        fixados = 0
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for origem, destino in pares:
+                estatisticas = {}
+                distancias.append(distancia(funcao(grafo, origem, destino, estatisticas=estatisticas)))
+                fixados += estatisticas['nos_fixados']
+        tempo_ms = (time.perf_counter() - inicio) * 1000
+        if referencia is None:
+            referencia = (distancias, tempo_ms)
+        iguais = sum(
+            (d is None and r is None) or (d is not None and r is not None and abs(d - r) < 1e-6)
+            for d, r in zip(distancias, referencia[0])
+        )
+        print(f"{nome:<26}{tempo_ms:>12.1f}{fixados:>14}{referencia[1] / tempo_ms:>7.2f}x{iguais:>6}/{num_pares}")
+
 if __name__ == "__main__":
     arquivo = 'exporty.json'
-    grafo_final = criar_grafo_do_json(arquivo)
+    grafo_final = criar_grafo_do_json(arquivo, cache=True)
 
     if grafo_final is not None and grafo_final.number_of_nodes() > 0:
         print(f"Grafo criado com sucesso! :)")
         
-        # Escolhe dois nós aleatórios do grafo para definir uma rota
-        nos_disponiveis = list(grafo_final.nodes)
-        no_origem = random.choice(nos_disponiveis)
-        no_destino = random.choice(nos_disponiveis)
+        # Sorteia duas coordenadas dentro da área do grafo, como as que chegam
+        # de um GPS, e as ajusta aos nós mais próximos
+        indice = IndiceEspacial(grafo_final)
+        lat_min, lat_max = float(indice.lat.min()), float(indice.lat.max())
+        lon_min, lon_max = float(indice.lon.min()), float(indice.lon.max())
+        pontos_gps = [(random.uniform(lat_min, lat_max), random.uniform(lon_min, lon_max)) for _ in range(2)]
+        (no_origem, dist_origem), (no_destino, dist_destino) = (indice.no_mais_proximo(lat, lon)
+                                                                for lat, lon in pontos_gps)
+        print(f"Origem ({pontos_gps[0][0]:.6f}, {pontos_gps[0][1]:.6f}) -> nó {no_origem} a {dist_origem:.1f} m")
+        print(f"Destino ({pontos_gps[1][0]:.6f}, {pontos_gps[1][1]:.6f}) -> nó {no_destino} a {dist_destino:.1f} m")
         
         print(f"Calculando rota de {no_origem} para {no_destino}...")
 
@@ -80,4 +135,6 @@ if __name__ == "__main__":
             if caminho_dijkstra == caminho_a_estrela:
                 print("\nOs caminhos encontrados por Dijkstra e A* são idênticos, como esperado.")
             else:
-                print("\nAlerta: Os caminhos encontrados por Dijkstra e A* são diferentes.")
\ No newline at end of file
+                print("\nAlerta: Os caminhos encontrados por Dijkstra e A* são diferentes.")
+
+        comparar_algoritmos(grafo_final)
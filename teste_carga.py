@@ -0,0 +1,139 @@
+# Teste de carga do servidor_rotas.py em localhost: dispara requisições de
+# rota (com poucas origens, como depósitos atendendo muitas paradas), de
+# ajuste de coordenadas e de matriz, com vários níveis de concorrência, e
+# mostra a latência p50/p99 e a vazão de cada nível.
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import random
+import signal
+import subprocess
+import sys
+import time
+from parser import criar_grafo_do_json
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+async def requisitar(leitor, escritor, metodo, alvo, corpo=b''):
+    escritor.write(f"{metodo} {alvo} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(corpo)}\r\n\r\n"
+                   .encode('ascii') + corpo)
+    await escritor.drain()
+    status = int((await leitor.readline()).split()[1])
+    tamanho = 0
+    while True:
+        linha = await leitor.readline()
+        if linha in (b'\r\n', b''):
+            break
+        if linha.lower().startswith(b'content-length:'):
+            tamanho = int(linha.split(b':')[1])
+    return status, json.loads(await leitor.readexactly(tamanho))
+
+def gerar_requisicoes(nos, coordenadas, total, num_origens, semente):
+    rng = random.Random(semente)
+    origens = rng.sample(nos, num_origens)
+    requisicoes = []
+    for _ in range(total):
+        sorteio = rng.random()
+        if sorteio < 0.80:
+            requisicoes.append(('GET', f"/rota?origem={rng.choice(origens)}&destino={rng.choice(nos)}", b''))
+        elif sorteio < 0.95:
+            lat, lon = rng.choice(coordenadas)
+            lat, lon = lat + rng.uniform(-1e-3, 1e-3), lon + rng.uniform(-1e-3, 1e-3)
+            requisicoes.append(('GET', f"/ajustar?lat={lat}&lon={lon}", b''))
+        else:
+            corpo = json.dumps({'origens': rng.sample(nos, 5), 'destinos': rng.sample(nos, 20)}).encode()
+            requisicoes.append(('POST', '/matriz', corpo))
+    return requisicoes
+
+async def medir_nivel(host, porta, requisicoes, concorrencia):
+    fila = list(reversed(requisicoes))
+    latencias, status = [], {}
+
+    async def cliente():
+        leitor, escritor = await asyncio.open_connection(host, porta)
+        try:
+            while fila:
+                metodo, alvo, corpo = fila.pop()
+                inicio = time.perf_counter()
+                codigo, _ = await requisitar(leitor, escritor, metodo, alvo, corpo)
+                latencias.append((time.perf_counter() - inicio) * 1000)
+                status[codigo] = status.get(codigo, 0) + 1
+        finally:
+            escritor.close()
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente() for _ in range(concorrencia)))
+    return latencias, status, time.perf_counter() - inicio
+
+async def estatisticas(host, porta):
+    leitor, escritor = await asyncio.open_connection(host, porta)
+    try:
+        return (await requisitar(leitor, escritor, 'GET', '/estatisticas'))[1]
+    finally:
+        escritor.close()
+
+async def aguardar_servidor(host, porta, servidor, tempo_limite=120):
+    limite = time.monotonic() + tempo_limite
+    while True:
+        try:
+            return await estatisticas(host, porta)
+        except OSError:
+            if servidor is not None and servidor.poll() is not None:
+                raise RuntimeError(f"O servidor terminou com o codigo {servidor.returncode}.")
+            if time.monotonic() > limite:
+                raise
+            await asyncio.sleep(0.2)
+
+async def executar(args, nos, coordenadas, servidor):
+    await aguardar_servidor(args.host, args.porta, servidor)
+    print(f"{'Concorrencia':>12}{'Requisicoes':>13}{'Vazao (req/s)':>15}{'p50 (ms)':>10}{'p99 (ms)':>10}"
+          f"{'Rotas/busca':>13}{'Status':>20}")
+    for concorrencia in args.concorrencias:
+        requisicoes = gerar_requisicoes(nos, coordenadas, args.requisicoes, args.origens, concorrencia)
+        antes = await estatisticas(args.host, args.porta)
+        latencias, status, duracao = await medir_nivel(args.host, args.porta, requisicoes, concorrencia)
+        depois = await estatisticas(args.host, args.porta)
+        buscas = depois['buscas_agrupadas'] - antes['buscas_agrupadas']
+        rotas = depois['rotas_agrupadas'] - antes['rotas_agrupadas']
+        print(f"{concorrencia:>12}{len(latencias):>13}{len(latencias) / duracao:>15.0f}"
+              f"{percentil(latencias, 50):>10.2f}{percentil(latencias, 99):>10.2f}"
+              f"{rotas / buscas if buscas else 0:>13.2f}{str(dict(sorted(status.items()))):>20}")
+
+if __name__ == "__main__":
+    argumentos = argparse.ArgumentParser(description="Teste de carga do servidor de rotas")
+    argumentos.add_argument('--arquivo', default='exporty.json')
+    argumentos.add_argument('--host', default='127.0.0.1')
+    argumentos.add_argument('--porta', type=int, default=8765)
+    argumentos.add_argument('--workers', type=int, default=2, help="Workers do servidor iniciado pelo teste")
+    argumentos.add_argument('--externo', action='store_true',
+                            help="Usa um servidor ja em execucao em vez de iniciar um")
+    argumentos.add_argument('--requisicoes', type=int, default=2000, help="Requisicoes por nivel")
+    argumentos.add_argument('--origens', type=int, default=8, help="Origens distintas nas rotas")
+    argumentos.add_argument('--concorrencias', type=int, nargs='*', default=[1, 4, 16, 64])
+    args = argumentos.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        grafo = criar_grafo_do_json(args.arquivo, cache=True)
+    nos = list(grafo.nodes())
+    coordenadas = [(dados['lat'], dados['lon']) for _, dados in grafo.nodes(data=True)]
+
+    servidor = None
+    if not args.externo:
+        servidor = subprocess.Popen([sys.executable, 'servidor_rotas.py', '--arquivo', args.arquivo,
+                                     '--porta', str(args.porta), '--workers', str(args.workers)],
+                                    stdout=subprocess.DEVNULL)
+    try:
+        asyncio.run(executar(args, nos, coordenadas, servidor))
+    finally:
+        if servidor is not None:
+            # SIGINT deixa o servidor encerrar o pool de workers.
+            servidor.send_signal(signal.SIGINT)
+            try:
+                servidor.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                servidor.kill()
+                servidor.wait()
@@ -5,7 +5,7 @@ from visu_grafo import visualizar_mapa_interativo
 # --- LÓGICA PRINCIPAL ---
 if __name__ == "__main__":
  arquivo = 'exporty.json'
- grafo_final = criar_grafo_do_json(arquivo)
+ grafo_final = criar_grafo_do_json(arquivo, cache=True)
 
  if grafo_final is not None:
     print(f"Grafo criado com sucesso! :)")
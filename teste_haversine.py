@@ -1,7 +1,15 @@
 # Arquivo para testar a função haversine de forma isolada.
 
-# 1. Importa a função haversine do arquivo parser.py
-from parser import haversine
+# 1. Importa a função haversine do arquivo parser.py (e o que as
+#    conferências do fim usam)
+import contextlib
+import io
+import math
+import random
+import numpy as np
+from parser import haversine, haversine_vetorizado, haversine_radianos, RAIO_TERRA_M, criar_grafo_do_json
+from algoritmos_busca import a_estrela, dijkstra
+from atualizacao_grafo import AtualizadorGrafo
 
 # 2. Defina aqui as coordenadas dos dois pontos que você quer testar
 # Exemplo: Pontos na Avenida Doutor Antônio Gouveia, Maceió, AL
@@ -20,4 +28,71 @@ print(f"Coordenadas do Ponto 2: ({lat2}, {lon2})")
 print("---")
 print(f"A distância calculada entre os dois pontos é de {distancia_em_metros:.2f} metros.")
 #https://www.openstreetmap.org/#map=17/-9.676727/-35.760080
-#https://www.openstreetmap.org/#map=17/-9.674929/-35.754039
\ No newline at end of file
+#https://www.openstreetmap.org/#map=17/-9.674929/-35.754039
+# 5. Confere se a versão vetorizada (usada na construção do grafo) e a versão
+#    com radianos pré-calculados concordam com a fórmula escalar, ponto a
+#    ponto, dentro de 1e-6 metros
+def haversine_referencia(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+    a = math.sin((lat2 - lat1) / 2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2)**2
+    return RAIO_TERRA_M * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+rng = random.Random(0)
+pontos = [(rng.uniform(-10, -9), rng.uniform(-36, -35), rng.uniform(-10, -9), rng.uniform(-36, -35))
+          for _ in range(10000)]
+pontos += [(rng.uniform(-90, 90), rng.uniform(-180, 180), rng.uniform(-90, 90), rng.uniform(-180, 180))
+           for _ in range(10000)]
+coords = np.array(pontos)
+lote = haversine_vetorizado(coords[:, 0], coords[:, 1], coords[:, 2], coords[:, 3])
+radianos = np.radians(coords)
+lote_radianos = haversine_radianos(radianos[:, 0], radianos[:, 1], np.cos(radianos[:, 0]),
+                                   radianos[:, 2], radianos[:, 3], np.cos(radianos[:, 2]))
+
+maior_diferenca = 0.0
+for (la1, lo1, la2, lo2), d_lote, d_radianos in zip(pontos, lote.tolist(), lote_radianos.tolist()):
+    referencia = haversine_referencia(la1, lo1, la2, lo2)
+    maior_diferenca = max(maior_diferenca, abs(d_lote - referencia), abs(haversine(la1, lo1, la2, lo2) - referencia),
+                          abs(d_radianos - referencia))
+
+print("---")
+print(f"Maior diferença entre as versões escalar, vetorizada e em radianos: {maior_diferenca:.2e} metros.")
+assert maior_diferenca < 1e-6, "As versões da fórmula de Haversine divergem!"
+
+# 6. Confere a heurística do A* (a distância de Haversine até o destino)
+#    pelo resultado das buscas: com ela admissível, o A* acha caminhos tão
+#    curtos quanto os do Dijkstra, e nenhum é mais curto que a linha reta.
+#    A conferência é repetida depois de acrescentar nós ao grafo, já com a
+#    heurística usada uma vez.
+def comprimento(grafo, caminho):
+    return sum(grafo[u][v]['weight'] for u, v in zip(caminho, caminho[1:]))
+
+def conferir_a_estrela(grafo, pares):
+    for origem, destino in pares:
+        with contextlib.redirect_stdout(io.StringIO()):
+            caminho_a_estrela = a_estrela(grafo, origem, destino)
+            caminho_dijkstra = dijkstra(grafo, origem, destino)
+        assert (caminho_a_estrela is None) == (caminho_dijkstra is None), (origem, destino)
+        if caminho_a_estrela is None:
+            continue
+        distancia = comprimento(grafo, caminho_a_estrela)
+        assert abs(distancia - comprimento(grafo, caminho_dijkstra)) < 1e-6, (origem, destino)
+        linha_reta = haversine(grafo.nodes[origem]['lat'], grafo.nodes[origem]['lon'],
+                               grafo.nodes[destino]['lat'], grafo.nodes[destino]['lon'])
+        assert distancia >= linha_reta - 1e-6, (origem, destino)
+
+for compacto in (False, True):
+    with contextlib.redirect_stdout(io.StringIO()):
+        grafo = criar_grafo_do_json('exporty.json', compacto=compacto)
+    nos = sorted(grafo.nodes())
+    pares = [(rng.choice(nos), rng.choice(nos)) for _ in range(200)]
+    conferir_a_estrela(grafo, pares)
+
+    # Via de mão dupla nova, saindo de um nó existente para dois nós novos.
+    inicio = nos[0]
+    lat, lon = grafo.nodes[inicio]['lat'], grafo.nodes[inicio]['lon']
+    novos = {nos[-1] + 1: (lat + 0.001, lon + 0.001), nos[-1] + 2: (lat + 0.002, lon + 0.0015)}
+    AtualizadorGrafo(grafo).adicionar_via(
+        {'id': -1, 'nodes': [inicio, *novos], 'tags': {'highway': 'residential', 'name': 'Via de teste'}}, novos)
+    conferir_a_estrela(grafo, pares + [(no, destino) for no in novos for destino in nos[:50]]
+                       + [(origem, no) for no in novos for origem in nos[:50]])
+    print(f"A* e Dijkstra concordam no {'GrafoCSR' if compacto else 'networkx'}, também com nós acrescentados.")
@@ -1,21 +1,34 @@
+import argparse
+import contextlib
+import heapq
+import io
+import multiprocessing
 import networkx as nx
+import numpy as np
+import random
+import sys
 import time
 from parser import criar_grafo_do_json
-from algoritmos_busca import dijkstra, a_estrela
+from algoritmos_busca import ALGORITMOS, ALGORITMOS_COM_PERFIL, dijkstra_todos_destinos, matriz_distancias
+from perfis import PERFIS, obter_perfil
+from componentes import componentes_do_grafo
+from resultados_ndjson import GravadorResultados, ler_resultados
 
-def calcular_peso_total_caminho(grafo, caminho):
+def calcular_peso_total_caminho(grafo, caminho, perfil=None):
     """
     Calcula o peso total (distância em metros) de um caminho no grafo.
     
     Args:
         grafo: Grafo do NetworkX
         caminho: Lista de IDs dos nós que formam o caminho
+        perfil: Perfil de roteamento; se informado, soma o tempo de viagem
     
     Returns:
-        float: Distância total do caminho em metros
+        float: Distância total do caminho em metros (ou segundos no perfil)
     """
     if caminho is None or len(caminho) < 2:
         return 0
+    atributo = 'weight' if perfil is None else obter_perfil(perfil, grafo).atributo
     
     peso_total = 0
     for i in range(len(caminho) - 1):
@@ -24,101 +37,344 @@ def calcular_peso_total_caminho(grafo, caminho):
         
         # Obtém o peso da aresta entre os dois nós
         if grafo.has_edge(origem, destino):
-            peso_aresta = grafo[origem][destino].get('weight', 0)
+            peso_aresta = grafo[origem][destino].get(atributo, 0)
             peso_total += peso_aresta
     
     return peso_total
 
-def executar_dijkstra_todos_pontos(grafo, algoritmo='dijkstra', max_pontos=None):
+def processar_ponto_pares(grafo, ponto_partida, pontos_analise, algoritmo='dijkstra', perfil=None):
+    """
+    Calcula os caminhos de um ponto de partida até cada destino, executando
+    uma busca completa por par origem/destino.
+
+    Args:
+        grafo: Grafo do NetworkX
+        ponto_partida: ID do nó de origem
+        pontos_analise: Lista de IDs dos nós de destino
+        algoritmo: Nome de um algoritmo em ALGORITMOS ('dijkstra', 'a_estrela', ...)
+        perfil: Perfil de roteamento (só com ALGORITMOS_COM_PERFIL)
+
+    Returns:
+        dict: {tempo_total, caminhos_validos, caminhos_invalidos, detalhes}
+    """
+    argumentos = {} if perfil is None else {'perfil': perfil}
+    resultados_ponto = {
+        'tempo_total': 0,
+        'caminhos_validos': 0,
+        'caminhos_invalidos': 0,
+        'detalhes': {}
+    }
+
+    # Executa busca para cada ponto de destino; os que a origem não pode
+    # alcançar (pelos componentes do grafo) são contados sem busca.
+    possiveis = _destinos_alcancaveis(grafo, ponto_partida, pontos_analise)
+    for ponto_destino in pontos_analise:
+        if ponto_partida == ponto_destino:
+            continue
+
+        caminho = None
+        if ponto_destino in possiveis:
+            caminho = ALGORITMOS[algoritmo](grafo, ponto_partida, ponto_destino, **argumentos)
+
+        if caminho:
+            peso_caminho = calcular_peso_total_caminho(grafo, caminho, perfil)
+            resultados_ponto['tempo_total'] += peso_caminho
+            resultados_ponto['caminhos_validos'] += 1
+            resultados_ponto['detalhes'][ponto_destino] = {
+                'distancia': peso_caminho,
+                'num_arestas': len(caminho) - 1
+            }
+        else:
+            resultados_ponto['caminhos_invalidos'] += 1
+            resultados_ponto['detalhes'][ponto_destino] = {'distancia': float('inf'), 'num_arestas': 0}
+
+    return resultados_ponto
+
+def processar_ponto_todos_destinos(grafo, ponto_partida, pontos_analise, perfil=None):
+    """
+    Calcula os caminhos de um ponto de partida até cada destino a partir de
+    uma única árvore de caminhos mínimos, lendo a distância e o número de
+    arestas de cada destino diretamente dela.
+
+    Produz o mesmo resultado de processar_ponto_pares, com uma busca por
+    origem em vez de uma busca por par. A busca para quando todos os
+    destinos que a origem pode alcançar estão fixados, e nem é feita se não
+    houver nenhum.
+
+    Args:
+        grafo: Grafo do NetworkX
+        ponto_partida: ID do nó de origem
+        pontos_analise: Lista de IDs dos nós de destino
+        perfil: Perfil de roteamento; as distâncias passam a ser tempos
+
+    Returns:
+        dict: {tempo_total, caminhos_validos, caminhos_invalidos, detalhes}
+    """
+    possiveis = _destinos_alcancaveis(grafo, ponto_partida, pontos_analise)
+    distancias, saltos = {}, {}
+    if possiveis:
+        distancias, saltos = dijkstra_todos_destinos(grafo, ponto_partida, perfil=perfil, destinos=possiveis)
+
+    resultados_ponto = {
+        'tempo_total': 0,
+        'caminhos_validos': 0,
+        'caminhos_invalidos': 0,
+        'detalhes': {}
+    }
+
+    for ponto_destino in pontos_analise:
+        if ponto_partida == ponto_destino:
+            continue
+
+        if ponto_destino in distancias:
+            peso_caminho = distancias[ponto_destino]
+            resultados_ponto['tempo_total'] += peso_caminho
+            resultados_ponto['caminhos_validos'] += 1
+            resultados_ponto['detalhes'][ponto_destino] = {
+                'distancia': peso_caminho,
+                'num_arestas': saltos[ponto_destino]
+            }
+        else:
+            resultados_ponto['caminhos_invalidos'] += 1
+            resultados_ponto['detalhes'][ponto_destino] = {'distancia': float('inf'), 'num_arestas': 0}
+
+    return resultados_ponto
+
+def processar_ponto(grafo, ponto_partida, pontos_analise, algoritmo='dijkstra', modo='todos_destinos',
+                    perfil=None):
+    """
+    Processa um ponto de partida e registra o tempo de execução gasto nele.
+
+    Returns:
+        dict: Resultados do ponto, incluindo 'tempo_execucao'
+    """
+    inicio_ponto = time.perf_counter()
+    # Uma árvore de caminhos mínimos por origem já fornece a distância
+    # exata para todos os destinos; o A* só se diferencia na busca por par.
+    if modo == 'todos_destinos':
+        resultados_ponto = processar_ponto_todos_destinos(grafo, ponto_partida, pontos_analise, perfil)
+    else:
+        resultados_ponto = processar_ponto_pares(grafo, ponto_partida, pontos_analise, algoritmo, perfil)
+
+    resultados_ponto['tempo_execucao'] = time.perf_counter() - inicio_ponto
+    return resultados_ponto
+
+def _destinos_alcancaveis(grafo, ponto_partida, pontos_analise):
+    """
+    Destinos de pontos_analise (exceto a própria origem) que os componentes
+    conexos do grafo não descartam; os demais certamente não têm caminho.
+    """
+    componentes = componentes_do_grafo(grafo)
+    origem = componentes.posicao(grafo, ponto_partida)
+    if origem is None:
+        raise nx.NodeNotFound(f"O nó {ponto_partida} não está no grafo.")
+    possiveis = componentes.alcancaveis(origem, componentes.posicoes(grafo, pontos_analise))
+    return {destino for destino, possivel in zip(pontos_analise, possiveis.tolist())
+            if possivel and destino != ponto_partida}
+
+def _imprimir_progresso(indice, total_pontos, ponto_partida, resultados_ponto, perfil=None):
+    print(f"Processando ponto {indice}/{total_pontos}: {ponto_partida}")
+    print(f"   Caminhos validos: {resultados_ponto['caminhos_validos']}")
+    print(f"   Caminhos invalidos: {resultados_ponto['caminhos_invalidos']}")
+    print(f"   {_rotulo(perfil)} total: {resultados_ponto['tempo_total']:.2f} {_unidade(perfil)}")
+    print(f"   Tempo execucao: {resultados_ponto['tempo_execucao']:.2f} segundos")
+    print("-" * 40)
+
+def _rotulo(perfil):
+    return 'Distancia' if perfil is None else 'Tempo de viagem'
+
+def _unidade(perfil):
+    # Com um perfil os pesos são tempos de viagem em segundos.
+    return 'metros' if perfil is None else 'segundos'
+
+def _formatar_total(valor, perfil):
+    if perfil is None:
+        return f"{valor:.2f} metros ({valor/1000:.2f} km)"
+    return f"{valor:.2f} segundos ({valor/60:.2f} min)"
+
+# Estado de cada processo do pool: (grafo, pontos_analise, algoritmo, modo, perfil).
+# Fica em uma variável global para que o grafo seja carregado uma única vez
+# por processo em vez de ser serializado junto com cada tarefa.
+_estado_worker = None
+
+def _inicializar_worker(grafo, arquivo_json, pontos_analise, algoritmo, modo, perfil):
+    global _estado_worker
+    if grafo is None:
+        # Sem fork o grafo do processo pai não é herdado: cada worker
+        # mapeia o cache compilado do grafo, compartilhando as páginas.
+        with contextlib.redirect_stdout(io.StringIO()):
+            grafo = criar_grafo_do_json(arquivo_json, cache=True)
+    _estado_worker = (grafo, pontos_analise, algoritmo, modo, perfil)
+
+def _processar_ponto_worker(ponto_partida):
+    grafo, pontos_analise, algoritmo, modo, perfil = _estado_worker
+    return ponto_partida, processar_ponto(grafo, ponto_partida, pontos_analise, algoritmo, modo, perfil)
+
+def executar_dijkstra_todos_pontos(grafo, algoritmo='dijkstra', max_pontos=None, modo='todos_destinos',
+                                   workers=1, arquivo_json=None, perfil=None, semente=None,
+                                   arquivo_resultados=None, retomar=False):
     """
     Executa o algoritmo de busca a partir de cada nó do grafo.
     
     Args:
         grafo: Grafo do NetworkX
-        algoritmo: 'dijkstra' ou 'a_estrela'
+        algoritmo: Nome de um algoritmo em ALGORITMOS ('dijkstra', 'a_estrela', ...)
         max_pontos: Número máximo de pontos a analisar (para testes)
+        modo: 'todos_destinos' (uma árvore de caminhos mínimos por origem)
+              ou 'pares' (uma busca por par origem/destino)
+        workers: Número de processos usados para distribuir os pontos de partida
+        arquivo_json: Arquivo de origem do grafo; necessário com workers > 1
+                      em plataformas sem fork, onde cada worker recarrega o grafo
+        perfil: Nome do perfil de roteamento ('carro', 'bicicleta', 'pe');
+                os totais passam a ser tempos de viagem em segundos
+        semente: Semente da amostra de pontos, para repetir a mesma análise
+        arquivo_resultados: Se informado, os resultados de cada origem são
+                            gravados nesse arquivo NDJSON assim que ela termina
+                            (ver GravadorResultados), em vez de mantidos em memória
+        retomar: Com arquivo_resultados, continua uma análise interrompida
+                 gravada nele, com os mesmos pontos, a partir das origens
+                 que faltam
     
     Returns:
-        dict: Dicionário com {ponto_partida: {tempo_total, resultados_por_destino}}
+        dict: Dicionário com {ponto_partida: {tempo_total, resultados_por_destino}},
+              ou o caminho de arquivo_resultados, se informado
     """
+    if perfil is not None:
+        perfil = obter_perfil(perfil, grafo).nome
+        if modo == 'pares' and algoritmo not in ALGORITMOS_COM_PERFIL:
+            raise ValueError(f"O algoritmo {algoritmo} não aceita perfil. Use um de {list(ALGORITMOS_COM_PERFIL)}.")
+    
+    pontos_analise = _selecionar_pontos(grafo, max_pontos, semente)
+    gravador = None
+    if arquivo_resultados is not None:
+        gravador = GravadorResultados(arquivo_resultados, pontos_analise,
+                                      {'algoritmo': algoritmo, 'modo': modo, 'perfil': perfil}, retomar)
+        pontos_analise = gravador.pontos
+    resultados_gerais = {}
+    total_pontos = len(pontos_analise)
+    
+    descricao_perfil = "" if perfil is None else f" (perfil {perfil})"
+    print(f"Iniciando analise com {algoritmo.upper()}{descricao_perfil} para {total_pontos} pontos...")
+    if gravador is not None and gravador.concluidos:
+        print(f"Retomando {arquivo_resultados}: {len(gravador.concluidos)} pontos ja concluidos")
+    print("=" * 60)
     
+    inicio_geral = time.perf_counter()
+    
+    try:
+        if workers > 1:
+            resultados_gerais = _executar_em_paralelo(grafo, pontos_analise, algoritmo, modo, workers,
+                                                      arquivo_json, perfil, gravador)
+        else:
+            pendentes = pontos_analise if gravador is None else gravador.pendentes()
+            for indice, ponto_partida in enumerate(pendentes, total_pontos - len(pendentes) + 1):
+                resultados_ponto = processar_ponto(grafo, ponto_partida, pontos_analise, algoritmo, modo, perfil)
+                if gravador is None:
+                    resultados_gerais[ponto_partida] = resultados_ponto
+                else:
+                    gravador.gravar(ponto_partida, resultados_ponto)
+                _imprimir_progresso(indice, total_pontos, ponto_partida, resultados_ponto, perfil)
+    finally:
+        if gravador is not None:
+            gravador.fechar()
+    
+    tempo_total_execucao = time.perf_counter() - inicio_geral
+    print(f"Analise concluida em {tempo_total_execucao:.2f} segundos")
+    
+    return resultados_gerais if gravador is None else arquivo_resultados
+
+def calcular_matriz_todos_pontos(grafo, max_pontos=None, arquivo_matriz=None, perfil=None, semente=None):
+    """
+    Calcula a matriz de distâncias entre todos os pontos analisados, em vez
+    do dicionário de resultados por ponto de executar_dijkstra_todos_pontos.
+
+    Args:
+        grafo: Grafo do NetworkX ou GrafoCSR
+        max_pontos: Número máximo de pontos a analisar (para testes)
+        arquivo_matriz: Se informado, a matriz é gravada nesse .npy mapeado em memória
+        perfil: Nome do perfil de roteamento; a matriz passa a ser de tempos
+        semente: Semente da amostra de pontos
+
+    Returns:
+        tuple: (pontos, matriz), com matriz[i, j] a distância do pontos[i] ao pontos[j]
+    """
+    pontos_analise = _selecionar_pontos(grafo, max_pontos, semente)
+    print(f"Iniciando calculo da matriz de distancias para {len(pontos_analise)} pontos...")
+    print("=" * 60)
+    inicio_geral = time.perf_counter()
+    matriz = matriz_distancias(grafo, pontos_analise, pontos_analise, arquivo=arquivo_matriz, perfil=perfil)
+    print(f"Matriz calculada em {time.perf_counter() - inicio_geral:.2f} segundos")
+    return pontos_analise, matriz
+
+def _selecionar_pontos(grafo, max_pontos, semente=None):
     # Seleciona todos os nós ou uma amostra limitada
     todos_pontos = list(grafo.nodes())
     if max_pontos and max_pontos < len(todos_pontos):
-        # Amostra aleatória para testes rápidos
-        import random
-        pontos_analise = random.sample(todos_pontos, max_pontos)
+        # Amostra aleatória para testes rápidos (reprodutível com a semente)
         print(f"Modo teste: Analisando {max_pontos} pontos de {len(todos_pontos)} totais")
+        return random.Random(semente).sample(todos_pontos, max_pontos)
+    return todos_pontos
+
+def _executar_em_paralelo(grafo, pontos_analise, algoritmo, modo, workers, arquivo_json, perfil=None,
+                          gravador=None):
+    """
+    Distribui os pontos de partida entre um pool de processos e recebe os
+    resultados à medida que cada ponto termina. Com um GravadorResultados,
+    os pontos pendentes são gravados nele na ordem de pontos_analise, para
+    que o arquivo saia igual ao da execução serial.
+
+    Returns:
+        dict: Resultados na mesma ordem de pontos_analise, como na execução
+        serial (vazio com o gravador)
+    """
+    metodos = multiprocessing.get_all_start_methods()
+    if 'fork' in metodos:
+        # Com fork os workers herdam o grafo do processo pai sem serializá-lo.
+        contexto = multiprocessing.get_context('fork')
+        argumentos = (grafo, None, pontos_analise, algoritmo, modo, perfil)
     else:
-        pontos_analise = todos_pontos
-    
-    resultados_gerais = {}
+        if arquivo_json is None:
+            raise ValueError("arquivo_json é obrigatório para workers > 1 sem suporte a fork.")
+        contexto = multiprocessing.get_context('spawn')
+        argumentos = (None, arquivo_json, pontos_analise, algoritmo, modo, perfil)
+
     total_pontos = len(pontos_analise)
-    
-    print(f"Iniciando analise com {algoritmo.upper()} para {total_pontos} pontos...")
-    print("=" * 60)
-    
-    inicio_geral = time.time()
-    
-    for indice, ponto_partida in enumerate(pontos_analise, 1):
-        print(f"Processando ponto {indice}/{total_pontos}: {ponto_partida}")
-        
-        inicio_ponto = time.time()
-        resultados_ponto = {
-            'tempo_total': 0,
-            'caminhos_validos': 0,
-            'caminhos_invalidos': 0,
-            'detalhes': {}
-        }
-        
-        # Executa busca para cada ponto de destino
-        for ponto_destino in pontos_analise:
-            if ponto_partida == ponto_destino:
-                continue
-            
-            if algoritmo == 'dijkstra':
-                caminho = dijkstra(grafo, ponto_partida, ponto_destino)
-            else:
-                caminho = a_estrela(grafo, ponto_partida, ponto_destino)
-            
-            if caminho:
-                peso_caminho = calcular_peso_total_caminho(grafo, caminho)
-                resultados_ponto['tempo_total'] += peso_caminho
-                resultados_ponto['caminhos_validos'] += 1
-                resultados_ponto['detalhes'][ponto_destino] = {
-                    'distancia': peso_caminho,
-                    'num_arestas': len(caminho) - 1
-                }
+    resultados_por_ponto = {}
+    with contexto.Pool(workers, initializer=_inicializar_worker, initargs=argumentos) as pool:
+        if gravador is None:
+            concluidos = pool.imap_unordered(_processar_ponto_worker, pontos_analise, chunksize=1)
+            inicio = 1
+        else:
+            pendentes = gravador.pendentes()
+            concluidos = pool.imap(_processar_ponto_worker, pendentes, chunksize=1)
+            inicio = total_pontos - len(pendentes) + 1
+        for indice, (ponto_partida, resultados_ponto) in enumerate(concluidos, inicio):
+            if gravador is None:
+                resultados_por_ponto[ponto_partida] = resultados_ponto
             else:
-                resultados_ponto['caminhos_invalidos'] += 1
-                resultados_ponto['detalhes'][ponto_destino] = {'distancia': float('inf'), 'num_arestas': 0}
-        
-        tempo_ponto = time.time() - inicio_ponto
-        resultados_ponto['tempo_execucao'] = tempo_ponto
-        
-        resultados_gerais[ponto_partida] = resultados_ponto
-        
-        print(f"   Caminhos validos: {resultados_ponto['caminhos_validos']}")
-        print(f"   Caminhos invalidos: {resultados_ponto['caminhos_invalidos']}")
-        print(f"   Distancia total: {resultados_ponto['tempo_total']:.2f} metros")
-        print(f"   Tempo execucao: {tempo_ponto:.2f} segundos")
-        print("-" * 40)
-    
-    tempo_total_execucao = time.time() - inicio_geral
-    print(f"Analise concluida em {tempo_total_execucao:.2f} segundos")
-    
-    return resultados_gerais
+                gravador.gravar(ponto_partida, resultados_ponto)
+            _imprimir_progresso(indice, total_pontos, ponto_partida, resultados_ponto, perfil)
 
-def encontrar_melhor_ponto(resultados):
+    return {ponto: resultados_por_ponto[ponto] for ponto in pontos_analise if ponto in resultados_por_ponto}
+
+def encontrar_melhor_ponto(resultados, pontos=None):
     """
     Encontra o ponto de partida com menor distância total.
     
     Args:
-        resultados: Dicionário com resultados da execução
+        resultados: Dicionário com resultados da execução, o arquivo NDJSON
+                    gravado por ela (lido em streaming) ou a matriz de
+                    distâncias de calcular_matriz_todos_pontos
+        pontos: IDs das linhas (e colunas) da matriz; obrigatório com a matriz
     
     Returns:
         tuple: (melhor_ponto, menor_distancia, ranking)
     """
+    if isinstance(resultados, np.ndarray):
+        return _melhor_ponto_da_matriz(resultados, pontos)
+    if isinstance(resultados, str):
+        return _melhor_ponto_do_arquivo(resultados)
+
     if not resultados:
         return None, float('inf'), []
     
@@ -139,6 +395,50 @@ def encontrar_melhor_ponto(resultados):
     
     return melhor_ponto, menor_distancia, ranking
 
+def _melhor_ponto_do_arquivo(arquivo_resultados):
+    # Só o ranking (um par por origem) fica em memória; os resultados por
+    # destino são lidos e descartados linha a linha.
+    ranking = sorted([(ponto, dados['tempo_total']) for ponto, dados in ler_resultados(arquivo_resultados)
+                      if dados['caminhos_validos'] > 0], key=lambda x: x[1])
+    if not ranking:
+        print("Nenhum ponto com caminhos validos encontrado!")
+        return None, float('inf'), []
+    return ranking[0][0], ranking[0][1], ranking
+
+def _totais_da_matriz(matriz):
+    """
+    Distância total (soma dos caminhos válidos) e número de caminhos
+    válidos de cada linha, ignorando a diagonal (origem == destino).
+    """
+    # Soma por blocos de linhas para não converter a matriz inteira de uma
+    # vez (ela pode estar mapeada de um arquivo maior que a memória).
+    totais = np.zeros(matriz.shape[0])
+    validos = np.zeros(matriz.shape[0], dtype=np.int64)
+    for inicio in range(0, matriz.shape[0], 1024):
+        bloco = np.array(matriz[inicio:inicio + 1024], dtype=np.float64)
+        linhas = np.arange(inicio, inicio + len(bloco))
+        bloco[linhas - inicio, linhas] = np.inf
+        finitos = np.isfinite(bloco)
+        totais[inicio:inicio + len(bloco)] = np.where(finitos, bloco, 0.0).sum(axis=1)
+        validos[inicio:inicio + len(bloco)] = finitos.sum(axis=1)
+    return totais, validos
+
+def _melhor_ponto_da_matriz(matriz, pontos):
+    if pontos is None:
+        raise ValueError("Informe os pontos (IDs das linhas) junto com a matriz de distâncias.")
+    if matriz.shape[0] == 0:
+        return None, float('inf'), []
+
+    totais, validos = _totais_da_matriz(matriz)
+    linhas_validas = np.flatnonzero(validos > 0)
+    if len(linhas_validas) == 0:
+        print("Nenhum ponto com caminhos validos encontrado!")
+        return None, float('inf'), []
+
+    ordem = linhas_validas[np.argsort(totais[linhas_validas], kind='stable')]
+    ranking = [(pontos[i], float(totais[i])) for i in ordem.tolist()]
+    return ranking[0][0], ranking[0][1], ranking
+
 def salvar_resultados(resultados, arquivo_saida='resultados_dijkstra.json'):
     """
     Salva os resultados em arquivo JSON para análise posterior.
@@ -160,21 +460,44 @@ def salvar_resultados(resultados, arquivo_saida='resultados_dijkstra.json'):
     
     print(f"Resultados salvos em: {arquivo_saida}")
 
-def gerar_relatorio(resultados, grafo, arquivo_relatorio='relatorio_analise.txt'):
+def gerar_relatorio(resultados, grafo, arquivo_relatorio='relatorio_analise.txt', pontos=None, perfil=None):
     """
     Gera um relatório detalhado da análise.
+
+    Aceita o dicionário de executar_dijkstra_todos_pontos, o arquivo NDJSON
+    gravado por ela (percorrido uma vez, sem carregá-lo) ou a matriz de
+    calcular_matriz_todos_pontos (junto com os pontos das linhas). Com o
+    perfil usado na análise, os valores são escritos como tempos.
     """
-    melhor_ponto, menor_distancia, ranking = encontrar_melhor_ponto(resultados)
+    unidade = _unidade(perfil)
+    if isinstance(resultados, str):
+        total_pontos, ranking, resumo = _resumo_do_arquivo(resultados)
+        melhor_ponto, menor_distancia = ranking[0] if ranking else (None, float('inf'))
+    else:
+        melhor_ponto, menor_distancia, ranking = encontrar_melhor_ponto(resultados, pontos)
+        total_pontos = len(resultados)
+        if isinstance(resultados, np.ndarray):
+            totais, validos = _totais_da_matriz(resultados)
+            distancias = totais[validos > 0].tolist()
+        else:
+            distancias = [dados['tempo_total'] for dados in resultados.values()
+                          if dados['caminhos_validos'] > 0]
+        resumo = (sum(distancias) / len(distancias), max(distancias), min(distancias)) if distancias else None
     
     with open(arquivo_relatorio, 'w', encoding='utf-8') as f:
         f.write("RELATORIO DE ANALISE - MELHOR PONTO DE PARTIDA\n")
         f.write("=" * 50 + "\n\n")
         
         f.write("ESTATISTICAS GERAIS:\n")
-        f.write(f"- Total de pontos analisados: {len(resultados)}\n")
+        f.write(f"- Total de pontos analisados: {total_pontos}\n")
+        if perfil is not None:
+            f.write(f"- Perfil de roteamento: {perfil}\n")
         f.write(f"- Melhor ponto de partida: {melhor_ponto}\n")
-        f.write(f"- Distancia total minima: {menor_distancia:.2f} metros\n")
-        f.write(f"- Distancia total minima: {menor_distancia/1000:.2f} km\n\n")
+        if perfil is None:
+            f.write(f"- Distancia total minima: {menor_distancia:.2f} metros\n")
+            f.write(f"- Distancia total minima: {menor_distancia/1000:.2f} km\n\n")
+        else:
+            f.write(f"- Tempo de viagem total minimo: {_formatar_total(menor_distancia, perfil)}\n\n")
         
         if melhor_ponto:
             coords = grafo.nodes[melhor_ponto]
@@ -184,27 +507,88 @@ def gerar_relatorio(resultados, grafo, arquivo_relatorio='relatorio_analise.txt'
         
         f.write("TOP 10 MELHORES PONTOS:\n")
         for i, (ponto, distancia) in enumerate(ranking[:10], 1):
-            f.write(f"{i}. Ponto {ponto}: {distancia:.2f} metros ({distancia/1000:.2f} km)\n")
+            f.write(f"{i}. Ponto {ponto}: {_formatar_total(distancia, perfil)}\n")
         
         f.write(f"\nESTATISTICAS DETALHADAS:\n")
-        distancias = [dados['tempo_total'] for dados in resultados.values() 
-                     if dados['caminhos_validos'] > 0]
-        if distancias:
-            f.write(f"- Media de distancia: {sum(distancias)/len(distancias):.2f} metros\n")
-            f.write(f"- Maior distancia: {max(distancias):.2f} metros\n")
-            f.write(f"- Menor distancia: {min(distancias):.2f} metros\n")
+        if resumo:
+            media, maior, menor = resumo
+            # Sem perfil, as mesmas linhas do relatório original.
+            grandeza = 'distancia' if perfil is None else 'tempo de viagem'
+            f.write(f"- Media de {grandeza}: {media:.2f} {unidade}\n")
+            f.write(f"- Maior {grandeza}: {maior:.2f} {unidade}\n")
+            f.write(f"- Menor {grandeza}: {menor:.2f} {unidade}\n")
     
     print(f"Relatorio gerado: {arquivo_relatorio}")
 
+def _resumo_do_arquivo(arquivo_resultados, tamanho_ranking=10):
+    """
+    Lê o arquivo NDJSON uma vez, guardando só os tamanho_ranking melhores
+    pontos e as somas das estatísticas do relatório.
+
+    Returns:
+        tuple: (total de pontos, ranking, (media, maior, menor) ou None)
+    """
+    total_pontos, soma, validos = 0, 0, 0
+    maior, menor = float('-inf'), float('inf')
+    melhores = []
+    for ordem, (ponto, dados) in enumerate(ler_resultados(arquivo_resultados)):
+        total_pontos += 1
+        if dados['caminhos_validos'] == 0:
+            continue
+        distancia = dados['tempo_total']
+        soma += distancia
+        validos += 1
+        maior, menor = max(maior, distancia), min(menor, distancia)
+        # A ordem desempata como o sort estável de encontrar_melhor_ponto.
+        item = (-distancia, -ordem, ponto)
+        if len(melhores) < tamanho_ranking:
+            heapq.heappush(melhores, item)
+        elif item > melhores[0]:
+            heapq.heapreplace(melhores, item)
+    ranking = [(ponto, -distancia) for distancia, _, ponto in sorted(melhores, reverse=True)]
+    if not ranking:
+        print("Nenhum ponto com caminhos validos encontrado!")
+    return total_pontos, ranking, (soma / validos, maior, menor) if validos else None
+
 # --- EXECUÇÃO PRINCIPAL ---
 if __name__ == "__main__":
     print("DESENVOLVEDOR 2: EXECUTANDO DIJKSTRA PARA TODOS OS PONTOS")
     print("=" * 60)
     
+    argumentos = argparse.ArgumentParser(description="Analise do melhor ponto de partida")
+    argumentos.add_argument('--arquivo', default='exporty.json', help="Arquivo JSON do OpenStreetMap")
+    argumentos.add_argument('--pontos', type=int, default=None,
+                            help="Quantidade de pontos a analisar (0 para todos); sem terminal, obrigatorio")
+    argumentos.add_argument('--semente', type=int, default=None, help="Semente da amostra de pontos")
+    argumentos.add_argument('--workers', type=int, default=1, help="Numero de processos paralelos")
+    argumentos.add_argument('--algoritmo', default='dijkstra', choices=sorted(ALGORITMOS),
+                            help="Algoritmo usado no modo de busca por par")
+    argumentos.add_argument('--modo', default='todos_destinos', choices=['todos_destinos', 'pares', 'matriz'])
+    argumentos.add_argument('--arquivo-matriz', default=None,
+                            help="No modo matriz, grava a matriz de distancias neste arquivo .npy")
+    argumentos.add_argument('--perfil', default=None, choices=sorted(PERFIS),
+                            help="Perfil de roteamento: compara tempos de viagem em vez de distancias")
+    argumentos.add_argument('--maior-componente', action='store_true',
+                            help="Analisa so o maior componente fortemente conexo do grafo")
+    argumentos.add_argument('--saida', default=None,
+                            help="Grava os resultados de cada ponto neste arquivo NDJSON assim que ele termina, "
+                                 "em vez de manter tudo em memoria (modos todos_destinos e pares)")
+    argumentos.add_argument('--retomar', action='store_true',
+                            help="Continua a analise interrompida gravada em --saida")
+    args = argumentos.parse_args()
+    if args.saida and args.modo == 'matriz':
+        argumentos.error("--saida nao se aplica ao modo matriz (use --arquivo-matriz)")
+    if args.retomar and not args.saida:
+        argumentos.error("--retomar precisa de --saida")
+    if args.pontos is None and not args.retomar and not sys.stdin.isatty():
+        # Sem terminal (scripts) não há a quem perguntar, e analisar todos os
+        # pontos pode levar horas: a quantidade precisa ser explícita.
+        argumentos.error("sem terminal, informe --pontos (0 para todos)")
+    
     # 1. Carregar o grafo
-    arquivo_json = 'exporty.json'
+    arquivo_json = args.arquivo
     print("Carregando grafo...")
-    grafo = criar_grafo_do_json(arquivo_json)
+    grafo = criar_grafo_do_json(arquivo_json, cache=True, maior_componente=args.maior_componente)
     
     if grafo is None:
         print("Erro ao carregar o grafo!")
@@ -213,10 +597,23 @@ if __name__ == "__main__":
     print(f"Grafo carregado: {grafo.number_of_nodes()} nos, {grafo.number_of_edges()} arestas")
     
     # 2. Executar análise (usando max_pontos=10 para teste rápido - remover para análise completa)
-    resultados = executar_dijkstra_todos_pontos(grafo, algoritmo='dijkstra', max_pontos=int(input("Quantos pontos será analisados?\n-> ")))
+    max_pontos = args.pontos
+    if max_pontos is None:
+        # Ao retomar, os pontos vêm do arquivo.
+        max_pontos = 0 if args.retomar else int(input("Quantos pontos será analisados?\n-> "))
+    if args.modo == 'matriz':
+        pontos, resultados = calcular_matriz_todos_pontos(grafo, max_pontos, args.arquivo_matriz, args.perfil,
+                                                          args.semente)
+    else:
+        pontos = None
+        resultados = executar_dijkstra_todos_pontos(grafo, algoritmo=args.algoritmo, max_pontos=max_pontos,
+                                                    modo=args.modo, workers=args.workers,
+                                                    arquivo_json=arquivo_json, perfil=args.perfil,
+                                                    semente=args.semente, arquivo_resultados=args.saida,
+                                                    retomar=args.retomar)
     
     # 3. Encontrar melhor ponto
-    melhor_ponto, menor_distancia, ranking = encontrar_melhor_ponto(resultados)
+    melhor_ponto, menor_distancia, ranking = encontrar_melhor_ponto(resultados, pontos)
     
     # 4. Exibir resultados
     print("\nRESULTADOS FINAIS:")
@@ -225,16 +622,18 @@ if __name__ == "__main__":
         coords = grafo.nodes[melhor_ponto]
         print(f"MELHOR PONTO DE PARTIDA: {melhor_ponto}")
         print(f"Coordenadas: ({coords['lat']}, {coords['lon']})")
-        print(f"Distancia total: {menor_distancia:.2f} metros ({menor_distancia/1000:.2f} km)")
+        print(f"{_rotulo(args.perfil)} total: {_formatar_total(menor_distancia, args.perfil)}")
         
         print(f"\nTOP 5 MELHORES PONTOS:")
         for i, (ponto, distancia) in enumerate(ranking[:5], 1):
-            print(f"{i}. Ponto {ponto}: {distancia:.2f} metros")
+            print(f"{i}. Ponto {ponto}: {distancia:.2f} {_unidade(args.perfil)}")
     else:
         print("Nao foi possivel determinar o melhor ponto.")
     
-    # 5. Salvar resultados
-    salvar_resultados(resultados)
-    gerar_relatorio(resultados, grafo)
+    # 5. Salvar resultados (no modo matriz, ela já foi gravada em --arquivo-matriz,
+    # e com --saida os resultados já estão no arquivo NDJSON)
+    if pontos is None and args.saida is None:
+        salvar_resultados(resultados)
+    gerar_relatorio(resultados, grafo, pontos=pontos, perfil=args.perfil)
     
     print("\nAnalise do Desenvolvedor 2 concluida!")
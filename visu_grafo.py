@@ -1,4 +1,5 @@
 import folium
+from folium import plugins
 from parser import criar_grafo_do_json
 
 # Mapeia os tipos de rodovia para diferentes espessuras de linha
@@ -21,20 +22,51 @@ tipo_de_estrada_cor = {
     'unclassified': 'green', 'living_street': 'green', 'footway': 'gray', 'path': 'gray'
 }
 
+# Opções aceitas para o desenho dos nós no modo rápido.
+MODOS_NOS = ('cluster', 'nenhum')
+
+# Casas decimais das coordenadas gravadas no modo rápido (cerca de 0,1 m).
+CASAS_DECIMAIS = 6
+
 # --- LÓGICA PRINCIPAL ---
-def visualizar_mapa_interativo(grafo):
+def visualizar_mapa_interativo(grafo, rapido=False, nos='cluster', nome_arquivo='mapa_interativo.html'):
     """
     Cria e salva um mapa interativo em HTML a partir do grafo.
+
+    Por padrão, cada nó e cada aresta vira um elemento próprio do mapa, o
+    que só é viável para grafos pequenos.
+
+    Com rapido=True as ruas viram polilinhas contínuas (trechos
+    consecutivos da mesma via são unidos e as arestas de volta das ruas de
+    mão dupla são ignoradas, ver polilinhas_das_vias), agrupadas em uma
+    camada GeoJSON por tipo de rodovia. O Leaflet simplifica as linhas de
+    acordo com o zoom, e os nós são desenhados em cluster ('cluster') ou
+    omitidos ('nenhum').
     """
     if grafo is None:
         print("Erro: O grafo não pode ser nulo para visualização.")
         return
+    if rapido:
+        if nos not in MODOS_NOS:
+            raise ValueError(f"Modo de nós desconhecido: {nos}. Use um de {MODOS_NOS}.")
+        m = _mapa_rapido(grafo, nos)
+    else:
+        m = _mapa_detalhado(grafo)
 
-    # Coordenadas do centro do seu grafo para centralizar o mapa
-    coords_centro = (
+    # Salva o mapa em um arquivo HTML
+    m.save(nome_arquivo)
+    print(f"...Mapa interativo salvo como '{nome_arquivo}'. Abra-o no seu navegador.")
+    print("")
+
+def _centro(grafo):
+    return (
         sum(data['lat'] for _, data in grafo.nodes(data=True)) / grafo.number_of_nodes(),
         sum(data['lon'] for _, data in grafo.nodes(data=True)) / grafo.number_of_nodes()
     )
+
+def _mapa_detalhado(grafo):
+    # Coordenadas do centro do seu grafo para centralizar o mapa
+    coords_centro = _centro(grafo)
     # Cria o mapa usando Folium com um zoom inicial ajustado
     m = folium.Map(location=coords_centro, zoom_start=15)
 
@@ -67,7 +99,145 @@ def visualizar_mapa_interativo(grafo):
             tooltip=data.get('name', 'Sem nome')
         ).add_to(m)
 
-    # Salva o mapa em um arquivo HTML
-    m.save('mapa_interativo.html')
-    print("...Mapa interativo salvo como 'mapa_interativo.html'. Abra-o no seu navegador.")
-    print("")
\ No newline at end of file
+    return m
+
+def _mapa_rapido(grafo, nos):
+    m = folium.Map(location=_centro(grafo), zoom_start=15)
+
+    # Tipos mais finos primeiro, para que as vias principais fiquem por cima.
+    vias_por_tipo = polilinhas_das_vias(grafo)
+    for tipo_estrada in sorted(vias_por_tipo, key=lambda tipo: (tipo_de_estrada_peso.get(tipo, 1.5), tipo)):
+        colecao = {
+            'type': 'FeatureCollection',
+            'features': [
+                {
+                    'type': 'Feature',
+                    'properties': {'name': nome},
+                    'geometry': {'type': 'LineString', 'coordinates': coordenadas},
+                }
+                for nome, coordenadas in vias_por_tipo[tipo_estrada]
+            ],
+        }
+        estilo = {
+            'color': tipo_de_estrada_cor.get(tipo_estrada, 'gray'),
+            'weight': tipo_de_estrada_peso.get(tipo_estrada, 1.5),
+            'opacity': 0.7,
+        }
+        folium.GeoJson(
+            colecao,
+            name=f"{tipo_estrada} ({len(colecao['features'])})",
+            style_function=lambda _, estilo=estilo: estilo,
+            # Tolerância, em pixels, da simplificação que o Leaflet refaz a cada zoom.
+            smooth_factor=1.5,
+            tooltip=folium.GeoJsonTooltip(fields=['name'], labels=False),
+        ).add_to(m)
+
+    if nos == 'cluster':
+        # Os marcadores são criados no navegador, só quando o cluster se abre.
+        dados = [[round(data['lat'], CASAS_DECIMAIS), round(data['lon'], CASAS_DECIMAIS), int(node)]
+                 for node, data in grafo.nodes(data=True)]
+        plugins.FastMarkerCluster(
+            dados,
+            name="nós",
+            callback="""function (linha) {
+                return L.circleMarker(new L.LatLng(linha[0], linha[1]), {radius: 2, color: 'blue'})
+                    .bindTooltip('ID: ' + linha[2] + '<br>Lat: ' + linha[0] + '<br>Lon: ' + linha[1]);
+            }""",
+        ).add_to(m)
+
+    folium.LayerControl().add_to(m)
+    return m
+
+def polilinhas_das_vias(grafo):
+    """
+    Junta as arestas do grafo em polilinhas, uma por cadeia contínua de
+    arestas da mesma via.
+
+    A aresta de volta de uma rua de mão dupla só é ignorada quando é gêmea
+    da de ida: mesmo nome, mesmo tipo de rodovia e, em um grafo
+    simplificado, os mesmos pontos intermediários. Arestas opostas
+    diferentes (duas mãos únicas com atributos distintos) são desenhadas
+    as duas. Cada polilinha segue arestas consecutivas com o mesmo nome e
+    tipo enquanto o nó do meio liga exatamente duas delas, e para nas
+    pontas, nas ramificações e onde a via muda. Em um grafo simplificado,
+    os pontos das cadeias contraídas entram nas polilinhas.
+
+    Returns:
+        dict: {tipo de rodovia: [(nome, [[lon, lat], ...]), ...]}, com as
+        coordenadas na ordem do GeoJSON.
+    """
+    simplificacao = grafo.graph.get('simplificacao')
+
+    def atributos(data):
+        return data.get('name', 'Sem nome'), data.get('highway', 'unclassified')
+
+    def gemea(origem, destino, data):
+        # A aresta de volta, já incluída, desenharia exatamente a mesma linha.
+        if not grafo.has_edge(destino, origem) or atributos(grafo[destino][origem]) != atributos(data):
+            return False
+        if simplificacao is None:
+            return True
+        return (simplificacao.coordenadas_intermediarias(origem, destino)
+                == simplificacao.coordenadas_intermediarias(destino, origem)[::-1])
+
+    # Adjacência não direcionada de cada via: {nó: [(vizinho, aresta), ...]},
+    # com a aresta no sentido em que está no grafo.
+    vias = {}
+    incluidas = set()
+    for origem, destino, data in grafo.edges(data=True):
+        if origem == destino or ((destino, origem) in incluidas and gemea(origem, destino, data)):
+            continue
+        incluidas.add((origem, destino))
+        adjacencia = vias.setdefault(atributos(data), {})
+        adjacencia.setdefault(origem, []).append((destino, (origem, destino)))
+        adjacencia.setdefault(destino, []).append((origem, (origem, destino)))
+
+    coordenadas = {}
+    def coordenada(no):
+        if no not in coordenadas:
+            data = grafo.nodes[no]
+            coordenadas[no] = [round(data['lon'], CASAS_DECIMAIS), round(data['lat'], CASAS_DECIMAIS)]
+        return coordenadas[no]
+
+    def pontos_da_linha(nos_linha, arestas_linha):
+        pontos = [coordenada(nos_linha[0])]
+        for anterior, no, aresta in zip(nos_linha, nos_linha[1:], arestas_linha):
+            if simplificacao is not None:
+                meio = simplificacao.coordenadas_intermediarias(*aresta)
+                if aresta[0] != anterior:
+                    meio = meio[::-1]
+                pontos.extend([round(lon, CASAS_DECIMAIS), round(lat, CASAS_DECIMAIS)] for lat, lon in meio)
+            pontos.append(coordenada(no))
+        return pontos
+
+    resultado = {}
+    for (nome, tipo_estrada), adjacencia in vias.items():
+        linhas = resultado.setdefault(tipo_estrada, [])
+        usadas = set()
+
+        def seguir(inicio, proximo, aresta):
+            nos_linha, arestas_linha = [inicio, proximo], [aresta]
+            usadas.add(aresta)
+            atual = proximo
+            while len(adjacencia[atual]) == 2:
+                primeira, segunda = adjacencia[atual]
+                seguinte, aresta = primeira if segunda[1] == aresta else segunda
+                if aresta in usadas:
+                    break
+                usadas.add(aresta)
+                nos_linha.append(seguinte)
+                arestas_linha.append(aresta)
+                atual = seguinte
+            linhas.append((nome, pontos_da_linha(nos_linha, arestas_linha)))
+
+        # Primeiro a partir das pontas e ramificações; o que sobra são ciclos.
+        for no, vizinhos in adjacencia.items():
+            if len(vizinhos) != 2:
+                for vizinho, aresta in vizinhos:
+                    if aresta not in usadas:
+                        seguir(no, vizinho, aresta)
+        for no, vizinhos in adjacencia.items():
+            for vizinho, aresta in vizinhos:
+                if aresta not in usadas:
+                    seguir(no, vizinho, aresta)
+    return resultado